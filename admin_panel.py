@@ -0,0 +1,67 @@
+# admin_panel.py
+import streamlit as st
+import pandas as pd
+import config
+from db_manager import DBManager # Import the new DBManager
+from query_metrics import get_query_metrics
+
+class AdminPanelPage:
+    """Database health for operators: per-query timings, slow queries, pool and cache statistics."""
+
+    def __init__(self, db_manager=None):
+        self.db_manager = db_manager or DBManager()
+
+    @staticmethod
+    def is_admin(username):
+        return username in config.ADMIN_USERS
+
+    def display(self):
+        st.title("🛠️ Admin Panel")
+
+        if not self.is_admin(st.session_state.get('current_user')):
+            st.warning("You don't have access to the admin panel.")
+            return
+
+        metrics = get_query_metrics()
+        if metrics is None:
+            st.info("Query instrumentation is disabled (QMS_QUERY_METRICS=0).")
+            return
+
+        # Connection pool and read cache
+        st.subheader("Connection Pool & Read Cache")
+        pool, cache = self.db_manager.pool.stats(), self.db_manager.read_cache.stats()
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("Connections in use", f"{pool['in_use']} / {pool['max_size']}")
+        c2.metric("Idle connections", pool['idle'])
+        c3.metric("Cache hit ratio", f"{cache['hit_ratio']:.0%}")
+        c4.metric("Cached users", cache['users'])
+        with st.expander("Raw pool and cache counters"):
+            st.json({"pool": pool, "read_cache": cache})
+
+        # Per call site and query template, most total time first
+        st.subheader("Queries")
+        summary = pd.DataFrame(metrics.summary())
+        if summary.empty:
+            st.write("No queries recorded yet.")
+        else:
+            st.dataframe(summary, use_container_width=True, hide_index=True)
+
+        st.subheader(f"Slow Queries (≥ {config.SLOW_QUERY_MS:.0f} ms)")
+        slow = list(metrics.slow_queries)
+        if slow:
+            st.dataframe(pd.DataFrame(slow[::-1]), use_container_width=True, hide_index=True)
+        else:
+            st.write("None recorded.")
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.download_button("⬇️ Prometheus metrics", metrics.render_prometheus(),
+                               file_name="qms_metrics.prom", mime="text/plain")
+        with col2:
+            if config.METRICS_FILE and st.button("💾 Write metrics file"):
+                metrics.export()
+                st.success(f"Wrote {config.METRICS_FILE}")
+        with col3:
+            if st.button("♻️ Reset counters"):
+                metrics.reset()
+                st.rerun()
@@ -0,0 +1,103 @@
+# analytics_dashboard.py
+import streamlit as st
+import pandas as pd
+import plotly.express as px
+from datetime import date, timedelta
+from db_manager import DBManager # Import the new DBManager
+from concurrent_reads import read
+from catalog import get_catalog
+
+class AnalyticsDashboardPage:
+    """Patient volumes, peak hours and bottlenecks, read only from the pre-aggregated rollup tables."""
+
+    DEFAULT_WINDOW_DAYS = 30
+    TOP_DOCTORS = 10
+    # Columns of each rollup read, so a failed read still yields a well-formed empty frame
+    COLUMNS = {
+        "daily": ["bucket_date", "appointments"],
+        "hourly": ["bucket_hour", "appointments"],
+        "doctors": ["hospital", "department", "doctor", "appointments", "active_days", "busiest_day"],
+    }
+
+    def __init__(self, db_manager=None):
+        self.db_manager = db_manager or DBManager()
+
+    def display(self):
+        st.title("📊 Analytics Dashboard")
+
+        if not st.session_state.get('current_user'):
+            st.warning("Please log in to view analytics.")
+            return
+
+        # Filters: date window and optional hospital
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            date_from = st.date_input("From", value=date.today() - timedelta(days=self.DEFAULT_WINDOW_DAYS), key="analytics_from")
+        with col2:
+            date_to = st.date_input("To", value=date.today() + timedelta(days=self.DEFAULT_WINDOW_DAYS), key="analytics_to")
+        with col3:
+            hospital = st.selectbox("Hospital", ["All hospitals"] + get_catalog().hospital_names(), key="analytics_hospital")
+        hospital = None if hospital == "All hospitals" else hospital
+
+        if date_from > date_to:
+            st.error("'From' must be on or before 'To'.")
+            return
+
+        # Each query reads rollup rows (doctors x days), never individual appointments; all three run in parallel
+        results = self.db_manager.fetch_concurrently({
+            name: read(loader, date_from, date_to, hospital, default=[])
+            for name, loader in (("daily", self.db_manager.get_daily_volume),
+                                 ("hourly", self.db_manager.get_hourly_volume),
+                                 ("doctors", self.db_manager.get_doctor_volume))
+        })
+        if results.errors:
+            st.warning("Some analytics could not be loaded right now; please refresh in a moment.")
+        daily, hourly, doctors = (pd.DataFrame(results[name] or [], columns=self.COLUMNS[name])
+                                  for name in ("daily", "hourly", "doctors"))
+        if daily.empty:
+            st.info("No appointments in the selected period.")
+            return
+        for frame in (daily, hourly, doctors):
+            frame["appointments"] = frame["appointments"].astype(int)
+
+        total = int(daily["appointments"].sum())
+        busiest = daily.loc[daily["appointments"].idxmax()]
+        peak_hour = hourly.loc[hourly["appointments"].idxmax(), "bucket_hour"] if not hourly.empty else None
+        m1, m2, m3 = st.columns(3)
+        m1.metric("Appointments", total)
+        m2.metric("Busiest day", str(busiest["bucket_date"]), f"{int(busiest['appointments'])} bookings", delta_color="off")
+        m3.metric("Peak hour", f"{int(peak_hour):02d}:00" if peak_hour is not None else "-")
+
+        # Patient volume over time
+        st.subheader("Patient Volume")
+        st.plotly_chart(px.line(daily, x="bucket_date", y="appointments", markers=True,
+                                labels={"bucket_date": "Date", "appointments": "Appointments"}),
+                        use_container_width=True)
+
+        # Peak hours
+        st.subheader("Peak Hours")
+        st.plotly_chart(px.bar(hourly, x="bucket_hour", y="appointments",
+                               labels={"bucket_hour": "Hour of day", "appointments": "Appointments"}),
+                        use_container_width=True)
+
+        # Bottlenecks: departments and doctors carrying the most load
+        st.subheader("Bottlenecks")
+        if doctors.empty:
+            st.info("No per-doctor breakdown available for this period.")
+            return
+        departments = (doctors.groupby(["hospital", "department"], as_index=False)["appointments"].sum()
+                       .sort_values("appointments", ascending=False))
+        departments["label"] = departments["department"] + " (" + departments["hospital"] + ")"
+        st.plotly_chart(px.bar(departments, x="appointments", y="label", orientation="h",
+                               labels={"label": "Department", "appointments": "Appointments"}),
+                        use_container_width=True)
+
+        top = doctors.head(self.TOP_DOCTORS).copy()
+        top["per_active_day"] = (top["appointments"] / top["active_days"]).round(1)
+        st.dataframe(
+            top[["doctor", "department", "hospital", "appointments", "per_active_day", "busiest_day"]].rename(columns={
+                "doctor": "Doctor", "department": "Department", "hospital": "Hospital",
+                "appointments": "Appointments", "per_active_day": "Per active day", "busiest_day": "Busiest day",
+            }),
+            use_container_width=True, hide_index=True,
+        )
@@ -1,36 +1,19 @@
 # appointment_booking.py
 import streamlit as st
-from datetime import datetime, time, date
-from db_manager import DBManager # Import the new DBManager
+from datetime import datetime, date
+from db_manager import DBManager, ReservationStatus # Import the new DBManager
+from queue_engine import get_queue_registry
+from catalog import get_catalog
+from doctor_search import get_doctor_search_index
+from availability import get_availability_calendar
 
 class AppointmentBookingPage:
     """Handles the selection of hospital, department, doctor, date, and time for an appointment."""
 
-    HOSPITAL_DATA = {
-        "City Hospital": {
-            "Cardiology": [
-                {"name": "Dr. A. Sharma", "rating": 4.8, "qualification": "MD, DM (Cardiology)", "experience": "15 years"},
-                {"name": "Dr. B. Verma", "rating": 4.6, "qualification": "MD, DNB (Cardiology)", "experience": "10 years"},
-            ],
-            "Neurology": [
-                {"name": "Dr. C. Mehta", "rating": 4.7, "qualification": "MD, DM (Neurology)", "experience": "12 years"},
-                {"name": "Dr. D. Nair", "rating": 4.5, "qualification": "MD, DNB (Neurology)", "experience": "9 years"},
-            ],
-        },
-        "Green Valley Clinic": {
-            "Orthopedics": [
-                {"name": "Dr. E. Singh", "rating": 4.9, "qualification": "MS (Ortho), DNB (Ortho)", "experience": "18 years"},
-                {"name": "Dr. F. Gupta", "rating": 4.6, "qualification": "MS (Ortho)", "experience": "11 years"},
-            ],
-            "Dermatology": [
-                {"name": "Dr. O. Roy", "rating": 4.8, "qualification": "MD (Dermatology)", "experience": "11 years"},
-                {"name": "Dr. P. Shah", "rating": 4.5, "qualification": "DDVL, MD (Dermatology)", "experience": "7 years"},
-            ],
-        }
-    }
-
-    def __init__(self):
-        self.db_manager = DBManager()
+    def __init__(self, db_manager=None):
+        self.db_manager = db_manager or DBManager()
+        self.queue_registry = get_queue_registry(self.db_manager)
+        self.availability = get_availability_calendar(self.db_manager)
 
     def display(self):
         st.title("🗓️ Book Your Appointment")
@@ -41,29 +24,36 @@ class AppointmentBookingPage:
             st.warning("Please log in to book an appointment.")
             return
 
+        catalog = get_catalog()
+        self._display_doctor_search()
+
         # Hospital & Department Selection
         st.markdown("### 🏥 Select Hospital & Department")
         col1, col2 = st.columns(2)
         with col1:
-            hospital_names = list(self.HOSPITAL_DATA.keys())
-            selected_hospital = st.selectbox("🏥 Hospital", hospital_names, key="select_hospital_dept")
+            selected_hospital = st.selectbox("🏥 Hospital", catalog.bookable_hospitals(), key="select_hospital_dept")
             st.session_state.selected_hospital = selected_hospital
 
         with col2:
-            departments = list(self.HOSPITAL_DATA[selected_hospital].keys())
+            departments = catalog.bookable_departments(selected_hospital)
             selected_department = st.selectbox("🩺 Department", departments, key="select_department_dept")
             st.session_state.selected_department = selected_department
 
-        # Doctor Selection
+        # Doctor Selection (options are doctor ids, so the pick is an O(1) catalog lookup)
         st.markdown("### 👨‍⚕️ Choose a Doctor")
-        doctors = self.HOSPITAL_DATA[selected_hospital][selected_department]
-        doctor_labels = [
-            f"{doc['name']} (⭐ {doc['rating']}) - {doc['qualification']} - {doc['experience']}"
-            for doc in doctors
-        ]
-        selected_doctor_label = st.selectbox("👨‍⚕️ Doctor", doctor_labels, key="select_doctor_dept")
-        doc_index = doctor_labels.index(selected_doctor_label)
-        selected_doctor = doctors[doc_index]
+        doctor_ids = [doc['id'] for doc in catalog.doctors(selected_hospital, selected_department)]
+        if not doctor_ids:
+            st.info("No doctors are available in this department right now. Please choose another department.")
+            return
+        selected_doctor_id = st.selectbox(
+            "👨‍⚕️ Doctor", doctor_ids, key="select_doctor_dept",
+            format_func=lambda doctor_id: catalog.doctor(doctor_id)['label'],
+        )
+        selected_doctor = catalog.doctor(selected_doctor_id)
+        if selected_doctor is None:
+            # The catalog was reloaded and this doctor is gone; a rerun offers the new list
+            st.info("The doctor list has changed. Please choose a doctor again.")
+            return
         st.session_state.selected_doctor = selected_doctor
 
         # Doctor Info Card
@@ -79,12 +69,28 @@ class AppointmentBookingPage:
         # Date and Time Picker
         st.markdown("### 📅 Select Date & Time TO 🕒 Book a Slot ")
 
-        if "appointment_time" not in st.session_state:
-            st.session_state.appointment_time = time(9, 0) # Default 9:00 AM
-
-        appointment_date = st.date_input("📅 Appointment Date", datetime.today(), key="appointment_date_dept")
-        time_value = st.session_state.appointment_time if isinstance(st.session_state.appointment_time, time) else time(9, 0)
-        appointment_time = st.time_input("🕒 Appointment Time", value=time_value, key="appointment_time_dept")
+        appointment_date = st.date_input(
+            "📅 Appointment Date", datetime.today(), min_value=date.today(), key="appointment_date_dept"
+        )
+        doctor_key = (selected_hospital, selected_department, selected_doctor['name'])
+
+        # Only slots that are inside the doctor's hours and not yet full are offered
+        free_slots = self.availability.free_slots(*doctor_key, appointment_date)
+        if free_slots:
+            appointment_time = st.selectbox(
+                "🕒 Appointment Time", free_slots, key="appointment_time_dept",
+                format_func=lambda slot: slot.strftime("%I:%M %p"),
+            )
+        else:
+            appointment_time = None
+            next_slot = self.availability.next_available(*doctor_key, start_day=appointment_date)
+            if next_slot:
+                st.warning(
+                    f"No free slots on {appointment_date.strftime('%d %b %Y')}. "
+                    f"Next available: **{next_slot[0].strftime('%d %b %Y')} at {next_slot[1].strftime('%I:%M %p')}**."
+                )
+            else:
+                st.warning("No free slots in the coming weeks for this doctor.")
         st.session_state.appointment_time = appointment_time
         st.session_state.appointment_date = appointment_date.strftime("%Y-%m-%d")
 
@@ -93,7 +99,8 @@ class AppointmentBookingPage:
         # Save Button
         col_space1, col_button, col_space2 = st.columns([1, 2, 1])
         with col_button:
-            if st.button("✅ Save Appointment Details", use_container_width=True, key="save_appointment_details_dept"):
+            if st.button("✅ Save Appointment Details", use_container_width=True, key="save_appointment_details_dept",
+                         disabled=appointment_time is None):
                 new_booked_appointment = {
                     "Hospital": selected_hospital,
                     "Department": selected_department,
@@ -103,14 +110,71 @@ class AppointmentBookingPage:
                     "booking_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                 }
 
-                # Check if the appointment already exists
-                exists = self.db_manager.appointment_exists(username, new_booked_appointment)
-
-                if not exists:
-                    success = self.db_manager.add_booked_appointment(username, new_booked_appointment)
-                    if success is not None:
-                        st.success("✅ Appointment details saved successfully!")
-                    else:
-                        st.error("🔴 Failed to save appointment details. Please try again.")
+                # Claim a place in the slot and save the booking in one transaction
+                result = self.db_manager.reserve_appointment(username, new_booked_appointment)
+
+                if result.status in (ReservationStatus.RESERVED, ReservationStatus.SLOT_FULL) and not result.remaining:
+                    self.availability.mark_full(*doctor_key, appointment_date, appointment_time)
+
+                if result.status == ReservationStatus.RESERVED:
+                    token = self.queue_registry.issue(
+                        selected_hospital, selected_department, selected_doctor['name'], appointment_date,
+                        username, appointment_id=result.appointment_id
+                    )
+                    st.success(f"✅ Appointment details saved successfully! Your token number is **{token}**.")
+                elif result.status == ReservationStatus.ALREADY_BOOKED:
+                    st.info("ℹ️ This exact appointment is already saved.")
+                elif result.status == ReservationStatus.SLOT_FULL:
+                    st.warning("⛔ This time slot is fully booked for the selected doctor. Please choose another time.")
                 else:
-                    st.info("ℹ️ This exact appointment is already saved.")
\ No newline at end of file
+                    st.error("🔴 Failed to save appointment details. Please try again.")
+
+    def _display_doctor_search(self):
+        """Search doctors across all hospitals; picking a result pre-fills the selectors below."""
+        index = get_doctor_search_index()
+        with st.expander("🔎 Search doctors across all hospitals"):
+            col1, col2 = st.columns(2)
+            with col1:
+                specialty = st.selectbox("Specialty", ["Any"] + index.specialties, key="doctor_search_specialty")
+                name_prefix = st.text_input("Doctor name starts with", key="doctor_search_name")
+            with col2:
+                min_rating = st.slider("Minimum rating ⭐", 0.0, 5.0, 0.0, 0.1, key="doctor_search_rating")
+                min_experience = st.number_input("Minimum experience (years)", 0, 60, 0, key="doctor_search_experience")
+
+            today = date.today()
+            results = index.search(
+                specialty=None if specialty == "Any" else specialty,
+                name_prefix=name_prefix,
+                min_rating=min_rating or None,
+                min_experience=min_experience or None,
+                limit=10,
+                queue_length=lambda doc: self.queue_registry.waiting_count(
+                    doc['hospital'], doc['department'], doc['name'], today
+                ),
+            )
+            if not results:
+                st.info("No doctors match these filters.")
+                return
+
+            st.dataframe(
+                [
+                    {
+                        "Doctor": doc['name'], "Hospital": doc['hospital'], "Department": doc['department'],
+                        "Rating": doc['rating'], "Experience": doc['experience'], "In queue today": doc['queue_length'],
+                    }
+                    for doc in results
+                ],
+                use_container_width=True,
+            )
+            by_id = {doc['id']: doc for doc in results}
+            picked_id = st.selectbox(
+                "Pick a doctor", list(by_id), key="doctor_search_pick",
+                format_func=lambda doctor_id: f"{by_id[doctor_id]['name']} — {by_id[doctor_id]['hospital']}",
+            )
+            if st.button("Use this doctor", key="doctor_search_use"):
+                picked = by_id[picked_id]
+                # The selectors below haven't been drawn yet this run, so their state can be set
+                st.session_state.select_hospital_dept = picked['hospital']
+                st.session_state.select_department_dept = picked['department']
+                st.session_state.select_doctor_dept = picked['id']
+                st.rerun()
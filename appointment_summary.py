@@ -3,12 +3,19 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime
 from db_manager import DBManager # Import the new DBManager
+from concurrent_reads import read
+from queue_engine import get_queue_registry
+from wait_time import get_wait_time_estimator
 
 class AppointmentSummaryPage:
     """Displays the appointment summary and handles the payment process."""
 
-    def __init__(self):
-        self.db_manager = DBManager()
+    HISTORY_PAGE_SIZE = 20
+
+    def __init__(self, db_manager=None):
+        self.db_manager = db_manager or DBManager()
+        self.queue_registry = get_queue_registry(self.db_manager)
+        self.wait_time_estimator = get_wait_time_estimator(self.db_manager)
 
     def display(self):
         st.title("📃 Your Appointment Summary & Payment")
@@ -18,8 +25,6 @@ class AppointmentSummaryPage:
             st.warning("Please log in to view appointment summary.")
             return
 
-        booked_appointments = self.db_manager.get_booked_appointments(username)
-
         # Retrieve current appointment details from session state
         selected_hospital = st.session_state.get('selected_hospital', "Not selected")
         selected_department = st.session_state.get('selected_department', "Not selected")
@@ -38,7 +43,22 @@ class AppointmentSummaryPage:
         doctor_experience = selected_doctor_info.get('experience', 'N/A')
         doctor_rating = selected_doctor_info.get('rating', 'N/A')
 
-        health_data = self.db_manager.get_last_health_data(username)
+        # The page's independent reads run in parallel: latency is the slowest, not the sum
+        date_from, date_to, cursors = self._history_state()
+        reads = {
+            "health": read(self.db_manager.get_last_health_data, username),
+            "history_total": read(self.db_manager.count_booked_appointments, username, date_from, date_to, default=0),
+            "history_page": read(self.db_manager.get_booked_appointments_page, username, self.HISTORY_PAGE_SIZE,
+                                 cursors[-1], date_from, date_to, default=([], None)),
+        }
+        if doctor_name != "Not selected":
+            reads["queue"] = read(self.queue_registry.get_queue, selected_hospital, selected_department,
+                                  doctor_name, appointment_date)
+        results = self.db_manager.fetch_concurrently(reads)
+        if results.errors:
+            st.warning("Some details could not be loaded right now; please refresh in a moment.")
+
+        health_data = results["health"]
         if not health_data:
             health_data = {}
 
@@ -117,42 +137,30 @@ class AppointmentSummaryPage:
             """
         st.markdown(patient_html, unsafe_allow_html=True)
 
-        # Show all appointments in a table
+        # Show booked appointments one page at a time
         st.markdown("### 📝 All Booked Appointments")
-        if booked_appointments:
-            # Convert list of dictionaries to DataFrame for display
-            df_appointments = pd.DataFrame(booked_appointments)
-            st.dataframe(df_appointments, use_container_width=True)
-        else:
-            st.info("No appointments booked yet.")
-
-        # Find your appointment number in the list (based on currently selected/saved in session)
-        your_index = None
-        current_appointment_details = {
-            "Hospital": selected_hospital,
-            "Department": selected_department,
-            "Doctor": doctor_name,
-            "Date": appointment_date,
-            "Time": appointment_time # This needs to match the format from DB
-        }
+        self._display_appointment_history(results["history_total"], *results["history_page"])
 
-        for idx, appt in enumerate(booked_appointments):
-            # Convert DB time format (HH:MM:SS) to AM/PM for comparison if needed
-            db_time_am_pm = datetime.strptime(str(appt.get("appointment_time")), "%H:%M:%S").strftime("%I:%M %p") if isinstance(appt.get("appointment_time"), (str, type(None))) and appt.get("appointment_time") else appt.get("appointment_time")
-
-            if (
-                appt.get("hospital") == current_appointment_details["Hospital"] and
-                appt.get("department") == current_appointment_details["Department"] and
-                appt.get("doctor") == current_appointment_details["Doctor"] and
-                str(appt.get("appointment_date")) == current_appointment_details["Date"] and
-                db_time_am_pm == current_appointment_details["Time"]
-            ):
-                your_index = idx + 1
-                break
+        # Your live queue position for the selected doctor and day (O(log n) lookup)
+        your_token = None
+        queue = results.get("queue")
+        if queue is not None:
+            your_tokens = queue.tokens_for(username)
+            waiting = [token for token in your_tokens if queue.position(token) is not None]
+            your_token = waiting[0] if waiting else (your_tokens[-1] if your_tokens else None)
 
         # Show your appointment number
-        if your_index is not None:
-            st.success(f"**Your Appointment Number is: {your_index}**")
+        if your_token is not None:
+            people_ahead = queue.people_ahead(your_token)
+            st.success(f"**Your Appointment Number is: {your_token}**")
+            if people_ahead is not None:
+                st.info(f"⏳ Position in queue: **{people_ahead + 1}** ({people_ahead} patient(s) ahead of you)")
+                wait_minutes = self.wait_time_estimator.estimate_wait(
+                    selected_hospital, selected_department, doctor_name, people_ahead)
+                st.info(f"🕒 Estimated wait: **~{round(wait_minutes)} min** "
+                        f"(about {self.wait_time_estimator.consultation_minutes(selected_hospital, selected_department, doctor_name):.0f} min per patient)")
+            else:
+                st.info(f"Token {your_token} is no longer waiting ({queue.status(your_token).replace('_', ' ')}).")
         else:
             st.info("Your appointment details are not fully matched in the list.")
 
@@ -169,4 +177,46 @@ class AppointmentSummaryPage:
 
         payment_method = st.selectbox("💰 Select Payment Method", ["UPI", "Credit Card", "Debit Card", "Net Banking", "Cash"], key="payment_method_select")
         if st.button("💸 Pay Now", key="pay_now_button", help="Click to finalize your payment"):
-            st.success(f"✅ Payment of your appointment via **{payment_method}** successful! Thank you for booking with us. Your appointment is confirmed.")
\ No newline at end of file
+            st.success(f"✅ Payment of your appointment via **{payment_method}** successful! Thank you for booking with us. Your appointment is confirmed.")
+
+    @staticmethod
+    def _history_state():
+        """
+        Date filters and cursor stack for the history table, read before its widgets are
+        drawn so the page's reads can be issued up front (widget values live in session state).
+        """
+        filters = (st.session_state.get("appt_history_from"), st.session_state.get("appt_history_to"))
+        # Cursor stack: last element is the cursor for the page being shown (None = first page)
+        if st.session_state.get("appt_history_filters") != filters:
+            st.session_state.appt_history_filters = filters
+            st.session_state.appt_history_cursors = [None]
+        return filters[0], filters[1], st.session_state.appt_history_cursors
+
+    def _display_appointment_history(self, total, rows, next_cursor):
+        """Keyset-paginated appointment table; only the visible page is loaded."""
+        col_from, col_to = st.columns(2)
+        with col_from:
+            st.date_input("From", value=None, key="appt_history_from")
+        with col_to:
+            st.date_input("To", value=None, key="appt_history_to")
+
+        cursors = st.session_state.appt_history_cursors
+        if not rows:
+            st.info("No appointments booked yet.")
+            return
+
+        # Convert list of dictionaries to DataFrame for display
+        st.dataframe(pd.DataFrame(rows), use_container_width=True)
+
+        first = (len(cursors) - 1) * self.HISTORY_PAGE_SIZE + 1
+        col_prev, col_info, col_next = st.columns([1, 2, 1])
+        with col_prev:
+            if st.button("⬅️ Previous", disabled=len(cursors) == 1, key="appt_history_prev"):
+                cursors.pop()
+                st.rerun()
+        with col_info:
+            st.caption(f"Showing {first}–{first + len(rows) - 1} of {total}")
+        with col_next:
+            if st.button("Next ➡️", disabled=next_cursor is None, key="appt_history_next"):
+                cursors.append(next_cursor)
+                st.rerun()
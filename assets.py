@@ -0,0 +1,44 @@
+# assets.py
+"""
+Process-level cache for static assets bundled with the app.
+
+Files are read and base64-encoded once per process; every Streamlit rerun after
+that reuses the prebuilt CSS string, with no disk or network I/O.
+"""
+import base64
+import os
+from functools import lru_cache
+
+ASSET_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKGROUND_IMAGE = os.path.join(ASSET_DIR, "quemain.png")
+
+
+@lru_cache(maxsize=None)
+def image_data_uri(image_file):
+    """Return a data: URI for a local image, or None if the file doesn't exist."""
+    if not os.path.isfile(image_file):
+        return None
+    ext = image_file.rsplit('.', 1)[-1].lower()
+    mime = "png" if ext == "png" else "jpeg"
+    with open(image_file, "rb") as image:
+        encoded = base64.b64encode(image.read()).decode()
+    return f"data:image/{mime};base64,{encoded}"
+
+
+@lru_cache(maxsize=None)
+def background_css(image_file=BACKGROUND_IMAGE):
+    """Full-page background <style> block for a local image, or None if the file is missing."""
+    data_uri = image_data_uri(image_file)
+    if data_uri is None:
+        return None
+    return f"""
+    <style>
+    .stApp {{
+        background-image: url("{data_uri}");
+        background-size: cover;
+        background-repeat: no-repeat;
+        background-attachment: fixed;
+        background-position: center;
+    }}
+    </style>
+    """
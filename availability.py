@@ -0,0 +1,164 @@
+# availability.py
+"""
+Doctor availability as per-day slot bitmaps.
+
+Each doctor's working day is split into fixed slots (from the catalog
+schedule); slot i is bit i of an int. The calendar keeps one "full" bitmap per
+doctor per day, loaded for the whole booking horizon with a single grouped
+query and updated in place after every reservation, so free/busy checks are a
+bit test and "next available slot" is a lowest-set-bit search per day.
+"""
+import threading
+from datetime import date, datetime, time, timedelta
+from time import monotonic
+import config
+from catalog import get_catalog
+
+
+class DoctorSchedule:
+    """A doctor's working hours expressed as slot indexes."""
+
+    def __init__(self, start="09:00", end="17:00", slot_minutes=30, weekdays=(0, 1, 2, 3, 4)):
+        start_t, end_t = time.fromisoformat(start), time.fromisoformat(end)
+        self.start_minute = start_t.hour * 60 + start_t.minute
+        self.slot_minutes = slot_minutes
+        self.slot_count = max(0, (end_t.hour * 60 + end_t.minute - self.start_minute) // slot_minutes)
+        self.weekdays = frozenset(weekdays)
+        self.day_mask = (1 << self.slot_count) - 1
+
+    def working_mask(self, day):
+        return self.day_mask if day.weekday() in self.weekdays else 0
+
+    def slot_index(self, slot_time):
+        """Index of the slot starting exactly at `slot_time`, or None if it isn't a slot start."""
+        if isinstance(slot_time, timedelta): # pymysql returns TIME columns as timedelta
+            seconds = int(slot_time.total_seconds())
+            if not 0 <= seconds < 86400:
+                return None
+            slot_time = time(seconds // 3600, seconds // 60 % 60, seconds % 60)
+        offset = slot_time.hour * 60 + slot_time.minute - self.start_minute
+        if offset < 0 or offset % self.slot_minutes or slot_time.second:
+            return None
+        index = offset // self.slot_minutes
+        return index if index < self.slot_count else None
+
+    def slot_time(self, index):
+        minute = self.start_minute + index * self.slot_minutes
+        return time(minute // 60, minute % 60)
+
+    def past_mask(self, now):
+        """Bits for today's slots that have already started."""
+        elapsed = now.hour * 60 + now.minute - self.start_minute
+        if elapsed < 0:
+            return 0
+        started = min(self.slot_count, elapsed // self.slot_minutes + 1)
+        return (1 << started) - 1
+
+
+class AvailabilityCalendar:
+    """Process-wide free/busy bitmaps for every doctor over the booking horizon."""
+
+    def __init__(self, db_manager, horizon_days=28, refresh_seconds=300.0):
+        self.db_manager = db_manager
+        self.horizon_days = horizon_days
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._full = {} # (hospital, department, doctor) -> {date: bitmap of full slots}
+        self._schedules = {} # (catalog version, doctor key) -> DoctorSchedule
+        self._window = None # (first_day, last_day) currently loaded
+        self._loaded_at = 0.0
+
+    def schedule(self, hospital, department, doctor):
+        catalog = get_catalog()
+        key = (catalog.version, hospital, department, doctor)
+        schedule = self._schedules.get(key)
+        if schedule is None:
+            schedule = self._schedules[key] = DoctorSchedule(**catalog.doctor_schedule(hospital, department, doctor))
+        return schedule
+
+    def _ensure_loaded(self, day):
+        """Load (or refresh) full slots for the horizon chunk containing `day` in one query."""
+        with self._lock:
+            fresh = monotonic() - self._loaded_at < self.refresh_seconds
+            if fresh and self._window and self._window[0] <= day <= self._window[1]:
+                return
+            # Days past the default horizon load a whole chunk starting at `day`, so
+            # walking forward day by day costs one query per horizon, not per day
+            first = min(date.today(), day)
+            last = first + timedelta(days=self.horizon_days)
+            if day > last:
+                first, last = day, day + timedelta(days=self.horizon_days)
+            full = {}
+            for row in self.db_manager.get_full_slots(first, last):
+                doctor_key = (row['hospital'], row['department'], row['doctor'])
+                index = self.schedule(*doctor_key).slot_index(row['appointment_time'])
+                if index is not None:
+                    days = full.setdefault(doctor_key, {})
+                    days[row['appointment_date']] = days.get(row['appointment_date'], 0) | (1 << index)
+            self._full, self._window, self._loaded_at = full, (first, last), monotonic()
+
+    def _free_mask(self, hospital, department, doctor, day, now=None):
+        schedule = self.schedule(hospital, department, doctor)
+        full = self._full.get((hospital, department, doctor), {}).get(day, 0)
+        free = schedule.working_mask(day) & ~full
+        now = now or datetime.now()
+        if day == now.date():
+            free &= ~schedule.past_mask(now.time())
+        elif day < now.date():
+            free = 0
+        return free, schedule
+
+    def is_free(self, hospital, department, doctor, day, slot_time):
+        """O(1) check that `slot_time` is a bookable, not-yet-full slot."""
+        self._ensure_loaded(day)
+        free, schedule = self._free_mask(hospital, department, doctor, day)
+        index = schedule.slot_index(slot_time)
+        return index is not None and bool(free >> index & 1)
+
+    def free_slots(self, hospital, department, doctor, day):
+        """Start times of every free slot on `day`, in order."""
+        self._ensure_loaded(day)
+        free, schedule = self._free_mask(hospital, department, doctor, day)
+        slots = []
+        while free:
+            lowest = free & -free
+            slots.append(schedule.slot_time(lowest.bit_length() - 1))
+            free ^= lowest
+        return slots
+
+    def next_available(self, hospital, department, doctor, start_day=None, max_days=None):
+        """(date, time) of the earliest free slot on or after `start_day`, or None within `max_days`."""
+        day = start_day or date.today()
+        for offset in range(max_days or self.horizon_days):
+            candidate = day + timedelta(days=offset)
+            self._ensure_loaded(candidate)
+            free, schedule = self._free_mask(hospital, department, doctor, candidate)
+            if free:
+                return candidate, schedule.slot_time((free & -free).bit_length() - 1)
+        return None
+
+    def mark_full(self, hospital, department, doctor, day, slot_time):
+        """Record that a slot has no capacity left (after a booking filled it, or a SLOT_FULL result)."""
+        index = self.schedule(hospital, department, doctor).slot_index(slot_time)
+        if index is None:
+            return
+        with self._lock:
+            days = self._full.setdefault((hospital, department, doctor), {})
+            days[day] = days.get(day, 0) | (1 << index)
+
+
+_CALENDAR = None
+_CALENDAR_LOCK = threading.Lock()
+
+
+def get_availability_calendar(db_manager):
+    """Return the process-wide AvailabilityCalendar, creating it with `db_manager` on first call."""
+    global _CALENDAR
+    with _CALENDAR_LOCK:
+        if _CALENDAR is None:
+            _CALENDAR = AvailabilityCalendar(
+                db_manager,
+                horizon_days=config.AVAILABILITY_HORIZON_DAYS,
+                refresh_seconds=config.AVAILABILITY_REFRESH_SECONDS,
+            )
+        return _CALENDAR
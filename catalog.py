@@ -0,0 +1,178 @@
+# catalog.py
+"""
+Hospital / department / doctor / service catalog.
+
+Loaded once per process from hospital_catalog.json (path from config) with
+every lookup index prebuilt, so pages get O(1) answers from one source of
+truth. The file is re-checked at most every CATALOG_RELOAD_INTERVAL seconds
+and reloaded when it changes; each load carries a version stamp.
+"""
+import hashlib
+import json
+import os
+import sys
+import threading
+from time import monotonic
+import config
+
+
+class Catalog:
+    """Immutable, fully indexed snapshot of the catalog file."""
+
+    def __init__(self, data, version):
+        self.version = version
+        self.currency = data.get("currency", "₹")
+        self._hospitals = {} # name -> hospital dict
+        self._departments = {} # (hospital, department) -> department dict
+        self._doctors = {} # doctor id -> doctor dict
+        self._doctors_by_name = {} # (hospital, department, doctor name) -> doctor dict
+        self._service_index = {} # service name -> [(hospital, department, fee)]
+        self._medical_shops = data.get("medical_shops", [])
+        self.default_schedule = data.get(
+            "default_schedule", {"start": "09:00", "end": "17:00", "slot_minutes": 30, "weekdays": [0, 1, 2, 3, 4]}
+        )
+
+        for hospital in data["hospitals"]:
+            self._hospitals[hospital["name"]] = hospital
+            for department in hospital["departments"]:
+                key = (hospital["name"], department["name"])
+                self._departments[key] = department
+                for doctor in department.get("doctors", []):
+                    # Denormalised fields the pages display or store with a booking
+                    doctor.update(
+                        hospital=hospital["name"],
+                        department=department["name"],
+                        experience=f"{doctor['experience_years']} years",
+                    )
+                    doctor["label"] = (
+                        f"{doctor['name']} (⭐ {doctor['rating']}) - {doctor['qualification']} - {doctor['experience']}"
+                    )
+                    self._doctors[doctor["id"]] = doctor
+                    self._doctors_by_name[key + (doctor["name"],)] = doctor
+                for service, fee in department.get("services", {}).items():
+                    self._service_index.setdefault(service, []).append(key + (fee,))
+
+        # Precomputed name lists for selectboxes
+        self._hospital_names = list(self._hospitals)
+        self._bookable_hospitals = [
+            name for name in self._hospital_names
+            if any(dept.get("doctors") for dept in self._hospitals[name]["departments"])
+        ]
+        self._department_names = {
+            name: [dept["name"] for dept in hospital["departments"]] for name, hospital in self._hospitals.items()
+        }
+        self._bookable_departments = {
+            name: [dept["name"] for dept in hospital["departments"] if dept.get("doctors")]
+            for name, hospital in self._hospitals.items()
+        }
+
+    # --- Hospitals & departments ---
+    def hospital_names(self):
+        return self._hospital_names
+
+    def bookable_hospitals(self):
+        """Hospitals with at least one doctor taking appointments."""
+        return self._bookable_hospitals
+
+    def department_names(self, hospital):
+        return self._department_names.get(hospital, [])
+
+    def bookable_departments(self, hospital):
+        return self._bookable_departments.get(hospital, [])
+
+    def hospital(self, name):
+        return self._hospitals.get(name)
+
+    def hospital_location(self, name):
+        """(lat, lon) of a hospital, or None if it has no coordinates."""
+        hospital = self._hospitals.get(name)
+        if hospital is None or "lat" not in hospital:
+            return None
+        return hospital["lat"], hospital["lon"]
+
+    # --- Medical shops ---
+    def medical_shops(self):
+        return self._medical_shops
+
+    # --- Doctors ---
+    def doctors(self, hospital, department):
+        department = self._departments.get((hospital, department))
+        return department.get("doctors", []) if department else []
+
+    def doctor(self, doctor_id):
+        return self._doctors.get(doctor_id)
+
+    def doctor_by_name(self, hospital, department, name):
+        return self._doctors_by_name.get((hospital, department, name))
+
+    def all_doctors(self):
+        return self._doctors.values()
+
+    def doctor_schedule(self, hospital, department, name):
+        """Working hours for a doctor: their own "schedule" entry, else the catalog default."""
+        doctor = self._doctors_by_name.get((hospital, department, name))
+        return (doctor or {}).get("schedule", self.default_schedule)
+
+    # --- Services & fees ---
+    def services(self, hospital, department):
+        """{service: fee} for one department."""
+        department = self._departments.get((hospital, department))
+        return department.get("services", {}) if department else {}
+
+    def hospitals_offering(self, service):
+        """[(hospital, department, fee)] for every department offering `service`."""
+        return self._service_index.get(service, [])
+
+    def format_fee(self, fee):
+        return f"{self.currency}{fee}"
+
+
+def load_catalog(path):
+    with open(path, "rb") as catalog_file:
+        raw = catalog_file.read()
+    version = hashlib.sha1(raw).hexdigest()[:12]
+    return Catalog(json.loads(raw.decode("utf-8")), version)
+
+
+class _CatalogHolder:
+    """Keeps the current Catalog and swaps in a new one when the file changes."""
+
+    def __init__(self, path, reload_interval):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._catalog = None
+        self._mtime = None
+        self._checked_at = 0.0
+
+    def get(self):
+        now = monotonic()
+        if self._catalog is not None and now - self._checked_at < self.reload_interval:
+            return self._catalog
+        with self._lock:
+            if self._catalog is None or now - self._checked_at >= self.reload_interval:
+                self._checked_at = now
+                try:
+                    mtime = os.path.getmtime(self.path)
+                    if mtime == self._mtime:
+                        return self._catalog
+                    catalog = load_catalog(self.path)
+                except (OSError, ValueError, KeyError) as e:
+                    if self._catalog is None:
+                        raise
+                    # Keep serving the last good catalog if an edit left the file invalid or
+                    # briefly missing (e.g. mid atomic rename)
+                    print(f"Error reloading catalog {self.path}: {e}", file=sys.stderr)
+                    return self._catalog
+                if self._catalog is None or catalog.version != self._catalog.version:
+                    self._catalog = catalog
+                self._mtime = mtime
+            return self._catalog
+
+
+_HOLDER = _CatalogHolder(config.CATALOG_PATH, config.CATALOG_RELOAD_INTERVAL)
+
+
+def get_catalog():
+    """The current process-wide Catalog (hot-reloaded when the data file changes)."""
+    return _HOLDER.get()
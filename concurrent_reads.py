@@ -0,0 +1,98 @@
+# concurrent_reads.py
+"""
+Run a page's independent database reads in parallel.
+
+A page declares the reads it needs as {name: read(fn, *args, timeout=..., default=...)}
+and gets every result back together, so its latency is the slowest read rather
+than the sum of all of them. Each read has its own deadline: one that fails or
+overruns yields its default (and is listed in `errors`) instead of failing the
+page. Reads run on a small process-wide thread pool, each on its own pooled
+connection, in a copy of the caller's context so per-rerun DB counters still
+see them and query metrics file them under the page that asked for them.
+"""
+import contextvars
+import sys
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from time import perf_counter
+import config
+from query_metrics import run_from_site, submitting_site
+
+Read = namedtuple("Read", ["fn", "args", "timeout", "default"])
+
+
+def read(fn, *args, timeout=None, default=None):
+    """Declare one read: `fn(*args)`, abandoned after `timeout` seconds in favour of `default`."""
+    return Read(fn, args, timeout, default)
+
+
+class ReadTimeout(Exception):
+    """A read did not finish within its timeout."""
+
+
+class ReadResults(dict):
+    """name -> value. Failed or timed-out reads hold their default and appear in `errors`."""
+
+    def __init__(self):
+        super().__init__()
+        self.errors = {}
+        self.seconds = {} # Wall time per completed read
+
+
+class ConcurrentReader:
+    """Fans reads out over a bounded thread pool and gathers them with per-read deadlines."""
+
+    def __init__(self, max_workers=4, default_timeout=5.0):
+        self.default_timeout = default_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="qms-read")
+
+    @staticmethod
+    def _timed(spec):
+        started = perf_counter()
+        value = spec.fn(*spec.args)
+        return value, perf_counter() - started
+
+    def fetch(self, reads):
+        """Run every read in `reads` ({name: Read}) concurrently and return a ReadResults."""
+        # Even a single read goes through the pool: that's what enforces its deadline
+        results = ReadResults()
+        site = submitting_site()
+        started = perf_counter()
+        futures = {
+            name: self._executor.submit(contextvars.copy_context().run, run_from_site, site, self._timed, spec)
+            for name, spec in reads.items()
+        }
+        for name, spec in reads.items():
+            timeout = spec.timeout if spec.timeout is not None else self.default_timeout
+            self._gather(results, name, spec, futures[name], timeout, max(0.0, started + timeout - perf_counter()))
+        return results
+
+    def _gather(self, results, name, spec, future, timeout, remaining):
+        try:
+            results[name], results.seconds[name] = future.result(timeout=remaining)
+        except FutureTimeout:
+            # The read keeps running in its worker; its result is simply not waited for
+            results[name] = spec.default
+            results.errors[name] = ReadTimeout(f"'{name}' did not finish within {timeout:g}s")
+            print(f"Concurrent read timed out: {name} ({timeout:g}s)", file=sys.stderr)
+        except Exception as e:
+            results[name] = spec.default
+            results.errors[name] = e
+            print(f"Concurrent read failed: {name}: {e}", file=sys.stderr)
+
+
+_READER = None
+_READER_LOCK = threading.Lock()
+
+
+def get_concurrent_reader():
+    """Return the process-wide ConcurrentReader."""
+    global _READER
+    with _READER_LOCK:
+        if _READER is None:
+            _READER = ConcurrentReader(
+                max_workers=config.CONCURRENT_READ_WORKERS,
+                default_timeout=config.CONCURRENT_READ_TIMEOUT,
+            )
+        return _READER
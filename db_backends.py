@@ -0,0 +1,250 @@
+# db_backends.py
+"""
+Storage backends behind DBManager.
+
+Every backend exposes the same small surface so DBManager's SQL (written with
+pymysql-style %s placeholders and dict rows) runs unchanged on each engine.
+"""
+import sqlite3
+from contextlib import contextmanager
+from datetime import date, datetime, time
+from urllib.parse import urlparse, unquote
+
+
+class MySQLBackend:
+    """MySQL/MariaDB server accessed through pymysql."""
+
+    name = "mysql"
+    auto_create_schema = False
+
+    def __init__(self, host='localhost', port=3306, user='root', password='', database='queue_management_db'):
+        import pymysql # Imported here so SQLite-only deployments don't need the driver
+        self._pymysql = pymysql
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.database = database
+        self.Error = pymysql.Error
+        self.IntegrityError = pymysql.IntegrityError
+
+    @property
+    def pool_key(self):
+        return (self.name, self.host, self.port, self.user, self.database)
+
+    def connect(self):
+        return self._pymysql.connect(
+            host=self.host,
+            port=self.port,
+            user=self.user,
+            password=self.password,
+            database=self.database,
+            cursorclass=self._pymysql.cursors.DictCursor # Returns dictionaries
+        )
+
+    def ping(self, conn):
+        conn.ping(reconnect=False)
+
+    def prepare(self, query):
+        return query
+
+    def execute(self, cursor, query, params=None):
+        cursor.execute(query, params)
+
+    def upsert_sql(self, table, columns, key_columns, row_count=1):
+        """INSERT ... ON DUPLICATE KEY UPDATE for `row_count` rows; relies on a unique key over `key_columns`."""
+        placeholders = "(" + ", ".join(["%s"] * len(columns)) + ")"
+        updates = ", ".join(f"{col} = VALUES({col})" for col in columns if col not in key_columns)
+        return (
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES "
+            + ", ".join([placeholders] * row_count)
+            + f" ON DUPLICATE KEY UPDATE {updates}"
+        )
+
+    def insert_ignore_sql(self, table, columns):
+        """Insert one row unless it would violate a unique key; never errors on the duplicate."""
+        # A no-op ON DUPLICATE KEY UPDATE, unlike INSERT IGNORE, doesn't also swallow unrelated errors
+        placeholders = ", ".join(["%s"] * len(columns))
+        return (
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+            f" ON DUPLICATE KEY UPDATE {columns[0]} = {columns[0]}"
+        )
+
+    def increment_sql(self, table, key_columns, counter):
+        """Insert a row with `counter` = 1, or add 1 to it if the key already exists."""
+        placeholders = ", ".join(["%s"] * len(key_columns))
+        return (
+            f"INSERT INTO {table} ({', '.join(key_columns)}, {counter}) VALUES ({placeholders}, 1)"
+            f" ON DUPLICATE KEY UPDATE {counter} = {counter} + 1"
+        )
+
+    def hour_sql(self, column):
+        return f"HOUR({column})"
+
+    def column_exists(self, cursor, table, column):
+        self.execute(cursor, (
+            "SELECT COUNT(*) AS n FROM information_schema.columns"
+            " WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s"
+        ), (table, column))
+        return cursor.fetchone()['n'] > 0
+
+    def index_exists(self, cursor, table, index):
+        self.execute(cursor, (
+            "SELECT COUNT(*) AS n FROM information_schema.statistics"
+            " WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s"
+        ), (table, index))
+        return cursor.fetchone()['n'] > 0
+
+    def unique_key_exists(self, cursor, table, columns):
+        """True if some UNIQUE index or primary key covers exactly `columns`, in order."""
+        self.execute(cursor, (
+            "SELECT GROUP_CONCAT(column_name ORDER BY seq_in_index) AS cols FROM information_schema.statistics"
+            " WHERE table_schema = DATABASE() AND table_name = %s AND non_unique = 0 GROUP BY index_name"
+        ), (table,))
+        return any(row['cols'] == ','.join(columns) for row in cursor.fetchall())
+
+    def is_retryable(self, error):
+        # 1205: lock wait timeout, 1213: deadlock - both safe to retry the whole transaction
+        return bool(error.args) and error.args[0] in (1205, 1213)
+
+    @contextmanager
+    def cursor(self, conn):
+        with conn.cursor() as cursor:
+            yield cursor
+
+    @contextmanager
+    def streaming_cursor(self, conn):
+        """Unbuffered server-side cursor: rows are pulled from MySQL as they're fetched."""
+        with conn.cursor(self._pymysql.cursors.SSDictCursor) as cursor:
+            yield cursor
+
+
+def _dict_row(cursor, row):
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+# Explicit adapters/converters so DATE/TIME/DATETIME columns round-trip as
+# Python objects, the same way pymysql returns them from MySQL.
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_adapter(time, lambda value: value.isoformat())
+sqlite3.register_converter("DATE", lambda raw: date.fromisoformat(raw.decode()))
+sqlite3.register_converter("TIME", lambda raw: time.fromisoformat(raw.decode()))
+sqlite3.register_converter("DATETIME", lambda raw: datetime.fromisoformat(raw.decode()))
+
+
+class SQLiteBackend:
+    """Embedded SQLite database file in WAL mode; no server or network round trips."""
+
+    name = "sqlite"
+    auto_create_schema = True
+
+    def __init__(self, path, busy_timeout=5.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.Error = sqlite3.Error
+        self.IntegrityError = sqlite3.IntegrityError
+
+    @property
+    def pool_key(self):
+        return (self.name, self.path)
+
+    def connect(self):
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            check_same_thread=False, # Pooled connections move between Streamlit threads
+        )
+        conn.row_factory = _dict_row
+        conn.execute("PRAGMA journal_mode=WAL") # Readers never block the single writer
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    def ping(self, conn):
+        conn.execute("SELECT 1")
+
+    def prepare(self, query):
+        return query.replace("%s", "?")
+
+    def execute(self, cursor, query, params=None):
+        cursor.execute(self.prepare(query), params if params is not None else ())
+
+    def upsert_sql(self, table, columns, key_columns, row_count=1):
+        """INSERT ... ON CONFLICT DO UPDATE for `row_count` rows; relies on a unique key over `key_columns`."""
+        placeholders = "(" + ", ".join(["%s"] * len(columns)) + ")"
+        updates = ", ".join(f"{col} = excluded.{col}" for col in columns if col not in key_columns)
+        return (
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES "
+            + ", ".join([placeholders] * row_count)
+            + f" ON CONFLICT ({', '.join(key_columns)}) DO UPDATE SET {updates}"
+        )
+
+    def insert_ignore_sql(self, table, columns):
+        """Insert one row unless it would violate a unique key; never errors on the duplicate."""
+        placeholders = ", ".join(["%s"] * len(columns))
+        return f"INSERT OR IGNORE INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+
+    def increment_sql(self, table, key_columns, counter):
+        """Insert a row with `counter` = 1, or add 1 to it if the key already exists."""
+        placeholders = ", ".join(["%s"] * len(key_columns))
+        return (
+            f"INSERT INTO {table} ({', '.join(key_columns)}, {counter}) VALUES ({placeholders}, 1)"
+            f" ON CONFLICT ({', '.join(key_columns)}) DO UPDATE SET {counter} = {counter} + 1"
+        )
+
+    def hour_sql(self, column):
+        return f"CAST(strftime('%H', {column}) AS INTEGER)"
+
+    def column_exists(self, cursor, table, column):
+        cursor.execute(f"PRAGMA table_info({table})")
+        return any(row['name'] == column for row in cursor.fetchall())
+
+    def index_exists(self, cursor, table, index):
+        cursor.execute("SELECT COUNT(*) AS n FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND name = ?", (table, index))
+        return cursor.fetchone()['n'] > 0
+
+    def unique_key_exists(self, cursor, table, columns):
+        """True if some UNIQUE index (including inline UNIQUE constraints) covers exactly `columns`, in order."""
+        cursor.execute(f"PRAGMA index_list({table})")
+        for index in [row['name'] for row in cursor.fetchall() if row['unique']]:
+            cursor.execute(f"PRAGMA index_info({index})")
+            if [row['name'] for row in sorted(cursor.fetchall(), key=lambda r: r['seqno'])] == list(columns):
+                return True
+        return False
+
+    def is_retryable(self, error):
+        message = str(error).lower()
+        return isinstance(error, sqlite3.OperationalError) and ("locked" in message or "busy" in message)
+
+    @contextmanager
+    def cursor(self, conn):
+        cursor = conn.cursor()
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+
+    # SQLite cursors already step through results lazily
+    streaming_cursor = cursor
+
+
+def backend_from_url(url, sqlite_busy_timeout=5.0):
+    """Build a backend from a DATABASE_URL such as mysql://u:p@host/db or sqlite:///file.db."""
+    parsed = urlparse(url)
+    scheme = parsed.scheme.split("+")[0]
+    if scheme == "mysql":
+        return MySQLBackend(
+            host=parsed.hostname or 'localhost',
+            port=parsed.port or 3306,
+            user=unquote(parsed.username or 'root'),
+            password=unquote(parsed.password or ''),
+            database=parsed.path.lstrip("/") or 'queue_management_db',
+        )
+    if scheme == "sqlite":
+        # sqlite:///relative.db -> "relative.db", sqlite:////abs/path.db -> "/abs/path.db"
+        path = url.split("://", 1)[1]
+        path = path[1:] if path.startswith("/") else path
+        return SQLiteBackend(unquote(path) or "queue_management.db", busy_timeout=sqlite_busy_timeout)
+    raise ValueError(f"Unsupported DATABASE_URL scheme: {parsed.scheme!r}")
@@ -1,77 +1,515 @@
 # db_manager.py
-import pymysql
-import pandas as pd
-from datetime import datetime, date, time
+from datetime import datetime, date, time, timedelta
+import re
 import sys # Import sys for printing errors to stderr
+import threading
+from collections import deque
+from collections import namedtuple
+from contextlib import contextmanager
+from time import monotonic, perf_counter
+import config
+import schema
+from concurrent_reads import get_concurrent_reader
+from db_backends import backend_from_url
+from read_cache import UserReadCache
+from password_hashing import verify_password
+from query_metrics import call_site, get_query_metrics, note_db_call
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes free within the wait timeout."""
+
+
+class ConnectionPool:
+    """
+    Thread-safe, bounded pool of warm database connections.
+
+    Connections are handed out LIFO so the most recently used (warmest) one is
+    reused first, checked with a ping before use if it has been idle longer than
+    `ping_after` (a busy pool skips the extra round trip), and closed once they
+    have sat idle longer than `idle_timeout` (never dropping below `min_size`).
+    """
+
+    def __init__(self, connect_fn, min_size=1, max_size=10, idle_timeout=300.0,
+                 wait_timeout=5.0, ping_fn=None, ping_after=30.0):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError("Pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1")
+        self._connect_fn = connect_fn
+        self._ping_fn = ping_fn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.wait_timeout = wait_timeout
+        self.ping_after = ping_after
+        self._idle = deque() # (connection, last_used) pairs, newest on the right
+        self._size = 0 # Idle + checked-out connections
+        self._cond = threading.Condition()
+        self._stats = {
+            "checkouts": 0,
+            "created": 0,
+            "closed": 0,
+            "evicted_idle": 0,
+            "health_check_failures": 0,
+            "waits": 0,
+            "wait_timeouts": 0,
+            "total_wait_seconds": 0.0,
+            "max_wait_seconds": 0.0,
+        }
+
+    def prewarm(self):
+        """Open connections until the pool holds at least `min_size`."""
+        while True:
+            with self._cond:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn = self._create()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            self.release(conn)
+
+    def acquire(self):
+        """Check out a healthy connection, waiting up to `wait_timeout` seconds."""
+        started = monotonic()
+        waited = False
+        idle_since = None
+        with self._cond:
+            while True:
+                self._evict_idle_locked()
+                if self._idle:
+                    conn, idle_since = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    conn = None
+                    break
+                remaining = self.wait_timeout - (monotonic() - started)
+                if remaining <= 0:
+                    # A wait that ends in a timeout still counts as a wait
+                    self._record_wait_locked(started)
+                    self._stats["wait_timeouts"] += 1
+                    raise PoolTimeout(f"No database connection available within {self.wait_timeout}s")
+                waited = True
+                self._cond.wait(remaining)
+            if waited:
+                self._record_wait_locked(started)
+            self._stats["checkouts"] += 1
+
+        if conn is not None and not self._is_healthy(conn, monotonic() - idle_since):
+            with self._cond:
+                self._stats["health_check_failures"] += 1
+            self._close(conn)
+            conn = None
+        if conn is None:
+            try:
+                conn = self._create()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+        return conn
+
+    def release(self, conn, discard=False):
+        """Return a connection to the pool, or close it if `discard` is set or it was closed."""
+        if discard or not self._is_open(conn):
+            self._close(conn)
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            return
+        with self._cond:
+            self._idle.append((conn, monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        discard = False
+        try:
+            yield conn
+        except BaseException:
+            discard = not self._is_open(conn)
+            raise
+        finally:
+            self.release(conn, discard=discard)
+
+    def close_all(self):
+        with self._cond:
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            self._close(conn)
+
+    def stats(self):
+        with self._cond:
+            snapshot = dict(self._stats)
+            snapshot.update(size=self._size, idle=len(self._idle), in_use=self._size - len(self._idle),
+                            min_size=self.min_size, max_size=self.max_size)
+        return snapshot
+
+    def _record_wait_locked(self, started):
+        elapsed = monotonic() - started
+        self._stats["waits"] += 1
+        self._stats["total_wait_seconds"] += elapsed
+        self._stats["max_wait_seconds"] = max(self._stats["max_wait_seconds"], elapsed)
+
+    def _evict_idle_locked(self):
+        # Oldest idle connections sit on the left; stop at the first fresh one.
+        now = monotonic()
+        while self._idle and self._size > self.min_size and now - self._idle[0][1] > self.idle_timeout:
+            conn, _ = self._idle.popleft()
+            self._size -= 1
+            self._stats["evicted_idle"] += 1
+            self._close_quietly_locked(conn)
+
+    def _close_quietly_locked(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self._stats["closed"] += 1
+
+    def _create(self):
+        conn = self._connect_fn()
+        with self._cond:
+            self._stats["created"] += 1
+        return conn
+
+    def _close(self, conn):
+        with self._cond:
+            self._close_quietly_locked(conn)
+
+    def _is_open(self, conn):
+        return getattr(conn, "open", True)
+
+    def _is_healthy(self, conn, idle_seconds):
+        if not self._is_open(conn):
+            return False
+        if self._ping_fn is None or idle_seconds <= self.ping_after:
+            return True
+        try:
+            self._ping_fn(conn)
+            return True
+        except Exception:
+            return False
+
+
+class ReservationStatus:
+    """Outcome codes returned by DBManager.reserve_appointment."""
+    RESERVED = "reserved"
+    SLOT_FULL = "slot_full"
+    ALREADY_BOOKED = "already_booked"
+    ERROR = "error"
+
+
+class _SlotFull(Exception):
+    """Internal signal used to roll back a reservation whose slot has no capacity left."""
+
+
+ReservationResult = namedtuple("ReservationResult", ["status", "appointment_id", "remaining"])
+
+
+class _Transaction:
+    """Cursor wrapper handed out by DBManager._transaction; translates placeholders per backend."""
+
+    def __init__(self, backend, cursor, record=None, connect_seconds=None):
+        self.backend = backend
+        self.cursor = cursor
+        self._record = record
+        self._connect_seconds = connect_seconds # Charged to the transaction's first statement
+
+    def execute(self, query, params=None):
+        if self._record is None:
+            self.backend.execute(self.cursor, query, params)
+            return self.cursor
+        started = perf_counter()
+        try:
+            self.backend.execute(self.cursor, query, params)
+        except self.backend.Error:
+            self._record(query, self._connect_seconds, perf_counter() - started, error=True, params=params)
+            raise
+        self._record(query, self._connect_seconds, perf_counter() - started, rows=self.cursor.rowcount, params=params)
+        self._connect_seconds = None
+        return self.cursor
+
+
+_BP_PATTERN = re.compile(r"^\s*(\d{2,3})\s*/\s*(\d{2,3})\s*$")
+
+
+def parse_bp(bp):
+    """Split a "120/80" reading into (systolic, diastolic) ints; (None, None) if it doesn't parse."""
+    match = _BP_PATTERN.match(bp or "")
+    return (int(match.group(1)), int(match.group(2))) if match else (None, None)
+
+
+# One pool and one read cache per database target, shared by every DBManager in the process.
+_POOLS = {}
+_READ_CACHES = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_pool(key, factory):
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            pool = _POOLS[key] = factory()
+        return pool
+
+
+def get_read_cache(key):
+    with _POOLS_LOCK:
+        cache = _READ_CACHES.get(key)
+        if cache is None:
+            cache = _READ_CACHES[key] = UserReadCache(ttl=config.READ_CACHE_TTL, max_users=config.READ_CACHE_MAX_USERS)
+        return cache
+
 
 class DBManager:
-    """Manages database connections and CRUD operations using pymysql."""
+    """Manages database connections and CRUD operations on the configured storage backend."""
+
+    UPSERT_CHUNK_SIZE = 500 # Rows per multi-row upsert statement (keeps under driver parameter limits)
 
-    def __init__(self, host='localhost', user='root', password='root', db='queue_management_db'):
-        self.host = host
-        self.user = user
-        self.password = password
-        self.db = db
-        self.conn = None
+    def __init__(self, database_url=None, backend=None):
+        # Backend and DSN come from config.DATABASE_URL unless explicitly injected
+        self.backend = backend or backend_from_url(
+            database_url or config.DATABASE_URL, sqlite_busy_timeout=config.SQLITE_BUSY_TIMEOUT
+        )
+        self.pool = get_pool(self.backend.pool_key, self._create_pool)
+        self.read_cache = get_read_cache(self.backend.pool_key)
+        self.metrics = get_query_metrics()
+
+    def _create_pool(self):
+        pool = ConnectionPool(
+            self.connect,
+            min_size=config.DB_POOL_MIN_SIZE,
+            max_size=config.DB_POOL_MAX_SIZE,
+            idle_timeout=config.DB_POOL_IDLE_TIMEOUT,
+            wait_timeout=config.DB_POOL_WAIT_TIMEOUT,
+            ping_fn=self.backend.ping,
+            ping_after=config.DB_POOL_PING_AFTER,
+        )
+        auto_create = config.DB_AUTO_CREATE_SCHEMA
+        if auto_create is None:
+            auto_create = self.backend.auto_create_schema
+        try:
+            pool.prewarm()
+            if auto_create:
+                with pool.connection() as conn:
+                    schema.migrate(self.backend, conn)
+        except self.backend.Error as e:
+            # The pool will retry connecting on first checkout
+            print(f"Error preparing {self.backend.name} database: {e}", file=sys.stderr)
+        return pool
 
     def connect(self):
         try:
-            self.conn = pymysql.connect(
-                host=self.host,
-                user=self.user,
-                password=self.password,
-                database=self.db,
-                cursorclass=pymysql.cursors.DictCursor # Returns dictionaries
-            )
-            # print("Connected to MySQL database!") # For debugging
-        except pymysql.Error as e:
+            return self.backend.connect()
+        except self.backend.Error as e:
             # Error 1 & 2 Fix: Replaced st.error with print to sys.stderr
-            print(f"Error connecting to MySQL: {e}", file=sys.stderr)
-            self.conn = None
+            print(f"Error connecting to {self.backend.name} database: {e}", file=sys.stderr)
             raise # Re-raise the exception so the calling code can handle it
 
-    def close(self):
-        if self.conn and self.conn.open:
-            self.conn.close()
-            # print("MySQL connection closed.") # For debugging
+    def _record(self, query, connect=None, execute=None, fetch=None, rows=None, error=False, params=None, site=None):
+        """Feed one statement's phase timings to the current rerun's DB counter and the query metrics."""
+        note_db_call(sum(phase for phase in (connect, execute, fetch) if phase is not None))
+        if self.metrics is not None:
+            site, method = site or call_site()
+            self.metrics.record(site, method, query, connect, execute, fetch, rows, error, params)
 
     def _execute_query(self, query, params=None, fetch_one=False, fetch_all=False):
-        # Attempt to connect/reconnect if connection is not open
-        if not self.conn or not self.conn.open:
-            try:
-                self.connect()
-            except pymysql.Error:
-                # If connect fails, the exception is already printed/raised.
-                # No need to print again here, just return None.
-                return None
-
-        if not self.conn: # If connection failed (e.g., due to previous `raise` in connect)
+        # Borrow a warm connection from the shared pool instead of connecting per query
+        started = perf_counter()
+        try:
+            conn = self.pool.acquire()
+        except self.backend.Error:
+            # If connect fails, the exception is already printed.
+            self._record(query, connect=perf_counter() - started, error=True, params=params)
+            return None
+        except PoolTimeout as e:
+            print(f"Database pool exhausted: {e} | Query: {query}", file=sys.stderr)
+            self._record(query, connect=perf_counter() - started, error=True, params=params)
             return None
 
+        connected = perf_counter()
+        discard = False
         try:
-            with self.conn.cursor() as cursor:
-                cursor.execute(query, params)
-                self.conn.commit()
+            with self.backend.cursor(conn) as cursor:
+                self.backend.execute(cursor, query, params)
+                conn.commit()
+                executed = perf_counter()
                 if fetch_one:
-                    return cursor.fetchone()
+                    result = cursor.fetchone()
+                    rows = 0 if result is None else 1
                 elif fetch_all:
-                    return cursor.fetchall()
-                return cursor.rowcount # For INSERT/UPDATE/DELETE
-        except pymysql.Error as e:
+                    result = cursor.fetchall()
+                    rows = len(result)
+                else:
+                    result = rows = cursor.rowcount # For INSERT/UPDATE/DELETE
+                fetched = perf_counter()
+                self._record(query, connected - started, executed - connected,
+                             fetched - executed if fetch_one or fetch_all else None, rows, params=params)
+                return result
+        except self.backend.Error as e:
+            self._record(query, connected - started, perf_counter() - connected, error=True, params=params)
             # Error 3 Fix: Replaced st.error with print to sys.stderr
             print(f"Database error during query execution: {e} | Query: {query} | Params: {params}", file=sys.stderr)
-            self.conn.rollback() # Rollback changes on error
+            try:
+                conn.rollback() # Rollback changes on error
+            except self.backend.Error:
+                discard = True # Connection is broken; don't hand it out again
             return None
         finally:
-            self.close() # Close connection after each operation for simplicity in Streamlit
+            self.pool.release(conn, discard=discard)
+
+    @contextmanager
+    def _transaction(self):
+        """Run several statements on one pooled connection; commit on success, roll back on error."""
+        started = perf_counter()
+        conn = self.pool.acquire()
+        discard = False
+        try:
+            with self.backend.cursor(conn) as cursor:
+                yield _Transaction(self.backend, cursor, self._record, perf_counter() - started)
+            conn.commit()
+        except BaseException:
+            try:
+                conn.rollback()
+            except self.backend.Error:
+                discard = True
+            raise
+        finally:
+            self.pool.release(conn, discard=discard)
+
+    @staticmethod
+    def _appointment_slot(appt_data):
+        """Return (date, time) objects for an appointment dict holding 'Date'/'Time' values or strings."""
+        appt_date_obj = appt_data['Date']
+        if isinstance(appt_date_obj, str):
+            appt_date_obj = date.fromisoformat(appt_date_obj)
+        appt_time_obj = appt_data['Time']
+        if isinstance(appt_time_obj, str):
+            # Assuming "HH:MM:SS" format for database TIME column
+            appt_time_obj = time.fromisoformat(appt_time_obj)
+        return appt_date_obj, appt_time_obj
+
+    def _stream_query(self, query, params=None, chunk_size=1000):
+        """
+        Yield rows from a server-side cursor, `chunk_size` at a time, so memory stays
+        constant however many rows match. Holds one pooled connection until exhausted.
+        """
+        # Resolved now: once the generator runs, the DBManager method that built it has returned
+        site = call_site() if self.metrics is not None else None
+        return self._stream_rows(query, params, chunk_size, site)
+
+    def _stream_rows(self, query, params, chunk_size, site):
+        started = perf_counter()
+        conn = self.pool.acquire()
+        connected = perf_counter()
+        executed, fetch_seconds, total_rows = None, 0.0, 0
+        finished = error = False
+        try:
+            with self.backend.streaming_cursor(conn) as cursor:
+                self.backend.execute(cursor, query, params)
+                executed = perf_counter()
+                while True:
+                    fetch_started = perf_counter()
+                    rows = cursor.fetchmany(chunk_size)
+                    fetch_seconds += perf_counter() - fetch_started # Time spent waiting on the consumer isn't counted
+                    if not rows:
+                        break
+                    total_rows += len(rows)
+                    yield from rows
+            conn.rollback() # End the read transaction before the connection is reused
+            finished = True
+        except self.backend.Error as e:
+            error = True
+            print(f"Database error while streaming: {e} | Query: {query} | Params: {params}", file=sys.stderr)
+            raise
+        finally:
+            # An abandoned unbuffered cursor still has rows in flight; don't reuse its connection
+            self.pool.release(conn, discard=not finished)
+            execute_seconds = (executed or perf_counter()) - connected
+            self._record(query, connected - started, execute_seconds, fetch_seconds, total_rows,
+                         error=error, params=params, site=site)
+
+    def fetch_concurrently(self, reads):
+        """
+        Run independent reads ({name: concurrent_reads.read(...)}) in parallel, each on its
+        own pooled connection, and return their results together as a ReadResults.
+        """
+        return get_concurrent_reader().fetch(reads)
 
     # --- User Management Operations ---
+    # Columns exposed for browsing; password is deliberately never selected
+    USER_COLUMNS = ("username", "full_name", "father_name", "dob", "email", "city", "state", "country")
+
+    def _user_projection(self, columns):
+        columns = tuple(columns) if columns else self.USER_COLUMNS
+        unknown = set(columns) - set(self.USER_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown or restricted user columns: {sorted(unknown)}")
+        return ", ".join(columns)
+
+    @staticmethod
+    def _user_filter(state=None, city=None, name_prefix=None):
+        clauses, params = [], []
+        if state:
+            clauses.append("state = %s")
+            params.append(state)
+        if city:
+            clauses.append("city = %s")
+            params.append(city)
+        if name_prefix:
+            # Escape LIKE wildcards so the prefix is matched literally
+            escaped = name_prefix.replace("!", "!!").replace("%", "!%").replace("_", "!_")
+            clauses.append("full_name LIKE %s ESCAPE '!'")
+            params.append(escaped + "%")
+        return clauses, params
+
     def get_users(self):
-        users_data = self._execute_query("SELECT * FROM users", fetch_all=True)
+        import pandas as pd # Imported on use so pages that never build DataFrames don't pay for pandas
+        users_data = self._execute_query(f"SELECT {self._user_projection(None)} FROM users", fetch_all=True)
         if users_data:
             return pd.DataFrame(users_data)
         return pd.DataFrame() # Return empty DataFrame if no users
 
+    def iter_users(self, columns=None, state=None, city=None, name_prefix=None, chunk_size=1000):
+        """Stream matching users one row at a time in username order (constant memory)."""
+        clauses, params = self._user_filter(state, city, name_prefix)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        query = f"SELECT {self._user_projection(columns)} FROM users{where} ORDER BY username"
+        return self._stream_query(query, tuple(params), chunk_size=chunk_size)
+
+    def find_users(self, state=None, city=None, name_prefix=None, columns=None, page_size=50, after=None):
+        """
+        One page of matching users ordered by username. Returns (rows, next_cursor);
+        pass next_cursor back as `after` for the following page.
+        """
+        columns = tuple(columns) if columns else self.USER_COLUMNS
+        if "username" not in columns:
+            columns = ("username",) + columns # Needed for the keyset cursor
+        clauses, params = self._user_filter(state, city, name_prefix)
+        if after is not None:
+            clauses.append("username > %s")
+            params.append(after)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        query = f"SELECT {self._user_projection(columns)} FROM users{where} ORDER BY username LIMIT %s"
+        rows = self._execute_query(query, tuple(params + [page_size + 1]), fetch_all=True)
+        if not rows:
+            return [], None
+        rows = list(rows)
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            return rows, rows[-1]['username']
+        return rows, None
+
     def add_user(self, user_data):
         # Ensure dob is a date object for PyMySQL or string in 'YYYY-MM-DD'
         dob_date = user_data['dob']
@@ -94,90 +532,166 @@ class DBManager:
         return bool(self._execute_query(query, (username,), fetch_one=True))
 
     def check_credentials(self, username, password):
-        query = "SELECT 1 FROM users WHERE username = %s AND password = %s"
-        return bool(self._execute_query(query, (username, password), fetch_one=True))
+        # Passwords are hashed, so compare in Python rather than in SQL
+        row = self.get_user_credentials(username)
+        return bool(row) and verify_password(password, row['password'])
+
+    def get_user_credentials(self, username):
+        """
+        The stored password hash for `username` in one round trip: the row, an empty
+        dict if there is no such user, or None if the query failed.
+        """
+        query = "SELECT username, password FROM users WHERE username = %s"
+        rows = self._execute_query(query, (username,), fetch_all=True)
+        if rows is None:
+            return None
+        return rows[0] if rows else {}
+
+    def update_password_hash(self, username, old_value, new_hash):
+        # Compare-and-set so a concurrent password change is never overwritten
+        query = "UPDATE users SET password = %s WHERE username = %s AND password = %s"
+        return self._execute_query(query, (new_hash, username, old_value))
+
+    def _upsert(self, table, columns, key_columns, rows):
+        """Upsert `rows` in as few statements as possible (one per UPSERT_CHUNK_SIZE rows)."""
+        rows = list(rows)
+        if not rows:
+            return 0
+        affected = 0
+        for start in range(0, len(rows), self.UPSERT_CHUNK_SIZE):
+            chunk = rows[start:start + self.UPSERT_CHUNK_SIZE]
+            query = self.backend.upsert_sql(table, columns, key_columns, row_count=len(chunk))
+            params = tuple(value for row in chunk for value in row)
+            result = self._execute_query(query, params)
+            if result is None:
+                return None
+            affected += result
+        return affected
 
     # --- Health Data Operations (for PatientHealthDataPage) ---
+    HEALTH_DATA_COLUMNS = ("username", "weight", "height", "symptoms", "pre_meds", "bp", "bp_systolic", "bp_diastolic", "record_date")
+
     def save_health_data(self, username, health_data):
-        # Ensure record_date is a date object
-        record_date_obj = health_data['record_date']
-        if isinstance(record_date_obj, str):
-            record_date_obj = date.fromisoformat(record_date_obj)
-
-        # Attempt to update if record for today exists, else insert
-        query_check = "SELECT health_id FROM health_data WHERE username = %s AND record_date = %s"
-        existing_record = self._execute_query(query_check, (username, record_date_obj), fetch_one=True)
-
-        if existing_record:
-            query = """
-            UPDATE health_data SET weight = %s, height = %s, symptoms = %s, pre_meds = %s, bp = %s
-            WHERE health_id = %s
-            """
-            params = (
-                health_data['weight'], health_data['height'], health_data['symptoms'],
-                health_data['pre_meds'], health_data['bp'], existing_record['health_id']
-            )
-        else:
-            query = """
-            INSERT INTO health_data (username, weight, height, symptoms, pre_meds, bp, record_date)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """
-            params = (
+        # Single atomic upsert keyed on (username, record_date) - no check-then-write race
+        return self.save_health_data_batch([(username, health_data)])
+
+    def save_health_data_batch(self, records):
+        """Upsert many (username, health_data) pairs in one statement."""
+        rows = []
+        for username, health_data in records:
+            # Ensure record_date is a date object
+            record_date_obj = health_data['record_date']
+            if isinstance(record_date_obj, str):
+                record_date_obj = date.fromisoformat(record_date_obj)
+            rows.append((
                 username, health_data['weight'], health_data['height'], health_data['symptoms'],
-                health_data['pre_meds'], health_data['bp'], record_date_obj
-            )
-        return self._execute_query(query, params)
+                health_data['pre_meds'], health_data['bp'], *parse_bp(health_data['bp']), record_date_obj
+            ))
+        result = self._upsert("health_data", self.HEALTH_DATA_COLUMNS, ("username", "record_date"), rows)
+        for username in {row[0] for row in rows}:
+            self.read_cache.invalidate(username)
+        return result
 
     def get_last_health_data(self, username):
+        # Served from the per-user read cache; save_health_data invalidates it
+        # fetch_all tells "no rows" ([]) apart from a failed query (None), which isn't cached
         query = "SELECT * FROM health_data WHERE username = %s ORDER BY record_date DESC LIMIT 1"
-        return self._execute_query(query, (username,), fetch_one=True)
+        rows = self.read_cache.cached(
+            username, "last_health_data", lambda: self._execute_query(query, (username,), fetch_all=True),
+            cacheable=lambda result: result is not None,
+        )
+        return dict(rows[0]) if rows else None
 
     # --- Appointment Operations ---
-    def add_booked_appointment(self, username, appt_data):
-        # Ensure date and time are appropriate objects
-        appt_date_obj = appt_data['Date']
-        if isinstance(appt_date_obj, str):
-            appt_date_obj = date.fromisoformat(appt_date_obj)
-
-        appt_time_obj = appt_data['Time']
-        if isinstance(appt_time_obj, str):
-            # Assuming "HH:MM:SS" format for database TIME column
-            appt_time_obj = time.fromisoformat(appt_time_obj) 
-
-        query = """
-        INSERT INTO booked_appointments (username, hospital, department, doctor, appointment_date, appointment_time, booking_time)
-        VALUES (%s, %s, %s, %s, %s, %s, %s)
-        """
-        params = (
-            username, appt_data['Hospital'], appt_data['Department'], appt_data['Doctor'],
-            appt_date_obj, appt_time_obj, appt_data['booking_time']
+    def get_booked_appointments(self, username):
+        # Served from the per-user read cache; bookings invalidate it. Rows are copied so
+        # callers can't mutate the cached list.
+        appointments = self.read_cache.cached(
+            username, "booked_appointments", lambda: self._load_booked_appointments(username),
+            cacheable=lambda rows: rows is not None,
         )
-        return self._execute_query(query, params)
+        return [dict(appt) for appt in appointments] if appointments else []
 
-    def get_booked_appointments(self, username):
+    def _load_booked_appointments(self, username):
         query = "SELECT * FROM booked_appointments WHERE username = %s ORDER BY appointment_date DESC, appointment_time DESC"
         appointments = self._execute_query(query, (username,), fetch_all=True)
+        if appointments is None:
+            return None # Query failed; don't cache
         if appointments:
-            # Convert datetime.time to string for consistent display
             for appt in appointments:
-                if 'appointment_time' in appt and isinstance(appt['appointment_time'], time):
-                    appt['appointment_time'] = appt['appointment_time'].strftime("%I:%M %p")
-                # Convert datetime.date to string for consistent display
-                if 'appointment_date' in appt and isinstance(appt['appointment_date'], date):
-                    appt['appointment_date'] = appt['appointment_date'].strftime("%Y-%m-%d")
+                self._format_appointment(appt)
             return appointments
         return []
 
+    @staticmethod
+    def _format_appointment(appt):
+        # Convert datetime.time to string for consistent display
+        if 'appointment_time' in appt and isinstance(appt['appointment_time'], time):
+            appt['appointment_time'] = appt['appointment_time'].strftime("%I:%M %p")
+        # Convert datetime.date to string for consistent display
+        if 'appointment_date' in appt and isinstance(appt['appointment_date'], date):
+            appt['appointment_date'] = appt['appointment_date'].strftime("%Y-%m-%d")
+        return appt
+
+    @staticmethod
+    def _appointment_date_filter(date_from, date_to):
+        clauses, params = [], []
+        if date_from is not None:
+            clauses.append("appointment_date >= %s")
+            params.append(date.fromisoformat(date_from) if isinstance(date_from, str) else date_from)
+        if date_to is not None:
+            clauses.append("appointment_date <= %s")
+            params.append(date.fromisoformat(date_to) if isinstance(date_to, str) else date_to)
+        return "".join(f" AND {clause}" for clause in clauses), params
+
+    def get_booked_appointments_page(self, username, page_size=20, after=None, date_from=None, date_to=None):
+        """
+        One page of a user's appointments, newest first, keyed on (appointment_date, appointment_time, id).
+
+        Returns (rows, next_cursor); pass next_cursor back as `after` for the following
+        page. next_cursor is None on the last page. Cost depends only on page_size,
+        not on how many appointments the user has.
+        """
+        date_sql, params = self._appointment_date_filter(date_from, date_to)
+        keyset_sql = ""
+        if after is not None:
+            after_date, after_time, after_id = after
+            # Expanded form of (d, t, id) < (%s, %s, %s) so MySQL can range-scan the index
+            keyset_sql = """
+            AND (appointment_date < %s OR (appointment_date = %s AND (appointment_time < %s
+                 OR (appointment_time = %s AND id < %s))))
+            """
+            params += [after_date, after_date, after_time, after_time, after_id]
+        query = f"""
+        SELECT * FROM booked_appointments
+        WHERE username = %s{date_sql}{keyset_sql}
+        ORDER BY appointment_date DESC, appointment_time DESC, id DESC
+        LIMIT %s
+        """
+        rows = self._execute_query(query, tuple([username] + params + [page_size + 1]), fetch_all=True)
+        if not rows:
+            return [], None
+        rows = list(rows)
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            last = rows[-1]
+            next_cursor = (last['appointment_date'], last['appointment_time'], last['id'])
+        return [self._format_appointment(appt) for appt in rows], next_cursor
+
+    def count_booked_appointments(self, username, date_from=None, date_to=None):
+        date_sql, params = self._appointment_date_filter(date_from, date_to)
+        query = f"SELECT COUNT(*) AS total FROM booked_appointments WHERE username = %s{date_sql}"
+        row = self.read_cache.cached(
+            username, ("appointment_count", date_from, date_to),
+            lambda: self._execute_query(query, tuple([username] + params), fetch_one=True),
+            cacheable=lambda result: result is not None,
+        )
+        return row['total'] if row else 0
+
     def appointment_exists(self, username, appt_data):
         # Ensure date and time are appropriate objects for the query
-        appt_date_obj = appt_data['Date']
-        if isinstance(appt_date_obj, str):
-            appt_date_obj = date.fromisoformat(appt_date_obj)
-
-        appt_time_obj = appt_data['Time']
-        if isinstance(appt_time_obj, str):
-            # Assuming "HH:MM:SS" format for database TIME column
-            appt_time_obj = time.fromisoformat(appt_time_obj)
+        appt_date_obj, appt_time_obj = self._appointment_slot(appt_data)
 
         query = """
         SELECT 1 FROM booked_appointments
@@ -190,36 +704,303 @@ class DBManager:
         )
         return bool(self._execute_query(query, params, fetch_one=True))
 
+    def get_doctor_day_bookings(self, hospital, department, doctor, appointment_date, after_id=None):
+        """A doctor's bookings for one day in token order (booking id), optionally only those after `after_id`."""
+        if isinstance(appointment_date, str):
+            appointment_date = date.fromisoformat(appointment_date)
+        query = """
+        SELECT id, username, appointment_time FROM booked_appointments
+        WHERE hospital = %s AND department = %s AND doctor = %s AND appointment_date = %s AND id > %s
+        ORDER BY id
+        """
+        params = (hospital, department, doctor, appointment_date, after_id or 0)
+        return self._execute_query(query, params, fetch_all=True) or []
+
+    def iter_appointment_timeline(self, since):
+        """Stream (hospital, department, doctor, date, time, booking_time) for bookings on or after `since`."""
+        query = """
+        SELECT hospital, department, doctor, appointment_date, appointment_time, booking_time
+        FROM booked_appointments WHERE appointment_date >= %s
+        """
+        return self._stream_query(query, (since,))
+
+    def get_full_slots(self, date_from, date_to):
+        """Every doctor slot between two dates whose reservation counter has reached its capacity, in one query."""
+        query = """
+        SELECT hospital, department, doctor, slot_date AS appointment_date, slot_time AS appointment_time
+        FROM doctor_slots
+        WHERE slot_date BETWEEN %s AND %s AND booked >= capacity
+        """
+        return self._execute_query(query, (date_from, date_to), fetch_all=True) or []
+
+    # --- Slot Reservation (capacity-aware, race-free booking) ---
+    SLOT_KEY_WHERE = "hospital = %s AND department = %s AND doctor = %s AND slot_date = %s AND slot_time = %s"
+
+    def set_slot_capacity(self, hospital, department, doctor, slot_date, slot_time, capacity):
+        """Set how many patients a doctor can see in one slot (creates the slot if needed)."""
+        if isinstance(slot_date, str):
+            slot_date = date.fromisoformat(slot_date)
+        if isinstance(slot_time, str):
+            slot_time = time.fromisoformat(slot_time)
+        slot_key = (hospital, department, doctor, slot_date, slot_time)
+        try:
+            with self._transaction() as tx:
+                # A new slot row starts from the bookings the slot already holds
+                self._seed_slot(tx, slot_key, capacity)
+                return tx.execute(f"UPDATE doctor_slots SET capacity = %s WHERE {self.SLOT_KEY_WHERE}",
+                                  (capacity,) + slot_key).rowcount
+        except self.backend.Error as e:
+            print(f"Database error while setting slot capacity: {e} | Slot: {slot_key}", file=sys.stderr)
+            return None
+        except PoolTimeout as e:
+            print(f"Database pool exhausted: {e} | Slot: {slot_key}", file=sys.stderr)
+            return None
+
+    def _seed_slot(self, tx, slot_key, capacity):
+        """Create the slot's counter row if missing, with booked = the bookings it already holds."""
+        if tx.execute(f"SELECT 1 FROM doctor_slots WHERE {self.SLOT_KEY_WHERE}", slot_key).fetchone() is not None:
+            return
+        booked = tx.execute(
+            """
+            SELECT COUNT(*) AS booked FROM booked_appointments
+            WHERE hospital = %s AND department = %s AND doctor = %s
+            AND appointment_date = %s AND appointment_time = %s
+            """,
+            slot_key,
+        ).fetchone()['booked']
+        tx.execute(
+            self.backend.insert_ignore_sql(
+                "doctor_slots",
+                ("hospital", "department", "doctor", "slot_date", "slot_time", "capacity", "booked"),
+            ),
+            slot_key + (capacity, booked),
+        )
+
+    def reserve_appointment(self, username, appt_data, capacity=None):
+        """
+        Atomically claim a place in the doctor's slot and record the booking.
+
+        The conditional `booked < capacity` UPDATE takes the slot row lock, so
+        concurrent callers serialize on that row and can never overbook it; the
+        unique key on booked_appointments rejects a patient booking twice. A slot
+        row created here starts from the bookings it already holds, so slots booked
+        before counters existed can't be overbooked. This is the only path that
+        writes booked_appointments, which keeps the counter authoritative.
+        """
+        appt_date_obj, appt_time_obj = self._appointment_slot(appt_data)
+        slot_key = (appt_data['Hospital'], appt_data['Department'], appt_data['Doctor'], appt_date_obj, appt_time_obj)
+        capacity = config.SLOT_DEFAULT_CAPACITY if capacity is None else capacity
+
+        for attempt in range(config.SLOT_RESERVE_RETRIES):
+            try:
+                with self._transaction() as tx:
+                    # Seeded in its own transaction so the counter survives a SLOT_FULL rollback below
+                    self._seed_slot(tx, slot_key, capacity)
+                with self._transaction() as tx:
+                    # Insert first so a repeat booking reports ALREADY_BOOKED even when the slot is full
+                    appointment_id = tx.execute(
+                        """
+                        INSERT INTO booked_appointments (username, hospital, department, doctor, appointment_date, appointment_time, booking_time)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s)
+                        """,
+                        (username,) + slot_key + (appt_data['booking_time'],),
+                    ).lastrowid
+                    claimed = tx.execute(
+                        f"UPDATE doctor_slots SET booked = booked + 1 WHERE {self.SLOT_KEY_WHERE} AND booked < capacity",
+                        slot_key,
+                    ).rowcount
+                    if not claimed:
+                        raise _SlotFull() # Rolls back the booking row inserted above
+                    self._bump_rollups(tx, slot_key)
+                    slot = tx.execute(
+                        f"SELECT capacity - booked AS remaining FROM doctor_slots WHERE {self.SLOT_KEY_WHERE}",
+                        slot_key,
+                    ).fetchone()
+                self.read_cache.invalidate(username)
+                return ReservationResult(ReservationStatus.RESERVED, appointment_id, slot['remaining'])
+            except _SlotFull:
+                return ReservationResult(ReservationStatus.SLOT_FULL, None, 0)
+            except self.backend.IntegrityError:
+                # Unique key on booked_appointments: this patient already holds this slot
+                return ReservationResult(ReservationStatus.ALREADY_BOOKED, None, None)
+            except self.backend.Error as e:
+                if self.backend.is_retryable(e) and attempt + 1 < config.SLOT_RESERVE_RETRIES:
+                    continue
+                print(f"Database error while reserving slot: {e} | Slot: {slot_key}", file=sys.stderr)
+                return ReservationResult(ReservationStatus.ERROR, None, None)
+            except PoolTimeout as e:
+                print(f"Database pool exhausted: {e} | Slot: {slot_key}", file=sys.stderr)
+                return ReservationResult(ReservationStatus.ERROR, None, None)
+        print(f"Slot not reserved: SLOT_RESERVE_RETRIES is {config.SLOT_RESERVE_RETRIES} | Slot: {slot_key}", file=sys.stderr)
+        return ReservationResult(ReservationStatus.ERROR, None, None)
+
+    # --- Analytics Rollups (for AnalyticsDashboardPage) ---
+    # Bookings per doctor per hour and per day, kept current inside the booking
+    # transaction so the dashboard never has to scan booked_appointments.
+    ROLLUP_KEY = ("hospital", "department", "doctor", "bucket_date")
+
+    def _bump_rollups(self, tx, slot_key):
+        """Add one booking for (hospital, department, doctor, date, time) to both rollups."""
+        hospital, department, doctor, appt_date, appt_time = slot_key
+        hour = appt_time.seconds // 3600 if isinstance(appt_time, timedelta) else appt_time.hour
+        tx.execute(
+            self.backend.increment_sql("appointment_rollup_daily", self.ROLLUP_KEY, "appointments"),
+            (hospital, department, doctor, appt_date),
+        )
+        tx.execute(
+            self.backend.increment_sql("appointment_rollup_hourly", self.ROLLUP_KEY + ("bucket_hour",), "appointments"),
+            (hospital, department, doctor, appt_date, hour),
+        )
+
+    def rebuild_appointment_rollups(self, date_from, date_to):
+        """
+        Compaction: recompute both rollups for a date range from booked_appointments in
+        one transaction, repairing any drift (e.g. rows inserted outside DBManager).
+        """
+        hour = self.backend.hour_sql("appointment_time")
+        statements = [
+            ("DELETE FROM appointment_rollup_daily WHERE bucket_date BETWEEN %s AND %s", (date_from, date_to)),
+            ("DELETE FROM appointment_rollup_hourly WHERE bucket_date BETWEEN %s AND %s", (date_from, date_to)),
+            ("""
+            INSERT INTO appointment_rollup_daily (hospital, department, doctor, bucket_date, appointments)
+            SELECT hospital, department, doctor, appointment_date, COUNT(*)
+            FROM booked_appointments WHERE appointment_date BETWEEN %s AND %s
+            GROUP BY hospital, department, doctor, appointment_date
+            """, (date_from, date_to)),
+            (f"""
+            INSERT INTO appointment_rollup_hourly (hospital, department, doctor, bucket_date, bucket_hour, appointments)
+            SELECT hospital, department, doctor, appointment_date, {hour}, COUNT(*)
+            FROM booked_appointments WHERE appointment_date BETWEEN %s AND %s
+            GROUP BY hospital, department, doctor, appointment_date, {hour}
+            """, (date_from, date_to)),
+        ]
+        try:
+            with self._transaction() as tx:
+                for query, params in statements:
+                    tx.execute(query, params)
+                return tx.execute(
+                    "SELECT COALESCE(SUM(appointments), 0) AS total FROM appointment_rollup_daily WHERE bucket_date BETWEEN %s AND %s",
+                    (date_from, date_to),
+                ).fetchone()['total']
+        except self.backend.Error as e:
+            print(f"Database error while rebuilding rollups: {e}", file=sys.stderr)
+            return None
+
+    @staticmethod
+    def _rollup_filter(date_from, date_to, hospital=None):
+        clause, params = "bucket_date BETWEEN %s AND %s", [date_from, date_to]
+        if hospital:
+            clause += " AND hospital = %s"
+            params.append(hospital)
+        return clause, tuple(params)
+
+    def get_daily_volume(self, date_from, date_to, hospital=None):
+        """Bookings per day between two dates, read from the daily rollup."""
+        where, params = self._rollup_filter(date_from, date_to, hospital)
+        query = f"""
+        SELECT bucket_date, SUM(appointments) AS appointments FROM appointment_rollup_daily
+        WHERE {where} GROUP BY bucket_date ORDER BY bucket_date
+        """
+        return self._execute_query(query, params, fetch_all=True) or []
+
+    def get_hourly_volume(self, date_from, date_to, hospital=None):
+        """Bookings per hour of day between two dates, read from the hourly rollup."""
+        where, params = self._rollup_filter(date_from, date_to, hospital)
+        query = f"""
+        SELECT bucket_hour, SUM(appointments) AS appointments FROM appointment_rollup_hourly
+        WHERE {where} GROUP BY bucket_hour ORDER BY bucket_hour
+        """
+        return self._execute_query(query, params, fetch_all=True) or []
+
+    def get_doctor_volume(self, date_from, date_to, hospital=None):
+        """Per-doctor totals, active days and busiest day between two dates, from the daily rollup."""
+        where, params = self._rollup_filter(date_from, date_to, hospital)
+        query = f"""
+        SELECT hospital, department, doctor, SUM(appointments) AS appointments,
+               COUNT(*) AS active_days, MAX(appointments) AS busiest_day
+        FROM appointment_rollup_daily WHERE {where}
+        GROUP BY hospital, department, doctor
+        ORDER BY appointments DESC
+        """
+        return self._execute_query(query, params, fetch_all=True) or []
+
+    # --- Bulk Export (for export_data.py) ---
+    # Table -> (key column, date column, exported columns). Rows stream in key order so
+    # an interrupted export resumes with `after_key` instead of re-reading from the start.
+    EXPORT_TABLES = {
+        "booked_appointments": ("id", "appointment_date", (
+            "id", "username", "hospital", "department", "doctor", "appointment_date", "appointment_time", "booking_time")),
+        "health_data": ("health_id", "record_date", (
+            "health_id", "username", "record_date", "weight", "height", "bp", "bp_systolic", "bp_diastolic",
+            "symptoms", "pre_meds")),
+        "user_health_history": ("history_id", "record_date", (
+            "history_id", "username", "record_date", "weight", "height", "bp", "bp_systolic", "bp_diastolic", "sugar")),
+    }
+
+    def iter_export_rows(self, table, date_from=None, date_to=None, after_key=None, chunk_size=10000):
+        """Stream every row of an exportable table in key order from a server-side cursor."""
+        key_column, date_column, columns = self.EXPORT_TABLES[table]
+        clauses, params = [], []
+        if after_key is not None:
+            # With a date range, keep the planner on the date index: a bare key range
+            # looks selective but walks the primary key from after_key to the end
+            key_expr = f"+{key_column}" if date_from is not None or date_to is not None else key_column
+            clauses.append(f"{key_expr} > %s")
+            params.append(after_key)
+        if date_from is not None:
+            clauses.append(f"{date_column} >= %s")
+            params.append(date_from)
+        if date_to is not None:
+            clauses.append(f"{date_column} <= %s")
+            params.append(date_to)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        query = f"SELECT {', '.join(columns)} FROM {table}{where} ORDER BY {key_column}"
+        return self._stream_query(query, tuple(params), chunk_size=chunk_size)
 
     # --- User Health History Operations (for MedicalServicesPage) ---
+    HEALTH_HISTORY_COLUMNS = ("username", "record_date", "weight", "height", "bp", "bp_systolic", "bp_diastolic", "sugar")
+
     def save_user_health_history(self, username, record_date, health_data):
-        # Ensure record_date is a date object
-        record_date_obj = record_date
-        if isinstance(record_date_obj, str):
-            record_date_obj = date.fromisoformat(record_date_obj)
-
-        query_check = "SELECT history_id FROM user_health_history WHERE username = %s AND record_date = %s"
-        existing_record = self._execute_query(query_check, (username, record_date_obj), fetch_one=True)
-
-        if existing_record:
-            query = """
-            UPDATE user_health_history SET weight = %s, height = %s, bp = %s, sugar = %s
-            WHERE history_id = %s
-            """
-            params = (
-                health_data['weight'], health_data['height'], health_data['bp'], health_data['sugar'],
-                existing_record['history_id']
-            )
-        else:
-            query = """
-            INSERT INTO user_health_history (username, record_date, weight, height, bp, sugar)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            """
-            params = (
+        # Single atomic upsert keyed on (username, record_date)
+        return self.save_user_health_history_batch([(username, record_date, health_data)])
+
+    def save_user_health_history_batch(self, records):
+        """Upsert many (username, record_date, health_data) triples in one statement."""
+        rows = []
+        for username, record_date, health_data in records:
+            # Ensure record_date is a date object
+            record_date_obj = record_date
+            if isinstance(record_date_obj, str):
+                record_date_obj = date.fromisoformat(record_date_obj)
+            rows.append((
                 username, record_date_obj, health_data['weight'], health_data['height'],
-                health_data['bp'], health_data['sugar']
-            )
-        return self._execute_query(query, params)
+                health_data['bp'], *parse_bp(health_data['bp']), health_data['sugar']
+            ))
+        return self._upsert("user_health_history", self.HEALTH_HISTORY_COLUMNS, ("username", "record_date"), rows)
+
+    # Numeric vitals per source table, for columnar (DataFrame) reads
+    VITALS_COLUMNS = {
+        "health_data": ("record_date", "weight", "height", "bp", "bp_systolic", "bp_diastolic"),
+        "user_health_history": ("record_date", "weight", "height", "bp", "bp_systolic", "bp_diastolic", "sugar"),
+    }
+
+    def get_health_series(self, username, source="health_data", date_from=None):
+        """
+        A user's vitals as a pandas DataFrame, one column per measure, oldest first.
+        Streamed straight into columns; BP comes pre-split into systolic/diastolic ints.
+        """
+        import pandas as pd # Imported on use so pages that never build DataFrames don't pay for pandas
+        columns = self.VITALS_COLUMNS[source]
+        query = f"SELECT {', '.join(columns)} FROM {source} WHERE username = %s"
+        params = [username]
+        if date_from is not None:
+            query += " AND record_date >= %s"
+            params.append(date_from)
+        query += " ORDER BY record_date"
+        try:
+            return pd.DataFrame.from_records(self._stream_query(query, tuple(params)), columns=columns)
+        except (self.backend.Error, PoolTimeout):
+            return pd.DataFrame(columns=columns)
 
     def get_user_health_history(self, username):
         query = "SELECT * FROM user_health_history WHERE username = %s ORDER BY record_date DESC"
@@ -0,0 +1,114 @@
+# doctor_search.py
+"""
+Doctor search across every hospital in the catalog.
+
+The index keeps doctors in one array sorted by rating (best first) and builds
+an inverted index from specialty and from each name word to ascending
+positions in that array. A minimum rating is then just a prefix of the array,
+filters intersect sorted position lists, and the best `limit` results come out
+already in rating order; only the doctors that make the cut (plus at most
+`limit` doctors tied with the last one) have their live queue length looked up
+to break rating ties.
+"""
+import threading
+from bisect import bisect_left, bisect_right
+from catalog import get_catalog
+
+
+def _name_tokens(name):
+    # "Dr. A. Sharma" -> ["a", "sharma"]; the title is not searchable on its own
+    tokens = [part.strip(".,").lower() for part in name.split()]
+    return [token for token in tokens if token and token not in ("dr", "dr.")]
+
+
+class DoctorSearchIndex:
+    """Immutable search index over one catalog version."""
+
+    def __init__(self, catalog):
+        self.version = catalog.version
+        self._doctors = sorted(catalog.all_doctors(), key=lambda doc: (-doc['rating'], -doc['experience_years'], doc['name']))
+        self._neg_ratings = [-doc['rating'] for doc in self._doctors] # Ascending, for bisect
+        self._experience = [doc['experience_years'] for doc in self._doctors]
+
+        self._by_specialty = {}
+        name_entries = []
+        for position, doc in enumerate(self._doctors):
+            self._by_specialty.setdefault(doc['department'].lower(), []).append(position)
+            name_entries.extend((token, position) for token in _name_tokens(doc['name']))
+        name_entries.sort()
+        self._name_tokens = [token for token, _ in name_entries]
+        self._name_positions = [position for _, position in name_entries]
+        self.specialties = sorted({doc['department'] for doc in self._doctors})
+
+    def __len__(self):
+        return len(self._doctors)
+
+    def _name_prefix_positions(self, prefix):
+        # Every name word starting with the prefix is a contiguous run of the sorted token list
+        prefix = prefix.strip(".,").lower()
+        start = bisect_left(self._name_tokens, prefix)
+        end = bisect_left(self._name_tokens, prefix + "\uffff", lo=start)
+        return sorted(set(self._name_positions[start:end]))
+
+    def search(self, specialty=None, name_prefix=None, min_rating=None, min_experience=None,
+               limit=20, queue_length=None):
+        """
+        Doctors matching every given filter, best rated first; doctors with equal
+        ratings are ordered by `queue_length(doctor)` (shortest queue first) when given.
+        """
+        # Minimum rating -> only positions before this cutoff qualify
+        cutoff = len(self._doctors) if min_rating is None else bisect_right(self._neg_ratings, -min_rating)
+
+        candidate_lists = []
+        if specialty:
+            candidate_lists.append(self._by_specialty.get(specialty.lower(), []))
+        if name_prefix and name_prefix.strip():
+            for word in name_prefix.split():
+                candidate_lists.append(self._name_prefix_positions(word))
+
+        if candidate_lists:
+            candidate_lists.sort(key=len)
+            candidates = candidate_lists[0]
+            for other in candidate_lists[1:]:
+                other_set = set(other)
+                candidates = [position for position in candidates if position in other_set]
+        else:
+            candidates = range(cutoff)
+
+        results = []
+        for position in candidates:
+            if position >= cutoff:
+                break # Positions are ascending, so everything after fails the rating filter
+            if min_experience is not None and self._experience[position] < min_experience:
+                continue
+            doc = self._doctors[position]
+            # With a queue tie-break, keep going past `limit` while the rating ties with the
+            # last result, but at most `limit` more, so queue lookups stay bounded by 2 x limit
+            if len(results) >= limit and (
+                queue_length is None or doc['rating'] != results[-1]['rating'] or len(results) >= 2 * limit
+            ):
+                break
+            results.append(doc)
+
+        if queue_length is not None:
+            lengths = {doc['id']: queue_length(doc) for doc in results}
+            results.sort(key=lambda doc: (-doc['rating'], lengths[doc['id']]))
+            return [dict(doc, queue_length=lengths[doc['id']]) for doc in results[:limit]]
+        return results[:limit]
+
+
+_INDEX = None
+_INDEX_LOCK = threading.Lock()
+
+
+def get_doctor_search_index():
+    """Process-wide index, rebuilt when the catalog version changes."""
+    global _INDEX
+    catalog = get_catalog()
+    index = _INDEX
+    if index is None or index.version != catalog.version:
+        with _INDEX_LOCK:
+            if _INDEX is None or _INDEX.version != catalog.version:
+                _INDEX = DoctorSearchIndex(catalog)
+            index = _INDEX
+    return index
@@ -0,0 +1,153 @@
+# export_data.py
+"""
+Streaming bulk export of appointments and health records.
+
+Rows come from a server-side cursor and are written in fixed-size chunks, so
+memory stays bounded however large the table is. After every chunk is flushed
+to disk, the last exported key and the file's byte length are saved to
+`<output>.resume`; rerunning with --resume truncates the file back to that
+length (dropping any partly written chunk) and appends from that key. In .gz
+output every chunk is its own gzip member, so the file is valid at each
+checkpoint.
+
+    python export_data.py booked_appointments appointments.csv --from 2025-01-01 --to 2025-01-31
+    python export_data.py health_data health.jsonl.gz --format jsonl
+    python export_data.py user_health_history history.csv.gz --resume
+"""
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+from collections import namedtuple
+from datetime import date
+from db_manager import DBManager
+
+ExportResult = namedtuple("ExportResult", ["rows", "last_key"])
+Checkpoint = namedtuple("Checkpoint", ["last_key", "offset"])
+
+
+def _checkpoint_path(path):
+    return path + ".resume"
+
+
+def read_checkpoint(path):
+    """Checkpoint(last key, byte offset) saved by an interrupted export to `path`, or None."""
+    try:
+        with open(_checkpoint_path(path)) as f:
+            last_key, offset = f.read().split()
+            return Checkpoint(int(last_key), int(offset))
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _write_checkpoint(path, last_key, offset):
+    # Write-then-rename so a crash never leaves a half-written checkpoint
+    tmp = _checkpoint_path(path) + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(f"{last_key} {offset}")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, _checkpoint_path(path))
+
+
+def _encode(fmt, columns, batch, header):
+    if fmt == "jsonl":
+        return "".join(json.dumps(row, default=str) + "\n" for row in batch).encode("utf-8")
+    buffer = io.StringIO(newline="")
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+    if header:
+        writer.writeheader()
+    writer.writerows(batch)
+    return buffer.getvalue().encode("utf-8")
+
+
+def export_table(db_manager, table, path, fmt="csv", date_from=None, date_to=None,
+                 after_key=None, resume=False, chunk_size=10000, progress=None):
+    """
+    Export `table` to `path` as CSV or JSON Lines (gzip-compressed if the path ends in .gz).
+
+    With resume=True, continues after the checkpoint in `<path>.resume`: the file is
+    first cut back to the checkpointed length, then appended to. Returns
+    ExportResult(rows written, last key written).
+    """
+    if table not in db_manager.EXPORT_TABLES:
+        raise ValueError(f"Unknown export table '{table}'. Choose from: {', '.join(db_manager.EXPORT_TABLES)}")
+    if fmt not in ("csv", "jsonl"):
+        raise ValueError("Format must be 'csv' or 'jsonl'.")
+    key_column, _, columns = db_manager.EXPORT_TABLES[table]
+    compress = path.endswith(".gz")
+
+    checkpoint = read_checkpoint(path) if resume else None
+    if checkpoint is not None:
+        if not os.path.exists(path) or os.path.getsize(path) < checkpoint.offset:
+            raise ValueError(f"'{path}' is shorter than its checkpoint; start a fresh export instead of resuming")
+        after_key = checkpoint.last_key
+
+    rows = db_manager.iter_export_rows(table, date_from, date_to, after_key, chunk_size=chunk_size)
+    written, last_key, chunk = 0, after_key, []
+    header = checkpoint is None
+    with open(path, "r+b" if checkpoint else "wb") as out:
+        if checkpoint:
+            # Anything past the checkpoint is a chunk that was written but never checkpointed
+            out.truncate(checkpoint.offset)
+            out.seek(checkpoint.offset)
+
+        def write_chunk(batch):
+            nonlocal header
+            data = _encode(fmt, columns, batch, header)
+            header = False
+            out.write(gzip.compress(data) if compress else data)
+            out.flush()
+            os.fsync(out.fileno())
+
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                write_chunk(chunk)
+                written, last_key = written + len(chunk), chunk[-1][key_column]
+                _write_checkpoint(path, last_key, out.tell())
+                chunk = []
+                if progress:
+                    progress(written, last_key)
+        if chunk or header:
+            write_chunk(chunk)
+            if chunk:
+                written, last_key = written + len(chunk), chunk[-1][key_column]
+
+    # Finished cleanly; a later --resume should start a fresh export
+    if os.path.exists(_checkpoint_path(path)):
+        os.remove(_checkpoint_path(path))
+    return ExportResult(written, last_key)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream a table to CSV or JSON Lines with bounded memory.")
+    parser.add_argument("table", choices=sorted(DBManager.EXPORT_TABLES))
+    parser.add_argument("output", help="Output file; a .gz suffix compresses it")
+    parser.add_argument("--format", dest="fmt", choices=("csv", "jsonl"), help="Default: jsonl for *.jsonl[.gz], else csv")
+    parser.add_argument("--from", dest="date_from", type=date.fromisoformat, help="First date (YYYY-MM-DD), inclusive")
+    parser.add_argument("--to", dest="date_to", type=date.fromisoformat, help="Last date (YYYY-MM-DD), inclusive")
+    parser.add_argument("--after-key", type=int, help="Only export rows whose key is greater than this")
+    parser.add_argument("--resume", action="store_true", help="Continue an interrupted export of the same output file")
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    args = parser.parse_args(argv)
+
+    fmt = args.fmt or ("jsonl" if ".jsonl" in args.output else "csv")
+    try:
+        result = export_table(
+            DBManager(), args.table, args.output, fmt=fmt, date_from=args.date_from, date_to=args.date_to,
+            after_key=args.after_key, resume=args.resume, chunk_size=args.chunk_size,
+            progress=lambda rows, key: print(f"  {rows} rows (key {key})", file=sys.stderr),
+        )
+    except Exception as e:
+        print(f"Export failed: {e}. Rerun with --resume to continue.", file=sys.stderr)
+        return 1
+    print(f"Exported {result.rows} rows from {args.table} to {args.output} (last key {result.last_key}).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
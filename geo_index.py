@@ -0,0 +1,111 @@
+# geo_index.py
+"""
+Spatial index for "nearest medical shops" queries.
+
+Points are bucketed into a fixed lat/lon grid (cells of about `cell_km`) and
+stored sorted by cell, so each cell is one contiguous slice. A radius query
+gathers only the slices of cells that overlap the search box and computes
+great-circle distances for those candidates in one vectorized numpy pass; a
+k-nearest query widens the radius until it holds k points (or covers every
+point), which keeps the answer exact.
+"""
+import math
+import threading
+import numpy as np
+from catalog import get_catalog
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+
+def haversine_km(lat, lon, lats, lons):
+    """Distances in km from one point to arrays of points (degrees), vectorized."""
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class GeoGridIndex:
+    """Immutable grid index over (lat, lon) points identified by position in `items`."""
+
+    def __init__(self, items, cell_km=2.0):
+        self.items = list(items)
+        self.cell_deg = cell_km / KM_PER_DEGREE_LAT
+        lats = np.array([item['lat'] for item in self.items], dtype=float)
+        lons = np.array([item['lon'] for item in self.items], dtype=float)
+        rows = np.floor(lats / self.cell_deg).astype(np.int64)
+        cols = np.floor(lons / self.cell_deg).astype(np.int64)
+
+        # Sort by cell so every cell's points are one slice of the arrays
+        order = np.lexsort((cols, rows))
+        self._order = order
+        self._lats = lats[order]
+        self._lons = lons[order]
+        rows, cols = rows[order], cols[order]
+        self._cells = {}
+        if len(order):
+            boundaries = np.flatnonzero((np.diff(rows) != 0) | (np.diff(cols) != 0)) + 1
+            starts = np.concatenate(([0], boundaries))
+            ends = np.concatenate((boundaries, [len(order)]))
+            for start, end in zip(starts.tolist(), ends.tolist()):
+                self._cells[(int(rows[start]), int(cols[start]))] = (start, end)
+
+    def __len__(self):
+        return len(self.items)
+
+    def _candidates(self, lat, lon, radius_km):
+        dlat = radius_km / KM_PER_DEGREE_LAT
+        dlon = radius_km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 1e-6))
+        row_lo, row_hi = math.floor((lat - dlat) / self.cell_deg), math.floor((lat + dlat) / self.cell_deg)
+        col_lo, col_hi = math.floor((lon - dlon) / self.cell_deg), math.floor((lon + dlon) / self.cell_deg)
+        if (row_hi - row_lo + 1) * (col_hi - col_lo + 1) >= len(self._cells):
+            return np.arange(len(self._order)) # Box covers more cells than exist; scan everything
+        slices = [
+            self._cells[(row, col)]
+            for row in range(row_lo, row_hi + 1)
+            for col in range(col_lo, col_hi + 1)
+            if (row, col) in self._cells
+        ]
+        if not slices:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([np.arange(start, end) for start, end in slices])
+
+    def within(self, lat, lon, radius_km):
+        """[(item, distance_km)] for every point within `radius_km`, nearest first."""
+        candidates = self._candidates(lat, lon, radius_km)
+        if not len(candidates):
+            return []
+        distances = haversine_km(lat, lon, self._lats[candidates], self._lons[candidates])
+        mask = distances <= radius_km
+        candidates, distances = candidates[mask], distances[mask]
+        ranked = np.argsort(distances, kind="stable")
+        return [(self.items[self._order[candidates[i]]], float(distances[i])) for i in ranked]
+
+    def nearest(self, lat, lon, k=5, max_radius_km=None):
+        """The k nearest points as [(item, distance_km)], optionally limited to `max_radius_km`."""
+        if not self.items or k <= 0:
+            return []
+        radius = self.cell_deg * KM_PER_DEGREE_LAT
+        while True:
+            if max_radius_km is not None:
+                radius = min(radius, max_radius_km)
+            found = self.within(lat, lon, radius)
+            # Everything outside `radius` is farther than everything in `found`, so the top k are exact
+            if len(found) >= k or len(found) == len(self.items) or radius == max_radius_km:
+                return found[:k]
+            radius *= 2
+
+
+_SHOP_INDEX = None
+_SHOP_INDEX_LOCK = threading.Lock()
+
+
+def get_shop_index():
+    """Process-wide index of the catalog's medical shops, rebuilt when the catalog version changes."""
+    global _SHOP_INDEX
+    catalog = get_catalog()
+    with _SHOP_INDEX_LOCK:
+        if _SHOP_INDEX is None or _SHOP_INDEX[0] != catalog.version:
+            _SHOP_INDEX = (catalog.version, GeoGridIndex(catalog.medical_shops()))
+        return _SHOP_INDEX[1]
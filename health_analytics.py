@@ -0,0 +1,101 @@
+# health_analytics.py
+"""
+Vectorized analytics over a patient's vitals history.
+
+Works on the columnar frames from DBManager.get_health_series: derived
+measures (BMI, pulse pressure, mean arterial pressure, rolling trends) are
+computed in whole-column numpy passes, and long series are reduced with
+Largest-Triangle-Three-Buckets before plotting so a multi-year chart sends a
+few hundred points to the browser instead of every reading.
+"""
+import numpy as np
+import pandas as pd
+
+TREND_WINDOW = 7 # Readings in the rolling trend
+MAX_CHART_POINTS = 400
+
+
+def split_bp(bp):
+    """Vectorized "120/80" -> (systolic, diastolic) float arrays (NaN where unparseable)."""
+    parts = pd.Series(bp, dtype="object").astype("string").str.extract(r"^\s*(\d{2,3})\s*/\s*(\d{2,3})\s*$")
+    return parts[0].astype(float).to_numpy(), parts[1].astype(float).to_numpy()
+
+
+def with_derived(frame, trend_window=TREND_WINDOW):
+    """Return a copy of a vitals frame with numeric columns and derived measures added."""
+    frame = frame.copy()
+    frame["record_date"] = pd.to_datetime(frame["record_date"])
+    for column in ("weight", "height", "bp_systolic", "bp_diastolic", "sugar"):
+        if column in frame:
+            frame[column] = pd.to_numeric(frame[column], errors="coerce")
+
+    # Rows written before BP was split at save time still carry only the text form
+    if "bp" in frame:
+        systolic, diastolic = split_bp(frame["bp"])
+        frame["bp_systolic"] = frame["bp_systolic"].fillna(pd.Series(systolic, index=frame.index))
+        frame["bp_diastolic"] = frame["bp_diastolic"].fillna(pd.Series(diastolic, index=frame.index))
+
+    height_m = frame["height"].to_numpy(dtype=float) / 100.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bmi = frame["weight"].to_numpy(dtype=float) / (height_m * height_m)
+    frame["bmi"] = np.where(np.isfinite(bmi) & (height_m > 0), np.round(bmi, 1), np.nan)
+
+    systolic = frame["bp_systolic"].to_numpy(dtype=float)
+    diastolic = frame["bp_diastolic"].to_numpy(dtype=float)
+    frame["pulse_pressure"] = systolic - diastolic
+    frame["mean_arterial_pressure"] = np.round(diastolic + (systolic - diastolic) / 3.0, 1)
+
+    for column in ("weight", "bmi", "bp_systolic", "bp_diastolic"):
+        frame[f"{column}_trend"] = frame[column].rolling(trend_window, min_periods=1).mean()
+    return frame
+
+
+def lttb(x, y, threshold):
+    """
+    Indices of the points kept by Largest-Triangle-Three-Buckets downsampling.
+
+    Keeps the first and last point and, from each of `threshold - 2` equal buckets,
+    the point forming the largest triangle with the previously kept point and the
+    next bucket's average. Each bucket is scored in one numpy operation.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64) # Bucket boundaries over the interior points
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean() if next_end > end else x[-1]
+        avg_y = y[end:next_end].mean() if next_end > end else y[-1]
+        area = np.abs(
+            (x[previous] - avg_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (avg_y - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        keep[bucket + 1] = previous
+    return keep
+
+
+def downsample(frame, columns, max_points=MAX_CHART_POINTS):
+    """
+    Long-format (record_date, measure, value) frame for charting, with each measure
+    LTTB-downsampled to at most `max_points` points.
+    """
+    parts = []
+    for column in columns:
+        series = frame[["record_date", column]].dropna()
+        if series.empty:
+            continue
+        x = series["record_date"].to_numpy(dtype="datetime64[s]").astype(np.int64)
+        picked = series.iloc[lttb(x, series[column].to_numpy(dtype=float), max_points)]
+        parts.append(pd.DataFrame({"record_date": picked["record_date"].to_numpy(), "measure": column,
+                                   "value": picked[column].to_numpy()}))
+    if not parts:
+        return pd.DataFrame(columns=["record_date", "measure", "value"])
+    return pd.concat(parts, ignore_index=True)
@@ -1,50 +1,40 @@
 import streamlit as st
-import base64
-import os
+import assets
 
 
 def set_background(local_file=None, remote_url=None):
     """
     Set a background image from either a local file or an online URL.
-    - local_file: Path to local image file
+    - local_file: Path to local image file (encoded once per process and cached)
     - remote_url: Direct raw URL to the image (GitHub raw link, etc.)
     """
-    if local_file and os.path.exists(local_file):
-        # Load local image as base64
-        with open(local_file, "rb") as img_file:
-            encoded = base64.b64encode(img_file.read()).decode()
-        ext = local_file.split('.')[-1].lower()
-        mime = "png" if ext == "png" else "jpeg"
-        background = f"data:image/{mime};base64,{encoded}"
+    if local_file and assets.background_css(local_file):
+        css = assets.background_css(local_file)
     elif remote_url:
         # Use remote image link directly
-        background = remote_url
-    else:
-        st.error("No valid background image found.")
-        return
-
-    # Apply background with CSS
-    st.markdown(
-        f"""
+        css = f"""
         <style>
         .stApp {{
-            background-image: url('{background}');
+            background-image: url('{remote_url}');
             background-size: cover;
             background-repeat: no-repeat;
             background-attachment: fixed;
             background-position: center;
         }}
         </style>
-        """,
-        unsafe_allow_html=True,
-    )
+        """
+    else:
+        st.error("No valid background image found.")
+        return
+
+    # Apply background with CSS
+    st.markdown(css, unsafe_allow_html=True)
 
 
 # ✅ Landing Page Class
 class LandingPage:
     def display(self):
-        # For cloud deployment, use GitHub raw link
-        set_background(remote_url="https://raw.githubusercontent.com/vaibhav21493/queuemanagement/main/quemain.png")
+        # Background is applied by MainApplication.run from the local asset cache
 
         st.markdown("""
             <style>
@@ -158,4 +148,5 @@ class LandingPage:
 
 # ✅ Optional direct execution
 if __name__ == "__main__":
+    set_background(local_file=assets.BACKGROUND_IMAGE)
     LandingPage().display()
@@ -1,6 +1,6 @@
 # pages/login_page.py
 import streamlit as st
-from user_management import UserManager
+from user_management import AuthStatus, UserManager
 
 class LoginPage:
     """Represents the login page for existing users."""
@@ -35,14 +35,19 @@ class LoginPage:
                 st.error("Username must contain at least 3 letters (A-Z or a-z). 😔")
             elif not self.user_manager.is_valid_password(password):
                 st.error("Password must contain at least one uppercase letter, one number, and one special character. 🔑")
-            elif not self.user_manager.user_exists(username):
-                st.error("User does not exist. Please register first. 🙅‍♀️")
-            elif not self.user_manager.check_credentials(username, password):
-                st.error("Incorrect password. Please try again. 🚫")
             elif captcha_input.strip().upper() != st.session_state.captcha:
+                # Checked before the (deliberately slow) password hash so bots can't burn hash workers
                 st.error("Incorrect captcha. Please try again. 🤖")
                 st.session_state.captcha = self.user_manager.generate_captcha() # Refresh captcha on failure
                 st.rerun()
+            elif (status := self.user_manager.authenticate(username, password)) == AuthStatus.UNKNOWN_USER:
+                st.error("User does not exist. Please register first. 🙅‍♀️")
+            elif status == AuthStatus.BAD_PASSWORD:
+                st.error("Incorrect password. Please try again. 🚫")
+            elif status == AuthStatus.BUSY:
+                st.warning("The server is handling many logins right now. Please try again in a moment. ⏳")
+            elif status == AuthStatus.ERROR:
+                st.error("Login is unavailable due to a server error. Please try again later. ⚠️")
             else:
                 st.session_state.logged_in = True
                 st.session_state.current_user = username
@@ -1,15 +1,8 @@
 import streamlit as st
-import requests
-import base64
-from user_management import UserManager
-from patient_health_data import PatientHealthDataPage
-from appointment_booking import AppointmentBookingPage
-from appointment_summary import AppointmentSummaryPage
-from medical_services import MedicalServicesPage
-from login_page import LoginPage
-from register_page import RegistrationPage
-from db_manager import DBManager
-from landing import LandingPage
+import assets
+import config
+from services import get_services
+from render_profiler import get_render_profiler
 
 
 class MainApplication:
@@ -18,48 +11,37 @@ class MainApplication:
     and navigation between different pages.
     """
 
-    def __init__(self):
-        self.db_manager = DBManager()
-        self.user_manager = UserManager()
-        self.login_page = LoginPage(self.user_manager)
-        self.register_page = RegistrationPage(self.user_manager)
-        self.landing = LandingPage()
-        self.appointment_booking_page = AppointmentBookingPage()
-        self.appointment_summary_page = AppointmentSummaryPage()
-        self.patient_health_data_page = PatientHealthDataPage()
-        self.medical_services_page = MedicalServicesPage()
+    def __init__(self, services=None):
+        # Pages and the data-access layer live in the app-scoped container, not per rerun
+        self.services = services or get_services()
+        self.profiler = get_render_profiler()
 
     def set_background(self):
         """
-        Always use GitHub raw image for Streamlit Cloud compatibility.
+        Use the bundled background image, encoded once per process by the asset cache.
         """
-        github_url = "https://github.com/vaibhav21493/queuemanagement/blob/main/quemain.png?raw=true"
-        try:
-            response = requests.get(github_url)
-            if response.status_code == 200:
-                encoded_img = base64.b64encode(response.content).decode()
-                st.markdown(
-                    f"""
-                    <style>
-                    .stApp {{
-                        background-image: url("data:image/png;base64,{encoded_img}");
-                        background-size: cover;
-                        background-repeat: no-repeat;
-                        background-attachment: fixed;
-                        background-position: center;
-                    }}
-                    </style>
-                    """,
-                    unsafe_allow_html=True
-                )
-            else:
-                st.error(f"Failed to load background image. HTTP {response.status_code}")
-        except Exception as e:
-            st.error(f"Error loading background: {e}")
+        css = assets.background_css()
+        if css:
+            st.markdown(css, unsafe_allow_html=True)
+        else:
+            st.error(f"Background image '{assets.BACKGROUND_IMAGE}' not found.")
 
     def run(self):
+        # Every rerun is timed; phases and DB calls show in the debug sidebar
+        with self.profiler.rerun():
+            self._run()
+        if config.PROFILE_SIDEBAR or st.session_state.get("current_user") in config.ADMIN_USERS:
+            self.profiler.render_sidebar()
+
+    def show_page(self, name):
+        with self.profiler.span(f"page_init:{name}"): # Only costs anything on first use per process
+            page = self.services.page(name)
+        self.profiler.run_page(name, page.display)
+
+    def _run(self):
         # ✅ Set background globally
-        self.set_background()
+        with self.profiler.span("background"):
+            self.set_background()
 
         # Initialize session state
         st.session_state.setdefault("page", "landing")
@@ -69,41 +51,46 @@ class MainApplication:
         # Before login
         if not st.session_state.logged_in:
             if st.session_state.page == "landing":
-                self.landing.display()
+                self.show_page("landing")
                 return
             if st.session_state.page == "auth":
                 page_choice = st.sidebar.radio("Choose Action", ["Login", "Register"])
                 if page_choice == "Login":
-                    self.login_page.display()
+                    self.show_page("login")
                 elif page_choice == "Register":
-                    self.register_page.display()
+                    self.show_page("register")
                 return
 
         # Logged-in view
         if st.session_state.logged_in:
-            st.sidebar.markdown(f"**Welcome, `{st.session_state.current_user}`! 🎉**")
-            st.sidebar.markdown("---")
+            with self.profiler.span("sidebar"):
+                st.sidebar.markdown(f"**Welcome, `{st.session_state.current_user}`! 🎉**")
+                st.sidebar.markdown("---")
 
-            page_choice = st.sidebar.radio(
-                "Navigation",
-                ["Departments", "Book Appointment", "Patient Health Data", "Medical Services"],
-                key="logged_in_nav"
-            )
+                nav_options = ["Departments", "Book Appointment", "Patient Health Data", "Medical Services", "Analytics Dashboard"]
+                if st.session_state.current_user in config.ADMIN_USERS:
+                    nav_options.append("Admin Panel")
+                page_choice = st.sidebar.radio("Navigation", nav_options, key="logged_in_nav")
 
             if page_choice == "Departments":
-                self.appointment_booking_page.display()
+                self.show_page("appointment_booking")
             elif page_choice == "Book Appointment":
-                self.appointment_summary_page.display()
+                self.show_page("appointment_summary")
             elif page_choice == "Patient Health Data":
-                self.patient_health_data_page.display()
+                self.show_page("patient_health_data")
             elif page_choice == "Medical Services":
-                self.medical_services_page.display()
+                self.show_page("medical_services")
+            elif page_choice == "Analytics Dashboard":
+                self.show_page("analytics_dashboard")
+            elif page_choice == "Admin Panel":
+                self.show_page("admin_panel")
 
             st.sidebar.markdown("---")
             if st.sidebar.button("🚪 Logout"):
                 self.logout()
 
-        self.apply_sidebar_style()
+        with self.profiler.span("sidebar_style"):
+            self.apply_sidebar_style()
 
     def apply_sidebar_style(self):
         st.markdown("""
@@ -124,6 +111,7 @@ class MainApplication:
             "logged_in", "current_user", "page",
             "selected_hospital", "selected_department", "selected_doctor",
             "appointment_date", "appointment_time",
+            "appt_history_filters", "appt_history_cursors",
         ]
         for key in keys_to_clear:
             st.session_state.pop(key, None)
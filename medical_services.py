@@ -1,48 +1,16 @@
 # medical_services.py
 import streamlit as st
-from datetime import datetime, timedelta
 from db_manager import DBManager # Import the new DBManager
+from catalog import get_catalog
+from geo_index import get_shop_index
 
 class MedicalServicesPage:
     """Provides details on hospital fees, allows health data input, slot booking, and shows nearby medical shops."""
 
-    HOSPITALS = {
-        "City Hospital": {
-            "Cardiology": {"Consultation": "₹500", "ECG": "₹1200"},
-            "Neurology": {"Consultation": "₹600", "MRI": "₹3000"},
-            "Pediatrics": {"Consultation": "₹400"}
-        },
-        "Green Valley Clinic": {
-            "Orthopedics": {"Consultation": "₹450", "X-Ray": "₹800"},
-            "Dermatology": {"Consultation": "₹350"},
-            "Radiology": {"CT Scan": "₹2500"}
-        },
-        "Sunrise Medical Center": {
-            "Oncology": {"Consultation": "₹700", "Chemotherapy": "₹5000"},
-            "Emergency": {"Emergency Care": "₹1000"},
-            "Radiology": {"MRI": "₹3200"}
-        }
-    }
-
-    MEDICAL_SHOPS = {
-        "HealthPlus Pharmacy": 2.1,
-        "CityCare Medicals": 3.5,
-        "Wellness Drugstore": 1.8,
-        "MediQuick": 4.0
-    }
-
-    def __init__(self):
-        self.db_manager = DBManager()
-
-    @staticmethod
-    def _generate_slots():
-        slots = []
-        today = datetime.today()
-        for i in range(7):
-            day = today + timedelta(days=i)
-            date_str = day.strftime("%Y-%m-%d")
-            slots.append({"date": date_str, "times": ["09:00 AM", "01:00 PM", "05:00 PM"]})
-        return slots
+    NEAREST_SHOPS = 5
+
+    def __init__(self, db_manager=None):
+        self.db_manager = db_manager or DBManager()
 
     def display(self):
         st.title("Hospital and Department Fee Structure")
@@ -52,28 +20,50 @@ class MedicalServicesPage:
             st.warning("Please log in to view medical services.")
             return
 
+        catalog = get_catalog()
+
         # Hospital dropdown
-        selected_hospital = st.selectbox("Select Hospital", list(self.HOSPITALS.keys()))
+        selected_hospital = st.selectbox("Select Hospital", catalog.hospital_names())
 
         if selected_hospital:
             st.subheader(f"Departments in {selected_hospital}")
-            departments = self.HOSPITALS[selected_hospital]
-            for dept, fees in departments.items():
+            for dept in catalog.department_names(selected_hospital):
                 st.markdown(f"### {dept}")
-                for service, cost in fees.items():
-                    st.write(f"- {service}: {cost}")
+                for service, fee in catalog.services(selected_hospital, dept).items():
+                    st.write(f"- {service}: {catalog.format_fee(fee)}")
 
         st.markdown("---")
    
 
-        # Nearby medical shops dropdown
+        # Nearby medical shops, nearest first, from the spatial index
         st.subheader("Nearby Medical Shops")
-        shop_names = list(self.MEDICAL_SHOPS.keys())
-        selected_shop = st.selectbox("Select Medical Shop", shop_names)
+        shop_index = get_shop_index()
+        near_me = st.checkbox("Search near my location instead of the hospital", key="shops_near_me")
+        if near_me:
+            col_lat, col_lon, col_radius = st.columns(3)
+            with col_lat:
+                origin_lat = st.number_input("Latitude", -90.0, 90.0, 18.5204, format="%.4f", key="shops_my_lat")
+            with col_lon:
+                origin_lon = st.number_input("Longitude", -180.0, 180.0, 73.8567, format="%.4f", key="shops_my_lon")
+            with col_radius:
+                radius_km = st.number_input("Within (km)", 0.5, 50.0, 5.0, step=0.5, key="shops_radius")
+            nearby = shop_index.nearest(origin_lat, origin_lon, k=self.NEAREST_SHOPS, max_radius_km=radius_km)
+            origin_label = "your location"
+        else:
+            location = catalog.hospital_location(selected_hospital)
+            nearby = shop_index.nearest(*location, k=self.NEAREST_SHOPS) if location else []
+            origin_label = "hospital"
+
+        shop_distances = {shop['name']: distance for shop, distance in nearby}
+        selected_shop = st.selectbox(
+            "Select Medical Shop", list(shop_distances),
+            format_func=lambda name: f"{name} ({shop_distances[name]:.1f} km)",
+        )
 
         if selected_shop:
-            dist = self.MEDICAL_SHOPS[selected_shop]
-            st.write(f"Distance of **{selected_shop}** from hospital: {dist} km")
+            st.write(f"Distance of **{selected_shop}** from {origin_label}: {shop_distances[selected_shop]:.1f} km")
+        else:
+            st.info("No medical shops found nearby.")
 
         st.markdown("---")
 
@@ -84,13 +74,14 @@ class MedicalServicesPage:
             st.header("Recorded Data Summary")
             st.subheader("Selected Hospital & Departments Fees")
             st.write(f"**Hospital:** {selected_hospital}")
-            for dept, fees in self.HOSPITALS[selected_hospital].items():
+            for dept in catalog.department_names(selected_hospital):
                 st.write(f"**{dept}**")
-                for service, cost in fees.items():
-                    st.write(f"- {service}: {cost}")
+                for service, fee in catalog.services(selected_hospital, dept).items():
+                    st.write(f"- {service}: {catalog.format_fee(fee)}")
                     
-            st.subheader("Selected Medical Shop")
-            st.write(f"**{selected_shop}** — {self.MEDICAL_SHOPS[selected_shop]} km from hospital")
+            if selected_shop:
+                st.subheader("Selected Medical Shop")
+                st.write(f"**{selected_shop}** — {shop_distances[selected_shop]:.1f} km from {origin_label}")
 
             # Print button (opens browser print dialog)
             st.markdown(
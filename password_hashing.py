@@ -0,0 +1,138 @@
+# password_hashing.py
+"""
+Salted, tunable-cost password hashing (PBKDF2-HMAC-SHA256).
+
+Hashes are stored as "pbkdf2_sha256$<iterations>$<salt>$<hash>". Rows that still
+hold a plaintext password are recognised as legacy and can be upgraded on the
+next successful login. Hashing is CPU-bound, so PasswordHasher runs it on a
+small bounded worker pool: a burst of logins queues there (or is rejected when
+the queue is full) instead of saturating every Streamlit session thread.
+"""
+import base64
+import hashlib
+import hmac
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+import config
+
+ALGORITHM = "pbkdf2_sha256"
+SALT_BYTES = 16
+
+
+class HasherBusy(Exception):
+    """Raised when the hashing queue is full; the caller should ask the user to retry."""
+
+
+def _b64(raw):
+    return base64.b64encode(raw).decode().rstrip("=")
+
+
+def _unb64(text):
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+def hash_password(password, iterations=None):
+    iterations = iterations or config.PASSWORD_HASH_ITERATIONS
+    salt = os.urandom(SALT_BYTES)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
+    return f"{ALGORITHM}${iterations}${_b64(salt)}${_b64(digest)}"
+
+
+def is_hashed(stored):
+    return isinstance(stored, str) and stored.startswith(ALGORITHM + "$")
+
+
+def needs_rehash(stored):
+    """True for legacy plaintext rows and hashes weaker than the configured cost."""
+    if not is_hashed(stored):
+        return True
+    return int(stored.split("$")[1]) < config.PASSWORD_HASH_ITERATIONS
+
+
+def verify_password(password, stored):
+    if stored is None:
+        return False
+    if not is_hashed(stored):
+        # Legacy plaintext row; constant-time compare until it gets upgraded
+        return hmac.compare_digest(password.encode(), str(stored).encode())
+    try:
+        _, iterations, salt, expected = stored.split("$")
+        digest = hashlib.pbkdf2_hmac("sha256", password.encode(), _unb64(salt), int(iterations))
+    except ValueError:
+        return False
+    return hmac.compare_digest(digest, _unb64(expected))
+
+
+class PasswordHasher:
+    """Runs hash/verify calls on a bounded thread pool and records timing metrics."""
+
+    def __init__(self, workers=4, max_pending=32, timeout=10.0):
+        # hashlib releases the GIL while hashing, so workers run in parallel
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._stats = {"hashes": 0, "verifications": 0, "rejected": 0, "rehashes": 0,
+                       "total_seconds": 0.0, "max_seconds": 0.0}
+
+    def _run(self, kind, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats["rejected"] += 1
+            raise HasherBusy("Too many logins in progress; please try again.")
+        try:
+            future = self._executor.submit(self._timed, kind, fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is held until the job finishes, not until the caller stops waiting,
+        # so jobs abandoned after a timeout still count towards max_pending
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result(timeout=self.timeout)
+
+    def _timed(self, kind, fn, *args):
+        started = perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = perf_counter() - started
+            with self._lock:
+                self._stats[kind] += 1
+                self._stats["total_seconds"] += elapsed
+                self._stats["max_seconds"] = max(self._stats["max_seconds"], elapsed)
+
+    def hash(self, password):
+        return self._run("hashes", hash_password, password)
+
+    def verify(self, password, stored):
+        return self._run("verifications", verify_password, password, stored)
+
+    def record_rehash(self):
+        with self._lock:
+            self._stats["rehashes"] += 1
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+        calls = snapshot["hashes"] + snapshot["verifications"]
+        snapshot["avg_seconds"] = snapshot["total_seconds"] / calls if calls else 0.0
+        return snapshot
+
+
+_HASHER = None
+_HASHER_LOCK = threading.Lock()
+
+
+def get_password_hasher():
+    """The process-wide PasswordHasher, sized from config."""
+    global _HASHER
+    with _HASHER_LOCK:
+        if _HASHER is None:
+            _HASHER = PasswordHasher(
+                workers=config.AUTH_HASH_WORKERS,
+                max_pending=config.AUTH_HASH_MAX_PENDING,
+                timeout=config.AUTH_HASH_TIMEOUT,
+            )
+        return _HASHER
@@ -1,13 +1,15 @@
 # patient_health_data.py
 import streamlit as st
+import plotly.express as px
 from datetime import datetime
 from db_manager import DBManager # Import the new DBManager
+from health_analytics import with_derived, downsample
 
 class PatientHealthDataPage:
     """Manages the patient health data entry and display."""
 
-    def __init__(self):
-        self.db_manager = DBManager()
+    def __init__(self, db_manager=None):
+        self.db_manager = db_manager or DBManager()
 
     def display(self):
         st.title("📝 Patient Health Data Entry")
@@ -64,4 +66,35 @@ class PatientHealthDataPage:
             **💊 Pre-Medicine:** {updated_health_data.get('pre_meds', 'N/A')}
             """)
         else:
-            st.write("No health data recorded yet.")
\ No newline at end of file
+            st.write("No health data recorded yet.")
+
+        self._display_trends(username)
+
+    def _display_trends(self, username):
+        """Vitals over time: derived columns computed in one pass, long series downsampled before plotting."""
+        history = self.db_manager.get_health_series(username)
+        if len(history) < 2:
+            return
+        vitals = with_derived(history)
+
+        st.markdown("---")
+        st.subheader("📈 Your Health Trends")
+        latest = vitals.iloc[-1]
+        c1, c2, c3 = st.columns(3)
+        c1.metric("BMI", f"{latest['bmi']:.1f}" if latest['bmi'] == latest['bmi'] else "N/A")
+        c2.metric("Pulse Pressure", f"{latest['pulse_pressure']:.0f} mmHg" if latest['pulse_pressure'] == latest['pulse_pressure'] else "N/A")
+        c3.metric("Readings", len(vitals))
+
+        charts = {
+            "Weight & BMI": (["weight", "weight_trend", "bmi"], "Value"),
+            "Blood Pressure": (["bp_systolic", "bp_diastolic", "bp_systolic_trend", "bp_diastolic_trend"], "mmHg"),
+        }
+        for tab, (title, (columns, unit)) in zip(st.tabs(list(charts)), charts.items()):
+            with tab:
+                points = downsample(vitals, columns)
+                if points.empty:
+                    st.write(f"No {title.lower()} readings yet.")
+                    continue
+                figure = px.line(points, x="record_date", y="value", color="measure",
+                                 labels={"record_date": "Date", "value": unit, "measure": ""})
+                st.plotly_chart(figure, use_container_width=True)
\ No newline at end of file
@@ -0,0 +1,336 @@
+# query_metrics.py
+"""
+Per-query instrumentation for DBManager.
+
+Every statement is recorded under (call site, DBManager method, query
+template) with latency histograms for its connect, execute and fetch phases
+and a histogram of rows returned. Statements slower than the configured
+threshold go to the slow-query log. Metrics render in the Prometheus text
+exposition format, optionally written to a file that node_exporter's textfile
+collector (or any scraper) can pick up.
+"""
+import hashlib
+import os
+import re
+import sys
+import threading
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from time import monotonic
+import config
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROWS_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000, 100000)
+PHASES = ("connect", "execute", "fetch")
+
+# Frames from these files are plumbing; the call site is the first frame outside them
+_INTERNAL_FILES = {"db_manager.py", "read_cache.py", "query_metrics.py", "concurrent_reads.py",
+                   "contextlib.py", "threading.py", "thread.py"}
+_REPEATED_VALUES = re.compile(r"(\([^()]*%s[^()]*\))(?:\s*,\s*\([^()]*%s[^()]*\))+")
+
+
+class Histogram:
+    """Fixed-bucket histogram; observe() is a bisect plus two additions."""
+
+    __slots__ = ("bounds", "counts", "total", "count")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1) # Last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Approximate quantile: the upper bound of the bucket holding the q-th observation."""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, bucket in zip(self.bounds + (float("inf"),), self.counts):
+            seen += bucket
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class QueryStats:
+    """Counts and histograms for one (site, method, template)."""
+
+    __slots__ = ("site", "method", "template", "query_id", "calls", "errors", "phases", "rows", "max_seconds")
+
+    def __init__(self, site, method, template):
+        self.site = site
+        self.method = method
+        self.template = template
+        self.query_id = hashlib.sha1(template.encode()).hexdigest()[:10]
+        self.calls = 0
+        self.errors = 0
+        self.phases = {phase: Histogram(LATENCY_BUCKETS) for phase in PHASES}
+        self.rows = Histogram(ROWS_BUCKETS)
+        self.max_seconds = 0.0
+
+
+def normalize_query(query):
+    """Collapse whitespace and multi-row VALUES lists so every batch size shares one template."""
+    return _REPEATED_VALUES.sub(r"\1, ...", " ".join(query.split()))
+
+
+# Site that handed a read to a worker thread, whose own stack is all plumbing
+_SUBMITTED_FROM = ContextVar("qms_submitted_from", default=None)
+
+
+def call_site():
+    """(caller outside the data layer, DBManager method) for the statement being run."""
+    frame = sys._getframe(2)
+    method = None
+    while frame is not None:
+        filename = os.path.basename(frame.f_code.co_filename)
+        if filename not in _INTERNAL_FILES:
+            site = f"{frame.f_globals.get('__name__', filename)}.{frame.f_code.co_name}"
+            return site, method or "?"
+        if filename == "db_manager.py":
+            qualname = getattr(frame.f_code, "co_qualname", frame.f_code.co_name)
+            if not any(part.startswith("_") for part in qualname.split(".")):
+                method = frame.f_code.co_name # Outermost public DBManager method wins
+        frame = frame.f_back
+    return _SUBMITTED_FROM.get() or "?", method or "?"
+
+
+def submitting_site():
+    """The caller outside the data layer on this thread's stack, to pass along with work sent to another thread."""
+    return call_site()[0]
+
+
+def run_from_site(site, fn, *args):
+    """Run `fn(*args)` with statements attributed to `site` (for reads running on worker threads)."""
+    token = _SUBMITTED_FROM.set(site)
+    try:
+        return fn(*args)
+    finally:
+        _SUBMITTED_FROM.reset(token)
+
+
+class QueryMetrics:
+    """Thread-safe registry of per-query stats plus the slow-query log."""
+
+    def __init__(self, slow_query_seconds=0.5, slow_log_path=None, slow_log_size=100, log_params=False,
+                 export_path=None, export_interval=15.0):
+        self.slow_query_seconds = slow_query_seconds
+        self.slow_log_path = slow_log_path
+        self.log_params = log_params # Off by default: parameters carry patient data and password hashes
+        self.slow_queries = deque(maxlen=slow_log_size) # Most recent slow statements, for the admin panel
+        self.export_path = export_path
+        self.export_interval = export_interval
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._last_export = monotonic()
+
+    def record(self, site, method, query, connect=None, execute=None, fetch=None, rows=None, error=False, params=None):
+        """Record one statement; phases that weren't measured are passed as None."""
+        template = normalize_query(query)
+        elapsed = sum(phase for phase in (connect, execute, fetch) if phase is not None)
+        key = (site, method, template)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = QueryStats(site, method, template)
+            stats.calls += 1
+            stats.errors += bool(error)
+            for phase, value in zip(PHASES, (connect, execute, fetch)):
+                if value is not None:
+                    stats.phases[phase].observe(value)
+            if rows is not None and rows >= 0:
+                stats.rows.observe(rows)
+            stats.max_seconds = max(stats.max_seconds, elapsed)
+        if elapsed >= self.slow_query_seconds:
+            self._log_slow(site, method, template, elapsed, connect, execute, fetch, rows, params)
+        if self.export_path and monotonic() - self._last_export >= self.export_interval:
+            self.export()
+
+    def _log_slow(self, site, method, template, elapsed, connect, execute, fetch, rows, params):
+        entry = {
+            "at": datetime.now().isoformat(timespec="seconds"), "seconds": round(elapsed, 4),
+            "site": site, "method": method, "query": template, "rows": rows,
+            "connect": connect, "execute": execute, "fetch": fetch,
+        }
+        self.slow_queries.append(entry)
+        line = f"{entry['at']} SLOW {elapsed * 1000:.1f}ms site={site} method={method} rows={rows} query={template}"
+        if self.log_params:
+            line += f" params={params!r}"
+        if self.slow_log_path:
+            try:
+                with open(self.slow_log_path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+                return
+            except OSError as e:
+                print(f"Cannot write slow-query log {self.slow_log_path}: {e}", file=sys.stderr)
+        print(line, file=sys.stderr)
+
+    def snapshot(self):
+        """Copy of the current stats, safe to read while queries keep running."""
+        with self._lock:
+            return [self._copy(stats) for stats in self._stats.values()]
+
+    @staticmethod
+    def _copy(stats):
+        clone = QueryStats(stats.site, stats.method, stats.template)
+        clone.calls, clone.errors, clone.max_seconds = stats.calls, stats.errors, stats.max_seconds
+        for phase, histogram in stats.phases.items():
+            clone.phases[phase].counts = list(histogram.counts)
+            clone.phases[phase].total, clone.phases[phase].count = histogram.total, histogram.count
+        clone.rows.counts, clone.rows.total, clone.rows.count = list(stats.rows.counts), stats.rows.total, stats.rows.count
+        return clone
+
+    def summary(self):
+        """One dict per query template, slowest total time first (for tables in the admin panel)."""
+        rows = []
+        for stats in self.snapshot():
+            execute = stats.phases["execute"]
+            rows.append({
+                "site": stats.site, "method": stats.method, "query": stats.template, "calls": stats.calls,
+                "errors": stats.errors,
+                "total_ms": round(sum(h.total for h in stats.phases.values()) * 1000, 1),
+                "connect_p95_ms": _ms(stats.phases["connect"].quantile(0.95)),
+                "execute_p50_ms": _ms(execute.quantile(0.5)),
+                "execute_p95_ms": _ms(execute.quantile(0.95)),
+                "fetch_p95_ms": _ms(stats.phases["fetch"].quantile(0.95)),
+                "max_ms": round(stats.max_seconds * 1000, 1),
+                "avg_rows": round(stats.rows.total / stats.rows.count, 1) if stats.rows.count else None,
+            })
+        return sorted(rows, key=lambda row: row["total_ms"], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+        self.slow_queries.clear()
+
+    def render_prometheus(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = [
+            "# HELP qms_db_query_info Query template for each query_id.",
+            "# TYPE qms_db_query_info gauge",
+        ]
+        snapshot = self.snapshot()
+        for stats in snapshot:
+            lines.append(f"qms_db_query_info{{query_id=\"{stats.query_id}\",query=\"{_escape(stats.template)}\"}} 1")
+        lines += ["# HELP qms_db_queries_total Statements run.", "# TYPE qms_db_queries_total counter"]
+        for stats in snapshot:
+            lines.append(f"qms_db_queries_total{{{_labels(stats)}}} {stats.calls}")
+        lines += ["# HELP qms_db_query_errors_total Statements that raised a database error.",
+                  "# TYPE qms_db_query_errors_total counter"]
+        for stats in snapshot:
+            lines.append(f"qms_db_query_errors_total{{{_labels(stats)}}} {stats.errors}")
+        lines += ["# HELP qms_db_query_seconds Time per phase (connect = pool checkout).",
+                  "# TYPE qms_db_query_seconds histogram"]
+        for stats in snapshot:
+            for phase, histogram in stats.phases.items():
+                lines += _histogram_lines("qms_db_query_seconds", f"{_labels(stats)},phase=\"{phase}\"", histogram)
+        lines += ["# HELP qms_db_query_rows Rows returned (or affected) per statement.",
+                  "# TYPE qms_db_query_rows histogram"]
+        for stats in snapshot:
+            lines += _histogram_lines("qms_db_query_rows", _labels(stats), stats.rows)
+        return "\n".join(lines) + "\n"
+
+    def export(self, path=None):
+        """Atomically write the Prometheus text to `path` (default: the configured export file)."""
+        path = path or self.export_path
+        self._last_export = monotonic()
+        if not path:
+            return
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(self.render_prometheus())
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"Cannot write metrics file {path}: {e}", file=sys.stderr)
+
+
+def _ms(seconds):
+    if seconds is None:
+        return None
+    return "inf" if seconds == float("inf") else round(seconds * 1000, 2)
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", " ")
+
+
+def _labels(stats):
+    return f"site=\"{_escape(stats.site)}\",method=\"{stats.method}\",query_id=\"{stats.query_id}\""
+
+
+def _histogram_lines(name, labels, histogram):
+    lines, cumulative = [], 0
+    for bound, bucket in zip(histogram.bounds + (float("inf"),), histogram.counts):
+        cumulative += bucket
+        le = "+Inf" if bound == float("inf") else repr(bound)
+        lines.append(f"{name}_bucket{{{labels},le=\"{le}\"}} {cumulative}")
+    lines.append(f"{name}_sum{{{labels}}} {histogram.total}")
+    lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+    return lines
+
+
+class DBCallCounter:
+    """Statements run, and time spent in them, within one track_db_calls() block."""
+
+    __slots__ = ("calls", "seconds", "_lock")
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock() # Concurrent reads update the same rerun's counter
+
+    def add(self, seconds):
+        with self._lock:
+            self.calls += 1
+            self.seconds += seconds
+
+
+# Set per Streamlit rerun (each runs in its own script thread / context)
+_DB_CALLS = ContextVar("qms_db_calls", default=None)
+
+
+@contextmanager
+def track_db_calls():
+    """Count every DBManager statement run in this context until the block exits."""
+    counter = DBCallCounter()
+    token = _DB_CALLS.set(counter)
+    try:
+        yield counter
+    finally:
+        _DB_CALLS.reset(token)
+
+
+def note_db_call(seconds):
+    counter = _DB_CALLS.get()
+    if counter is not None:
+        counter.add(seconds)
+
+
+_METRICS = None
+_METRICS_LOCK = threading.Lock()
+
+
+def get_query_metrics():
+    """Return the process-wide QueryMetrics, or None when instrumentation is disabled."""
+    global _METRICS
+    if not config.QUERY_METRICS_ENABLED:
+        return None
+    with _METRICS_LOCK:
+        if _METRICS is None:
+            _METRICS = QueryMetrics(
+                slow_query_seconds=config.SLOW_QUERY_MS / 1000.0,
+                slow_log_path=config.SLOW_QUERY_LOG,
+                log_params=config.SLOW_QUERY_LOG_PARAMS,
+                export_path=config.METRICS_FILE,
+                export_interval=config.METRICS_EXPORT_INTERVAL,
+            )
+        return _METRICS
@@ -0,0 +1,324 @@
+# query_plan_check.py
+"""
+Query-plan regression check for every SQL statement DBManager issues.
+
+Seeds a scratch database with realistic volumes, drives each DBManager
+method once while recording the statements it sends, then runs EXPLAIN
+(MySQL) or EXPLAIN QUERY PLAN (SQLite) on each one. A statement fails if it
+scans a whole table, sorts a large table outside an index (filesort / temp
+B-tree), or does more work than its budget: estimated rows examined on MySQL,
+virtual-machine steps when actually run on SQLite.
+
+Usage:
+    python query_plan_check.py [--scale 1.0] [--database-url mysql://.../scratch_db] [--verbose]
+
+Without --database-url a temporary SQLite file is used. Never point it at a
+real database: it inserts seed data. Exits non-zero on any violation.
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+from datetime import date, datetime, time, timedelta
+
+import config
+from db_backends import backend_from_url
+from db_manager import DBManager
+from password_hashing import hash_password
+
+# Seed volumes at --scale 1.0
+SEED_USERS = 20000
+SEED_APPOINTMENTS = 200000
+SEED_HEALTH_ROWS = 60000
+SEED_HISTORY_ROWS = 60000
+SEED_DAYS = 365
+
+# Work allowed per statement: estimated rows examined (MySQL) / VM steps (SQLite)
+DEFAULT_ROW_BUDGET = 2000
+DEFAULT_VM_STEP_BUDGET = 100000
+
+# Call sites that read a whole table by design, with why; their scans and budgets aren't enforced
+FULL_READ_ALLOWED = {
+    "get_users": "returns every user",
+    "iter_export_rows (all rows)": "bulk export of a whole table in key order",
+    "rebuild_appointment_rollups": "compaction job; aggregates every booking in the range",
+}
+
+# Per call-site budget overrides (rows, vm_steps) for statements that legitimately touch more
+BUDGET_OVERRIDES = {
+    # Bounded by the dashboard window (doctors x days), not by total bookings
+    "get_daily_volume": (20000, 2000000),
+    "get_hourly_volume": (20000, 2000000),
+    "get_doctor_volume": (20000, 2000000),
+    # A few hundred bookings per day across all doctors, grouped per slot
+    "get_full_slots": (20000, 2000000),
+    # Streams a full quarter of bookings to warm the wait-time estimator
+    "iter_appointment_timeline": (100000, 20000000),
+    "iter_export_rows (date range)": (5000, 200000),
+    "iter_users": (20000, 2000000),
+}
+
+HOSPITALS = [f"Hospital {i}" for i in range(8)]
+DEPARTMENTS = ["Cardiology", "Neurology", "Orthopedics", "Pediatrics", "General Medicine"]
+DOCTORS = [f"Dr. {chr(65 + i)}" for i in range(6)]
+STATES = ["Maharashtra", "Karnataka", "Delhi", "Kerala", "Gujarat", "Punjab"]
+
+
+class StatementRecorder:
+    """Wraps backend.execute to remember the first (query, params) each call site sends."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.site = None
+        self.statements = {} # (site, normalized query) -> (site, query, params)
+        self._execute = backend.execute
+        backend.execute = self._record
+
+    def _record(self, cursor, query, params=None):
+        if self.site is not None:
+            key = (self.site, " ".join(query.split()))
+            self.statements.setdefault(key, (self.site, query, params))
+        return self._execute(cursor, query, params)
+
+
+def seed(db, scale, rng):
+    """Bulk-load users, appointments, slots and health rows, then build the rollups."""
+    n_users = int(SEED_USERS * scale)
+    password = hash_password("seed-password", iterations=1000)
+    start = date.today() - timedelta(days=SEED_DAYS // 2)
+    users = [
+        (f"user{i:06d}", password, f"Patient {i}", f"Parent {i}", date(1960 + i % 40, 1 + i % 12, 1 + i % 28),
+         f"user{i}@example.com", f"City {i % 50}", STATES[i % len(STATES)], "India")
+        for i in range(n_users)
+    ]
+    appointments, seen = [], set()
+    while len(appointments) < int(SEED_APPOINTMENTS * scale):
+        row = (
+            f"user{rng.randrange(n_users):06d}", rng.choice(HOSPITALS), rng.choice(DEPARTMENTS), rng.choice(DOCTORS),
+            start + timedelta(days=rng.randrange(SEED_DAYS)), time(9 + rng.randrange(8), rng.choice((0, 30))),
+        )
+        if row not in seen:
+            seen.add(row)
+            appointments.append(row + (datetime.now() - timedelta(minutes=rng.randrange(100000)),))
+
+    def health_rows(count, with_sugar):
+        rows = []
+        for i in range(int(count * scale)):
+            username, record_date = f"user{i % n_users:06d}", start + timedelta(days=i // n_users)
+            systolic, diastolic = 100 + rng.randrange(50), 60 + rng.randrange(30)
+            row = (username, record_date, 50 + rng.random() * 50, 150 + rng.random() * 40, f"{systolic}/{diastolic}", systolic, diastolic)
+            rows.append(row + ((4 + rng.random() * 4,) if with_sugar else ("", "")))
+        return rows
+
+    statements = [
+        ("INSERT INTO users (username, password, full_name, father_name, dob, email, city, state, country)"
+         " VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)", users),
+        ("INSERT INTO booked_appointments (username, hospital, department, doctor, appointment_date, appointment_time, booking_time)"
+         " VALUES (%s, %s, %s, %s, %s, %s, %s)", appointments),
+        ("INSERT INTO health_data (username, record_date, weight, height, bp, bp_systolic, bp_diastolic, symptoms, pre_meds)"
+         " VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)", health_rows(SEED_HEALTH_ROWS, False)),
+        ("INSERT INTO user_health_history (username, record_date, weight, height, bp, bp_systolic, bp_diastolic, sugar)"
+         " VALUES (%s, %s, %s, %s, %s, %s, %s, %s)", health_rows(SEED_HISTORY_ROWS, True)),
+        ("INSERT INTO doctor_slots (hospital, department, doctor, slot_date, slot_time, capacity, booked)"
+         " SELECT hospital, department, doctor, appointment_date, appointment_time, 4, COUNT(*) FROM booked_appointments"
+         " GROUP BY hospital, department, doctor, appointment_date, appointment_time", None),
+    ]
+    with db._transaction() as tx:
+        for query, rows in statements:
+            if rows is None:
+                tx.execute(query)
+            else:
+                for offset in range(0, len(rows), 5000):
+                    tx.cursor.executemany(db.backend.prepare(query), rows[offset:offset + 5000])
+    db.rebuild_appointment_rollups(start, start + timedelta(days=SEED_DAYS))
+    if db.backend.name == "sqlite":
+        db._execute_query("ANALYZE") # Planner statistics, as a long-lived database would have
+    return n_users, appointments
+
+
+def workload(db, n_users, appointments, rng):
+    """(call site, callable) for every DBManager read/write path, with realistic arguments."""
+    username = f"user{rng.randrange(n_users):06d}"
+    user, hospital, department, doctor, appt_date, appt_time, _ = rng.choice(appointments)
+    appt = {"Hospital": hospital, "Department": department, "Doctor": doctor, "Date": appt_date, "Time": appt_time,
+            "booking_time": datetime.now()}
+    window_from, window_to = date.today() - timedelta(days=30), date.today() + timedelta(days=30)
+    first_page, cursor = db.get_booked_appointments_page(user, page_size=5)
+    credentials = db.get_user_credentials(username)
+    return [
+        ("get_users", db.get_users),
+        ("iter_users", lambda: list(db.iter_users(state=STATES[0], city="City 0"))),
+        ("find_users", lambda: db.find_users(state=STATES[1], page_size=20)),
+        ("find_users (city)", lambda: db.find_users(state=STATES[1], city="City 7", page_size=20)),
+        ("find_users (name prefix)", lambda: db.find_users(name_prefix="Patient 12", page_size=20)),
+        ("user_exists", lambda: db.user_exists(username)),
+        ("get_user_credentials", lambda: db.get_user_credentials(username)),
+        ("update_password_hash", lambda: db.update_password_hash(username, credentials['password'], credentials['password'])),
+        ("add_user", lambda: db.add_user({
+            "username": "plan_check_user", "password": "x", "full_name": "Plan Check", "father_name": "", "dob": date(1990, 1, 1),
+            "email": "", "city": "", "state": "", "country": ""})),
+        ("save_health_data", lambda: db.save_health_data(username, {
+            "weight": 70, "height": 170, "symptoms": "", "pre_meds": "", "bp": "120/80", "record_date": date.today()})),
+        ("get_last_health_data", lambda: db.get_last_health_data(username)),
+        ("get_health_series", lambda: db.get_health_series(username)),
+        ("get_health_series (history)", lambda: db.get_health_series(username, source="user_health_history")),
+        ("save_user_health_history", lambda: db.save_user_health_history(username, date.today(), {
+            "weight": 70, "height": 170, "bp": "120/80", "sugar": 5.5})),
+        ("get_user_health_history", lambda: db.get_user_health_history(username)),
+        ("get_booked_appointments", lambda: db.get_booked_appointments(user)),
+        ("get_booked_appointments_page", lambda: db.get_booked_appointments_page(user, page_size=5, after=cursor)),
+        ("get_booked_appointments_page (dates)", lambda: db.get_booked_appointments_page(
+            user, page_size=5, date_from=window_from, date_to=window_to)),
+        ("count_booked_appointments", lambda: db.count_booked_appointments(user, date_from=window_from, date_to=window_to)),
+        ("appointment_exists", lambda: db.appointment_exists(user, appt)),
+        ("get_doctor_day_bookings", lambda: db.get_doctor_day_bookings(hospital, department, doctor, appt_date)),
+        ("get_full_slots", lambda: db.get_full_slots(date.today(), date.today() + timedelta(days=1))),
+        ("iter_appointment_timeline", lambda: list(db.iter_appointment_timeline(date.today() - timedelta(days=90)))),
+        ("set_slot_capacity", lambda: db.set_slot_capacity(hospital, department, doctor, appt_date, appt_time, 4)),
+        ("reserve_appointment", lambda: db.reserve_appointment("plan_check_user", appt, capacity=100)),
+        ("reserve_appointment (new slot)", lambda: db.reserve_appointment("plan_check_user", dict(appt, Time=time(7, 0)))),
+        ("get_daily_volume", lambda: db.get_daily_volume(window_from, window_to, hospital)),
+        ("get_hourly_volume", lambda: db.get_hourly_volume(window_from, window_to)),
+        ("get_doctor_volume", lambda: db.get_doctor_volume(window_from, window_to)),
+        ("rebuild_appointment_rollups", lambda: db.rebuild_appointment_rollups(date.today(), date.today())),
+        ("iter_export_rows (all rows)", lambda: sum(1 for _ in db.iter_export_rows("health_data"))),
+        ("iter_export_rows (date range)", lambda: sum(1 for _ in db.iter_export_rows(
+            "booked_appointments", date_from=date.today(), date_to=date.today(), after_key=1000))),
+    ]
+
+
+# --- Plan inspection ---
+SQLITE_FULL_SCAN = re.compile(r"^SCAN (\w+)\b(?! USING (?:COVERING )?INDEX)")
+SQLITE_INDEX_SCAN = re.compile(r"^SCAN (\w+) USING (?:COVERING )?INDEX")
+SQLITE_SORT = re.compile(r"USE TEMP B-TREE FOR (ORDER BY|GROUP BY|DISTINCT)")
+INSPECTED = re.compile(r"^\s*(SELECT|UPDATE|DELETE|INSERT\s+INTO\s+\w+\s*\([^)]*\)\s*SELECT)", re.IGNORECASE)
+
+
+def sqlite_check(db, conn, query, params):
+    """Return (problems, vm_steps) for one statement on SQLite."""
+    sql = db.backend.prepare(query)
+    args = params if params is not None else ()
+    problems = []
+    details = [row['detail'] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, args).fetchall()]
+    seeks = any(detail.startswith("SEARCH") for detail in details)
+    for detail in details:
+        if SQLITE_FULL_SCAN.match(detail):
+            problems.append(f"full table scan: {detail}")
+        elif SQLITE_INDEX_SCAN.match(detail):
+            problems.append(f"full index scan: {detail}")
+        # Sorting the rows an index seek returned is bounded (and charged to the budget);
+        # sorting a scanned table is not
+        if SQLITE_SORT.search(detail) and not seeks:
+            problems.append(f"temp B-tree sort: {detail}")
+
+    steps = 0
+    if query.lstrip().upper().startswith("SELECT"):
+        counter = [0]
+
+        def tick():
+            counter[0] += 100
+            return 0
+        conn.set_progress_handler(tick, 100)
+        try:
+            conn.execute(sql, args).fetchall()
+        finally:
+            conn.set_progress_handler(None, 0)
+        steps = counter[0]
+    return problems, steps
+
+
+def mysql_check(db, conn, query, params):
+    """Return (problems, estimated rows examined) for one statement on MySQL."""
+    problems, rows = [], 0
+    with db.backend.cursor(conn) as cursor:
+        db.backend.execute(cursor, "EXPLAIN " + query, params)
+        for row in cursor.fetchall():
+            rows += int(row.get('rows') or 0)
+            extra = row.get('Extra') or ""
+            if row.get('type') == "ALL":
+                problems.append(f"full table scan of {row.get('table')}")
+            elif row.get('type') == "index" and "Using where" not in extra:
+                problems.append(f"full index scan of {row.get('table')} ({row.get('key')})")
+            if ("Using filesort" in extra or "Using temporary" in extra) and row.get('type') in ("ALL", "index"):
+                problems.append(f"{extra.strip()} on {row.get('table')}")
+    conn.rollback()
+    return problems, rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply the seed volumes")
+    parser.add_argument("--database-url", help="Scratch database to seed (default: a temporary SQLite file)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--verbose", action="store_true", help="Print the plan summary for passing statements too")
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary SQLite database for inspection")
+    args = parser.parse_args(argv)
+
+    tmpdir = None
+    url = args.database_url
+    if url is None:
+        tmpdir = tempfile.mkdtemp(prefix="qms-plan-")
+        url = "sqlite:///" + os.path.join(tmpdir, "plan_check.db")
+    backend = backend_from_url(url, config.SQLITE_BUSY_TIMEOUT)
+    if backend.name == "mysql":
+        from schema import migrate
+        conn = backend.connect()
+        migrate(backend, conn)
+        conn.close()
+
+    db = DBManager(backend=backend)
+    db.metrics = None # Seeding is deliberately slow; keep it out of the slow-query log
+    rng = random.Random(args.seed)
+    print(f"Seeding {backend.name} database (scale {args.scale})...")
+    n_users, appointments = seed(db, args.scale, rng)
+
+    recorder = StatementRecorder(backend)
+    db.read_cache.clear()
+    for site, call in workload(db, n_users, appointments, rng):
+        recorder.site = site
+        call()
+    recorder.site = None
+
+    failures = 0
+    with db.pool.connection() as conn:
+        for site, query, params in recorder.statements.values():
+            if not INSPECTED.match(query):
+                continue # Plain INSERT ... VALUES / DDL: nothing to plan
+            if backend.name == "sqlite":
+                problems, work = sqlite_check(db, conn, query, params)
+                budget = BUDGET_OVERRIDES.get(site, (None, DEFAULT_VM_STEP_BUDGET))[1]
+                unit = "VM steps"
+            else:
+                problems, work = mysql_check(db, conn, query, params)
+                budget = BUDGET_OVERRIDES.get(site, (DEFAULT_ROW_BUDGET, None))[0]
+                unit = "rows examined (est.)"
+            allowed = FULL_READ_ALLOWED.get(site)
+            if work > budget:
+                problems.append(f"{work} {unit} exceeds budget of {budget}")
+            summary = " ".join(query.split())
+            if problems and not allowed:
+                failures += 1
+                print(f"FAIL {site}: {summary}")
+                for problem in problems:
+                    print(f"       - {problem}")
+            elif args.verbose:
+                note = f" (allowed: {allowed})" if problems and allowed else ""
+                print(f"ok   {site}: {work} {unit}{note}")
+
+    db.pool.close_all()
+    if tmpdir and args.keep:
+        print(f"Database kept at {url}")
+    elif tmpdir:
+        for name in os.listdir(tmpdir):
+            os.remove(os.path.join(tmpdir, name))
+        os.rmdir(tmpdir)
+
+    checked = sum(1 for _, query, _ in recorder.statements.values() if INSPECTED.match(query))
+    print(f"{checked} statements checked, {failures} failing.")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
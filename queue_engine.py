@@ -0,0 +1,301 @@
+# queue_engine.py
+"""
+Live token queues, one per hospital / department / doctor / day.
+
+Tokens are issued in arrival order, as at a hospital token counter: the order
+of booking ids, whether a queue is built live or warm-started after a restart,
+so a patient's token never changes. Each queue
+keeps a Fenwick (binary indexed) tree over queue positions holding 1 for every
+waiting token, so "my position", "people ahead of me", call-next, skip and
+no-show are all O(log n) instead of a scan over the day's bookings.
+"""
+import threading
+from datetime import date
+
+
+class FenwickTree:
+    """Growable binary indexed tree of counts over positions 1..n."""
+
+    def __init__(self, capacity=64):
+        self._values = [0] * (capacity + 1)
+        self._tree = [0] * (capacity + 1)
+
+    def __len__(self):
+        return len(self._tree) - 1
+
+    def _grow(self, needed):
+        # Double the size and rebuild in O(n); amortized O(1) per appended position
+        size = len(self)
+        while size < needed:
+            size *= 2
+        self._values.extend([0] * (size - len(self)))
+        self._tree = list(self._values)
+        for i in range(1, size + 1):
+            parent = i + (i & -i)
+            if parent <= size:
+                self._tree[parent] += self._tree[i]
+
+    def add(self, index, delta):
+        if index > len(self):
+            self._grow(index)
+        self._values[index] += delta
+        while index <= len(self):
+            self._tree[index] += delta
+            index += index & -index
+
+    def prefix_sum(self, index):
+        index = min(index, len(self))
+        total = 0
+        while index > 0:
+            total += self._tree[index]
+            index -= index & -index
+        return total
+
+    def find_kth(self, k):
+        """Smallest index whose prefix sum reaches k, or None if the total is below k."""
+        if k <= 0:
+            return None
+        pos = 0
+        step = 1 << (len(self).bit_length() - 1)
+        while step:
+            nxt = pos + step
+            if nxt <= len(self) and self._tree[nxt] < k:
+                pos = nxt
+                k -= self._tree[nxt]
+            step >>= 1
+        return pos + 1 if pos < len(self) else None
+
+
+class TokenStatus:
+    WAITING = "waiting"
+    SERVING = "serving"
+    DONE = "done"
+    NO_SHOW = "no_show"
+
+
+class TokenQueue:
+    """Token queue for one doctor's day; all operations are thread-safe and O(log n)."""
+
+    def __init__(self, key):
+        self.key = key
+        self._lock = threading.Lock()
+        self._tree = FenwickTree()
+        self._slot_token = [None] # Queue position -> token (index 0 unused)
+        self._token_slot = {} # Token -> current queue position
+        self._status = {}
+        self._owner = {}
+        self._user_tokens = {}
+        self._appointment_tokens = {}
+        self._next_token = 1
+        self.last_appointment_id = 0 # Highest booking id absorbed from the database
+        self.serving = None
+
+    def issue(self, username, appointment_id=None):
+        """Issue the next token to `username`; re-issuing a known appointment returns its token."""
+        with self._lock:
+            if appointment_id is not None and appointment_id in self._appointment_tokens:
+                return self._appointment_tokens[appointment_id]
+            token = self._next_token
+            self._next_token += 1
+            self._owner[token] = username
+            self._user_tokens.setdefault(username, []).append(token)
+            if appointment_id is not None:
+                self._appointment_tokens[appointment_id] = token
+            self._enqueue_locked(token)
+            return token
+
+    def absorb(self, rows):
+        """Issue tokens, in order, to booking rows (id, username) not seen yet; returns how many were new."""
+        issued = 0
+        with self._lock:
+            for row in rows:
+                if row['id'] > self.last_appointment_id:
+                    self.last_appointment_id = row['id']
+                if row['id'] not in self._appointment_tokens:
+                    token = self._next_token
+                    self._next_token += 1
+                    self._owner[token] = row['username']
+                    self._user_tokens.setdefault(row['username'], []).append(token)
+                    self._appointment_tokens[row['id']] = token
+                    self._enqueue_locked(token)
+                    issued += 1
+        return issued
+
+    def token_for(self, appointment_id):
+        with self._lock:
+            return self._appointment_tokens.get(appointment_id)
+
+    def position(self, token):
+        """1-based place among waiting tokens, or None if the token isn't waiting."""
+        with self._lock:
+            if self._status.get(token) != TokenStatus.WAITING:
+                return None
+            return self._tree.prefix_sum(self._token_slot[token])
+
+    def people_ahead(self, token):
+        position = self.position(token)
+        return None if position is None else position - 1
+
+    def tokens_for(self, username):
+        with self._lock:
+            return list(self._user_tokens.get(username, ()))
+
+    def status(self, token):
+        with self._lock:
+            return self._status.get(token)
+
+    def waiting_count(self):
+        with self._lock:
+            return self._tree.prefix_sum(len(self._tree))
+
+    def call_next(self):
+        """Mark the current patient done and start serving the head of the queue; returns its token."""
+        with self._lock:
+            if self.serving is not None:
+                self._status[self.serving] = TokenStatus.DONE
+                self.serving = None
+            slot = self._tree.find_kth(1)
+            if slot is None:
+                return None
+            token = self._slot_token[slot]
+            self._dequeue_locked(token)
+            self._status[token] = TokenStatus.SERVING
+            self.serving = token
+            return token
+
+    def skip(self, token=None):
+        """Send a token (default: the head of the queue) to the back; it keeps its number."""
+        with self._lock:
+            if token is None:
+                slot = self._tree.find_kth(1)
+                if slot is None:
+                    return None
+                token = self._slot_token[slot]
+            if token == self.serving:
+                self.serving = None
+            elif self._status.get(token) != TokenStatus.WAITING:
+                return None
+            else:
+                self._dequeue_locked(token)
+            self._enqueue_locked(token)
+            return token
+
+    def no_show(self, token):
+        """Drop a token that didn't turn up; returns False if it wasn't waiting or being served."""
+        with self._lock:
+            if token == self.serving:
+                self.serving = None
+            elif self._status.get(token) == TokenStatus.WAITING:
+                self._dequeue_locked(token)
+            else:
+                return False
+            self._status[token] = TokenStatus.NO_SHOW
+            return True
+
+    def _enqueue_locked(self, token):
+        self._slot_token.append(token)
+        slot = len(self._slot_token) - 1
+        self._token_slot[token] = slot
+        self._status[token] = TokenStatus.WAITING
+        self._tree.add(slot, 1)
+
+    def _dequeue_locked(self, token):
+        slot = self._token_slot.pop(token)
+        self._slot_token[slot] = None
+        self._tree.add(slot, -1)
+
+
+class QueueRegistry:
+    """Process-wide map of live queues, warm-started from booked_appointments on first use."""
+
+    def __init__(self, db_manager, observer=None):
+        self.db_manager = db_manager
+        self.observer = observer # Optional on_issue/on_call/on_dequeue hooks, e.g. the wait-time estimator
+        self._queues = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(hospital, department, doctor, day):
+        if isinstance(day, str):
+            day = date.fromisoformat(day)
+        return (hospital, department, doctor, day)
+
+    def get_queue(self, hospital, department, doctor, day):
+        key = self.make_key(hospital, department, doctor, day)
+        queue = self._queues.get(key)
+        if queue is not None:
+            return queue
+        # Warm-start outside the registry lock so a slow read only delays this doctor-day.
+        # Existing bookings get tokens in booking-id order, the same rule issue() follows.
+        loaded = TokenQueue(key)
+        loaded.absorb(self.db_manager.get_doctor_day_bookings(*key))
+        with self._lock:
+            queue = self._queues.get(key)
+            if queue is None: # Otherwise another thread published first; drop our copy
+                self._evict_past_days_locked()
+                queue = self._queues[key] = loaded
+            return queue
+
+    def _evict_past_days_locked(self):
+        today = date.today()
+        for key in [key for key in self._queues if key[3] < today]:
+            del self._queues[key]
+
+    def waiting_count(self, hospital, department, doctor, day):
+        return self.get_queue(hospital, department, doctor, day).waiting_count()
+
+    def issue(self, hospital, department, doctor, day, username, appointment_id=None):
+        """
+        Issue a token for a new booking (idempotent per appointment_id).
+
+        Rather than numbering this booking on arrival, the queue first absorbs every
+        booking after the last one it knows, in id order. Numbers then match a warm
+        start, and include bookings made by other processes.
+        """
+        queue = self.get_queue(hospital, department, doctor, day)
+        token = queue.token_for(appointment_id)
+        if token is not None:
+            return token
+        issued = 0
+        if appointment_id is not None:
+            issued = queue.absorb(
+                self.db_manager.get_doctor_day_bookings(*queue.key, after_id=queue.last_appointment_id)
+            )
+            token = queue.token_for(appointment_id)
+        if token is None:
+            # No id, or the read failed: number it now rather than not at all
+            token = queue.issue(username, appointment_id=appointment_id)
+            issued += 1
+        if self.observer is not None:
+            for _ in range(issued):
+                self.observer.on_issue(queue.key, queue.waiting_count())
+        return token
+
+    def call_next(self, hospital, department, doctor, day):
+        """Start serving the head of the doctor's queue; returns its token."""
+        queue = self.get_queue(hospital, department, doctor, day)
+        token = queue.call_next()
+        if self.observer is not None and token is not None:
+            self.observer.on_call(queue.key, queue.waiting_count())
+        return token
+
+    def no_show(self, hospital, department, doctor, day, token):
+        queue = self.get_queue(hospital, department, doctor, day)
+        dropped = queue.no_show(token)
+        if self.observer is not None and dropped:
+            self.observer.on_dequeue(queue.key, queue.waiting_count())
+        return dropped
+
+
+_REGISTRY = None
+_REGISTRY_LOCK = threading.Lock()
+
+
+def get_queue_registry(db_manager):
+    """Return the process-wide QueueRegistry, creating it with `db_manager` on first call."""
+    global _REGISTRY
+    with _REGISTRY_LOCK:
+        if _REGISTRY is None:
+            from wait_time import get_wait_time_estimator
+            _REGISTRY = QueueRegistry(db_manager, observer=get_wait_time_estimator(db_manager))
+        return _REGISTRY
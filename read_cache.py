@@ -0,0 +1,85 @@
+# read_cache.py
+"""
+Per-user read-through cache for DBManager lookups.
+
+Entries are grouped by username so a write can drop everything cached for that
+user in O(1). The cache is an LRU over users with a per-entry TTL, and keeps a
+per-user generation counter so a read that raced with a write can't store a
+stale value after the invalidation.
+"""
+import threading
+from collections import OrderedDict
+from time import monotonic
+
+
+class UserReadCache:
+    """Thread-safe, TTL-bounded, size-limited LRU of per-user query results."""
+
+    _MISSING = object()
+
+    def __init__(self, ttl=60.0, max_users=10000):
+        self.ttl = ttl
+        self.max_users = max_users
+        self._users = OrderedDict() # username -> {name: (expires_at, value)}
+        self._generations = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def get(self, username, name, default=None):
+        with self._lock:
+            entries = self._users.get(username)
+            entry = entries.get(name) if entries else None
+            if entry is None or entry[0] < monotonic():
+                self._stats["misses"] += 1
+                return default
+            self._users.move_to_end(username)
+            self._stats["hits"] += 1
+            return entry[1]
+
+    def generation(self, username):
+        """Token to pass to put(); a put is dropped if the user was invalidated in between."""
+        with self._lock:
+            return self._generations.get(username, 0)
+
+    def put(self, username, name, value, generation):
+        with self._lock:
+            if self._generations.get(username, 0) != generation:
+                return
+            entries = self._users.get(username)
+            if entries is None:
+                entries = self._users[username] = {}
+            entries[name] = (monotonic() + self.ttl, value)
+            self._users.move_to_end(username)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, username):
+        with self._lock:
+            self._users.pop(username, None)
+            self._generations[username] = self._generations.get(username, 0) + 1
+            self._stats["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            for username in self._users:
+                self._generations[username] = self._generations.get(username, 0) + 1
+            self._users.clear()
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+            lookups = snapshot["hits"] + snapshot["misses"]
+            snapshot.update(users=len(self._users), hit_ratio=snapshot["hits"] / lookups if lookups else 0.0)
+        return snapshot
+
+    def cached(self, username, name, loader, cacheable=lambda value: True):
+        """Return the cached value or call `loader()` and cache its result if `cacheable` says so."""
+        value = self.get(username, name, self._MISSING)
+        if value is not self._MISSING:
+            return value
+        generation = self.generation(username)
+        value = loader()
+        if cacheable(value):
+            self.put(username, name, value, generation)
+        return value
@@ -1,6 +1,8 @@
 # pages/register_page.py
 import streamlit as st
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from datetime import datetime
+from password_hashing import HasherBusy
 from user_management import UserManager
 
 class RegistrationPage:
@@ -35,7 +37,7 @@ class RegistrationPage:
             else:
                 user_data = {
                     "username": new_username,
-                    "password": new_password, # In a real app, hash this password!
+                    "password": new_password, # Hashed by UserManager.save_user
                     "full_name": full_name,
                     "father_name": father_name,
                     "dob": dob.strftime("%Y-%m-%d"),
@@ -44,8 +46,15 @@ class RegistrationPage:
                     "state": state,
                     "country": country
                 }
-                self.user_manager.save_user(user_data)
-                st.success("Registration successful! Please proceed to login. ✅")
+                try:
+                    saved = self.user_manager.save_user(user_data)
+                except (HasherBusy, FutureTimeoutError):
+                    st.warning("The server is busy right now. Please try registering again in a moment. ⏳")
+                else:
+                    if saved is None:
+                        st.error("Registration failed due to a server error. Please try again later. ⚠️")
+                    else:
+                        st.success("Registration successful! Please proceed to login. ✅")
                 # Optional: Redirect to login page
                 # st.session_state.page = "main" # This needs to be handled by MainApplication
                 # st.rerun()
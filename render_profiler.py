@@ -0,0 +1,174 @@
+# render_profiler.py
+"""
+Low-overhead profiling of Streamlit reruns.
+
+MainApplication.run wraps each rerun in RenderProfiler.rerun() and its phases
+(background CSS, sidebar, page construction, page display) in span(). Each
+span records wall time plus the number of DBManager statements, and the time
+spent in them, while it was open. The last reruns are kept per session for
+the debug sidebar. With sampling enabled (or on request from the sidebar), a
+page's display() also runs under cProfile and the stats are dumped to
+PROFILE_DIR for `python -m pstats` or snakeviz.
+"""
+import cProfile
+import os
+import random
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from time import perf_counter
+import streamlit as st
+import config
+from query_metrics import track_db_calls
+
+
+class Span:
+    __slots__ = ("name", "seconds", "db_calls", "db_seconds")
+
+    def __init__(self, name, seconds, db_calls, db_seconds):
+        self.name = name
+        self.seconds = seconds
+        self.db_calls = db_calls
+        self.db_seconds = db_seconds
+
+
+class RerunRecord:
+    """Timings for one rerun of the script."""
+
+    __slots__ = ("started_at", "page", "seconds", "db_calls", "db_seconds", "spans", "profile_path", "_db")
+
+    def __init__(self, db_counter):
+        self.started_at = datetime.now()
+        self.page = None
+        self.seconds = 0.0
+        self.db_calls = 0
+        self.db_seconds = 0.0
+        self.spans = []
+        self.profile_path = None
+        self._db = db_counter
+
+
+_CURRENT = ContextVar("qms_rerun", default=None)
+
+
+class RenderProfiler:
+    """Process-wide; records go to the current session's history."""
+
+    HISTORY_KEY = "_render_profile_history"
+    PROFILE_NEXT_KEY = "_render_profile_next"
+
+    def __init__(self, history=20, sample_rate=0.0, profile_dir="profiles"):
+        self.history = history
+        self.sample_rate = sample_rate
+        self.profile_dir = profile_dir
+        # cProfile can only be active in one thread at a time (sys.monitoring on 3.12+)
+        self._cprofile_lock = threading.Lock()
+
+    @contextmanager
+    def rerun(self):
+        with track_db_calls() as db_counter:
+            record = RerunRecord(db_counter)
+            token = _CURRENT.set(record)
+            started = perf_counter()
+            try:
+                yield record
+            finally:
+                record.seconds = perf_counter() - started
+                record.db_calls, record.db_seconds = db_counter.calls, db_counter.seconds
+                _CURRENT.reset(token)
+                self._remember(record)
+
+    @contextmanager
+    def span(self, name):
+        """Time a phase of the current rerun; a no-op outside rerun()."""
+        record = _CURRENT.get()
+        if record is None:
+            yield
+            return
+        calls, db_seconds, started = record._db.calls, record._db.seconds, perf_counter()
+        try:
+            yield
+        finally:
+            record.spans.append(Span(name, perf_counter() - started,
+                                     record._db.calls - calls, record._db.seconds - db_seconds))
+
+    def run_page(self, name, display):
+        """Run a page's display() as the rerun's page, under cProfile when sampled."""
+        record = _CURRENT.get()
+        if record is not None:
+            record.page = name
+        with self.span(f"display:{name}"):
+            if not self._should_sample() or not self._cprofile_lock.acquire(blocking=False):
+                # A requested profile stays pending until a rerun gets the profiler
+                return display()
+            st.session_state.pop(self.PROFILE_NEXT_KEY, None)
+            try:
+                profile = cProfile.Profile()
+                try:
+                    return profile.runcall(display)
+                finally:
+                    path = self._dump(profile, name)
+                    if record is not None:
+                        record.profile_path = path
+            finally:
+                self._cprofile_lock.release()
+
+    def _should_sample(self):
+        # Only peeks at the request; run_page clears it once it holds the profiler
+        if st.session_state.get(self.PROFILE_NEXT_KEY, False):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def _dump(self, profile, page):
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            path = os.path.join(self.profile_dir, f"{page}-{datetime.now():%Y%m%d-%H%M%S-%f}.prof")
+            profile.dump_stats(path)
+            return path
+        except OSError as e:
+            st.sidebar.caption(f"Could not write profile: {e}")
+            return None
+
+    def _remember(self, record):
+        history = st.session_state.get(self.HISTORY_KEY)
+        if history is None:
+            history = st.session_state[self.HISTORY_KEY] = deque(maxlen=self.history)
+        history.append(record)
+
+    def render_sidebar(self):
+        """Debug sidebar: the last reruns' totals and per-phase spans, newest first."""
+        history = st.session_state.get(self.HISTORY_KEY) or ()
+        with st.sidebar.expander(f"⏱️ Render profile (last {len(history)} reruns)"):
+            if st.button("Profile next rerun", key="render_profile_next_button"):
+                st.session_state[self.PROFILE_NEXT_KEY] = True
+            for record in reversed(history):
+                st.markdown(
+                    f"**{record.page or 'auth/landing'}** · {record.seconds * 1000:.0f} ms · "
+                    f"{record.db_calls} DB calls ({record.db_seconds * 1000:.0f} ms) · "
+                    f"{record.started_at:%H:%M:%S}"
+                )
+                st.caption(" · ".join(
+                    f"{span.name} {span.seconds * 1000:.1f} ms" + (f" ({span.db_calls} DB)" if span.db_calls else "")
+                    for span in record.spans
+                ))
+                if record.profile_path:
+                    st.caption(f"cProfile: `{record.profile_path}`")
+
+
+_PROFILER = None
+_PROFILER_LOCK = threading.Lock()
+
+
+def get_render_profiler():
+    """Return the process-wide RenderProfiler."""
+    global _PROFILER
+    with _PROFILER_LOCK:
+        if _PROFILER is None:
+            _PROFILER = RenderProfiler(
+                history=config.PROFILE_HISTORY,
+                sample_rate=config.PROFILE_SAMPLE_RATE,
+                profile_dir=config.PROFILE_DIR,
+            )
+        return _PROFILER
@@ -0,0 +1,36 @@
+# rollup_compaction.py
+"""
+Periodic compaction job for the analytics rollups.
+
+Bookings made through DBManager keep the rollups current as they happen; run
+this (e.g. nightly from cron) to rebuild a date range from booked_appointments
+and repair drift from rows written by other tools:
+
+    python rollup_compaction.py --days 7
+    python rollup_compaction.py --from 2025-01-01 --to 2025-03-31
+"""
+import argparse
+import sys
+from datetime import date, timedelta
+from db_manager import DBManager
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild appointment analytics rollups for a date range.")
+    parser.add_argument("--from", dest="date_from", type=date.fromisoformat, help="First date (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="date_to", type=date.fromisoformat, help="Last date (YYYY-MM-DD)")
+    parser.add_argument("--days", type=int, default=7, help="Without --from: rebuild this many days back from --to")
+    args = parser.parse_args(argv)
+
+    date_to = args.date_to or date.today() + timedelta(days=365) # Future bookings are counted too
+    date_from = args.date_from or date.today() - timedelta(days=args.days)
+    total = DBManager().rebuild_appointment_rollups(date_from, date_to)
+    if total is None:
+        print("Rollup rebuild failed.", file=sys.stderr)
+        return 1
+    print(f"Rebuilt rollups for {date_from} .. {date_to}: {total} appointments.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,362 @@
+# schema.py
+"""
+Versioned schema for the queue management database.
+
+Each Migration is applied once and recorded in schema_migrations. Steps are
+idempotent (CREATE ... IF NOT EXISTS, add-column/index only when missing), so
+a database created by an older build, or two workers migrating at the same
+time, converge on the same schema. Indexes are chosen to match the WHERE and
+ORDER BY of every DBManager query, so each one is an index seek.
+
+    python schema.py            # apply pending migrations to config.DATABASE_URL
+    python schema.py --status   # list applied and pending versions
+"""
+import argparse
+import sys
+from collections import namedtuple
+
+Migration = namedtuple("Migration", ["version", "description", "steps"])
+
+
+# --- Step builders (each returns a callable(backend, cursor)) ---
+def sql(mysql, sqlite=None):
+    """Run one statement; `sqlite` defaults to the MySQL text when both dialects agree."""
+    def step(backend, cursor):
+        cursor.execute(sqlite if backend.name == "sqlite" and sqlite is not None else mysql)
+    return step
+
+
+def add_column(table, column, mysql_type, sqlite_type):
+    def step(backend, cursor):
+        if not backend.column_exists(cursor, table, column):
+            column_type = sqlite_type if backend.name == "sqlite" else mysql_type
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+    return step
+
+
+def add_index(table, name, columns, unique=False, dialect=None):
+    """Create an index unless it exists; `dialect` limits it to one backend."""
+    def step(backend, cursor):
+        if dialect in (None, backend.name) and not backend.index_exists(cursor, table, name):
+            kind = "UNIQUE INDEX" if unique else "INDEX"
+            cursor.execute(f"CREATE {kind} {name} ON {table} ({', '.join(columns)})")
+    return step
+
+
+def add_unique_key(table, name, columns, key_column, keep="MAX"):
+    """Enforce a unique key on an existing table, first deleting duplicate rows.
+
+    Tables created before the key existed may hold duplicates; of each group the
+    row with the MAX (newest) or MIN (oldest) `key_column` is kept.
+    """
+    def step(backend, cursor):
+        if backend.unique_key_exists(cursor, table, columns):
+            return
+        # The derived table lets MySQL delete from the table it selects from
+        cursor.execute(
+            f"DELETE FROM {table} WHERE {key_column} NOT IN ("
+            f"SELECT keep_id FROM (SELECT {keep}({key_column}) AS keep_id FROM {table}"
+            f" GROUP BY {', '.join(columns)}) AS keep_rows)"
+        )
+        cursor.execute(f"CREATE UNIQUE INDEX {name} ON {table} ({', '.join(columns)})")
+    return step
+
+
+def seed_slot_counters():
+    """Create a doctor_slots row, booked = its booking count, for every booked slot that has none."""
+    def step(backend, cursor):
+        import config
+        columns = "hospital, department, doctor, slot_date, slot_time, capacity, booked"
+        select = (
+            "SELECT hospital, department, doctor, appointment_date, appointment_time, %s, COUNT(*)"
+            " FROM booked_appointments GROUP BY hospital, department, doctor, appointment_date, appointment_time"
+        )
+        if backend.name == "sqlite":
+            query = f"INSERT OR IGNORE INTO doctor_slots ({columns}) {select}"
+        else:
+            query = f"INSERT INTO doctor_slots ({columns}) {select} ON DUPLICATE KEY UPDATE doctor_slots.booked = doctor_slots.booked"
+        backend.execute(cursor, query, (config.SLOT_DEFAULT_CAPACITY,))
+    return step
+
+
+MIGRATIONS = [
+    Migration(1, "Core tables", [
+        sql("""
+        CREATE TABLE IF NOT EXISTS users (
+            username VARCHAR(100) PRIMARY KEY,
+            password VARCHAR(255) NOT NULL,
+            full_name VARCHAR(255),
+            father_name VARCHAR(255),
+            dob DATE,
+            email VARCHAR(255),
+            city VARCHAR(100),
+            state VARCHAR(100),
+            country VARCHAR(100)
+        )
+        """, """
+        CREATE TABLE IF NOT EXISTS users (
+            username TEXT PRIMARY KEY,
+            password TEXT NOT NULL,
+            full_name TEXT,
+            father_name TEXT,
+            dob DATE,
+            email TEXT,
+            city TEXT,
+            state TEXT,
+            country TEXT
+        )
+        """),
+        sql("""
+        CREATE TABLE IF NOT EXISTS health_data (
+            health_id INT AUTO_INCREMENT PRIMARY KEY,
+            username VARCHAR(100) NOT NULL,
+            weight FLOAT,
+            height FLOAT,
+            symptoms TEXT,
+            pre_meds TEXT,
+            bp VARCHAR(20),
+            record_date DATE NOT NULL,
+            UNIQUE KEY uq_health_data_user_date (username, record_date)
+        )
+        """, """
+        CREATE TABLE IF NOT EXISTS health_data (
+            health_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL,
+            weight REAL,
+            height REAL,
+            symptoms TEXT,
+            pre_meds TEXT,
+            bp TEXT,
+            record_date DATE NOT NULL,
+            UNIQUE (username, record_date)
+        )
+        """),
+        sql("""
+        CREATE TABLE IF NOT EXISTS booked_appointments (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            username VARCHAR(100) NOT NULL,
+            hospital VARCHAR(150) NOT NULL,
+            department VARCHAR(150) NOT NULL,
+            doctor VARCHAR(150) NOT NULL,
+            appointment_date DATE NOT NULL,
+            appointment_time TIME NOT NULL,
+            booking_time DATETIME,
+            UNIQUE KEY uq_booked_appointment (username, hospital, department, doctor, appointment_date, appointment_time)
+        )
+        """, """
+        CREATE TABLE IF NOT EXISTS booked_appointments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL,
+            hospital TEXT NOT NULL,
+            department TEXT NOT NULL,
+            doctor TEXT NOT NULL,
+            appointment_date DATE NOT NULL,
+            appointment_time TIME NOT NULL,
+            booking_time DATETIME,
+            UNIQUE (username, hospital, department, doctor, appointment_date, appointment_time)
+        )
+        """),
+        sql("""
+        CREATE TABLE IF NOT EXISTS doctor_slots (
+            hospital VARCHAR(150) NOT NULL,
+            department VARCHAR(150) NOT NULL,
+            doctor VARCHAR(150) NOT NULL,
+            slot_date DATE NOT NULL,
+            slot_time TIME NOT NULL,
+            capacity INT NOT NULL,
+            booked INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (hospital, department, doctor, slot_date, slot_time)
+        )
+        """, """
+        CREATE TABLE IF NOT EXISTS doctor_slots (
+            hospital TEXT NOT NULL,
+            department TEXT NOT NULL,
+            doctor TEXT NOT NULL,
+            slot_date DATE NOT NULL,
+            slot_time TIME NOT NULL,
+            capacity INTEGER NOT NULL,
+            booked INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (hospital, department, doctor, slot_date, slot_time)
+        )
+        """),
+        sql("""
+        CREATE TABLE IF NOT EXISTS user_health_history (
+            history_id INT AUTO_INCREMENT PRIMARY KEY,
+            username VARCHAR(100) NOT NULL,
+            record_date DATE NOT NULL,
+            weight FLOAT,
+            height FLOAT,
+            bp VARCHAR(20),
+            sugar FLOAT,
+            UNIQUE KEY uq_user_health_history_user_date (username, record_date)
+        )
+        """, """
+        CREATE TABLE IF NOT EXISTS user_health_history (
+            history_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL,
+            record_date DATE NOT NULL,
+            weight REAL,
+            height REAL,
+            bp TEXT,
+            sugar REAL,
+            UNIQUE (username, record_date)
+        )
+        """),
+    ]),
+    Migration(2, "Appointment analytics rollups", [
+        sql("""
+        CREATE TABLE IF NOT EXISTS appointment_rollup_hourly (
+            hospital VARCHAR(150) NOT NULL,
+            department VARCHAR(150) NOT NULL,
+            doctor VARCHAR(150) NOT NULL,
+            bucket_date DATE NOT NULL,
+            bucket_hour TINYINT NOT NULL,
+            appointments INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (hospital, department, doctor, bucket_date, bucket_hour)
+        )
+        """, """
+        CREATE TABLE IF NOT EXISTS appointment_rollup_hourly (
+            hospital TEXT NOT NULL,
+            department TEXT NOT NULL,
+            doctor TEXT NOT NULL,
+            bucket_date DATE NOT NULL,
+            bucket_hour INTEGER NOT NULL,
+            appointments INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (hospital, department, doctor, bucket_date, bucket_hour)
+        )
+        """),
+        sql("""
+        CREATE TABLE IF NOT EXISTS appointment_rollup_daily (
+            hospital VARCHAR(150) NOT NULL,
+            department VARCHAR(150) NOT NULL,
+            doctor VARCHAR(150) NOT NULL,
+            bucket_date DATE NOT NULL,
+            appointments INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (hospital, department, doctor, bucket_date)
+        )
+        """, """
+        CREATE TABLE IF NOT EXISTS appointment_rollup_daily (
+            hospital TEXT NOT NULL,
+            department TEXT NOT NULL,
+            doctor TEXT NOT NULL,
+            bucket_date DATE NOT NULL,
+            appointments INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (hospital, department, doctor, bucket_date)
+        )
+        """),
+        # Dashboard reads filter on a date window (optionally one hospital)
+        add_index("appointment_rollup_hourly", "idx_rollup_hourly_date", ("bucket_date",)),
+        add_index("appointment_rollup_daily", "idx_rollup_daily_date", ("bucket_date",)),
+    ]),
+    Migration(3, "Blood pressure split into systolic/diastolic", [
+        add_column("health_data", "bp_systolic", "SMALLINT", "INTEGER"),
+        add_column("health_data", "bp_diastolic", "SMALLINT", "INTEGER"),
+        add_column("user_health_history", "bp_systolic", "SMALLINT", "INTEGER"),
+        add_column("user_health_history", "bp_diastolic", "SMALLINT", "INTEGER"),
+    ]),
+    Migration(4, "Indexes matching DBManager queries", [
+        # get_booked_appointments / _page / count: username, newest first, id as the keyset tie-break
+        add_index("booked_appointments", "idx_booked_user_date", ("username", "appointment_date", "appointment_time", "id")),
+        # get_doctor_day_bookings: one doctor's day (the id tie-break comes with the row key)
+        add_index("booked_appointments", "idx_booked_doctor_day", ("hospital", "department", "doctor", "appointment_date", "appointment_time")),
+        # get_full_slots, iter_appointment_timeline, rollup rebuilds and exports: date ranges
+        add_index("booked_appointments", "idx_booked_date", ("appointment_date",)),
+        # find_users / iter_users: state (+ city) filters return rows already in username order
+        add_index("users", "idx_users_state_city", ("state", "city", "username")),
+        add_index("users", "idx_users_full_name", ("full_name",)),
+        # Date-filtered exports of the health tables
+        add_index("health_data", "idx_health_data_date", ("record_date",)),
+        add_index("user_health_history", "idx_user_health_history_date", ("record_date",)),
+    ]),
+    Migration(5, "Index fixes from query-plan check", [
+        # find_users by state alone: (state, city, username) can't return username order
+        add_index("users", "idx_users_state", ("state", "username")),
+        # SQLite's LIKE is case-insensitive, so a prefix match can only seek a NOCASE index
+        add_index("users", "idx_users_full_name_nocase", ("full_name COLLATE NOCASE",), dialect="sqlite"),
+    ]),
+    Migration(6, "Unique keys missing from tables created before them", [
+        # Upserts (ON CONFLICT / ON DUPLICATE KEY) depend on these; migration 1 only
+        # declares them for tables it creates. Health rows keep the latest write,
+        # bookings keep the first.
+        add_unique_key("health_data", "uq_health_data_user_date", ("username", "record_date"), "health_id"),
+        add_unique_key("user_health_history", "uq_user_health_history_user_date", ("username", "record_date"), "history_id"),
+        add_unique_key(
+            "booked_appointments", "uq_booked_appointment",
+            ("username", "hospital", "department", "doctor", "appointment_date", "appointment_time"), "id", keep="MIN",
+        ),
+    ]),
+    Migration(7, "Slot counters for bookings made before doctor_slots", [
+        # get_full_slots reads fullness from doctor_slots.booked, so every booked slot needs a counter row
+        seed_slot_counters(),
+        add_index("doctor_slots", "idx_doctor_slots_date", ("slot_date",)),
+    ]),
+]
+
+SCHEMA_MIGRATIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INT PRIMARY KEY,
+    description VARCHAR(255) NOT NULL,
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+def applied_versions(backend, conn):
+    with backend.cursor(conn) as cursor:
+        cursor.execute(SCHEMA_MIGRATIONS_TABLE)
+        cursor.execute("SELECT version FROM schema_migrations")
+        versions = {row['version'] for row in cursor.fetchall()}
+    conn.commit()
+    return versions
+
+
+def migrate(backend, conn, target=None):
+    """Apply pending migrations (up to `target`) in order on an open connection; returns versions applied."""
+    done = applied_versions(backend, conn)
+    applied = []
+    for migration in MIGRATIONS:
+        if migration.version in done or (target is not None and migration.version > target):
+            continue
+        with backend.cursor(conn) as cursor:
+            for step in migration.steps:
+                step(backend, cursor)
+            # Another worker may have finished the same (idempotent) migration first
+            backend.execute(
+                cursor,
+                backend.insert_ignore_sql("schema_migrations", ("version", "description")),
+                (migration.version, migration.description),
+            )
+        conn.commit()
+        applied.append(migration.version)
+    return applied
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply or inspect database schema migrations.")
+    parser.add_argument("--status", action="store_true", help="List applied and pending migrations, change nothing")
+    parser.add_argument("--target", type=int, help="Only migrate up to this version")
+    args = parser.parse_args(argv)
+
+    import config
+    from db_backends import backend_from_url
+    backend = backend_from_url(config.DATABASE_URL, config.SQLITE_BUSY_TIMEOUT)
+    conn = backend.connect()
+    try:
+        if args.status:
+            done = applied_versions(backend, conn)
+            for migration in MIGRATIONS:
+                state = "applied" if migration.version in done else "pending"
+                print(f"{migration.version:>4}  {state:<8} {migration.description}")
+            return 0
+        applied = migrate(backend, conn, target=args.target)
+        print(f"Applied migrations: {', '.join(map(str, applied))}" if applied else "Schema is up to date.")
+        return 0
+    except backend.Error as e:
+        print(f"Migration failed: {e}", file=sys.stderr)
+        return 1
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
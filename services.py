@@ -0,0 +1,57 @@
+# services.py
+"""
+App-scoped service container.
+
+Built once per process (cached with st.cache_resource) and shared by every
+session and rerun: one DBManager/connection pool, one UserManager, and page
+objects that are only constructed the first time someone navigates to them.
+"""
+import importlib
+import threading
+import streamlit as st
+from db_manager import DBManager
+from user_management import UserManager
+from queue_engine import get_queue_registry
+
+
+class ServiceContainer:
+    """Holds the shared data-access layer and lazily built page objects."""
+
+    # Page name -> (module, class, constructor args). Page modules (and whatever heavy
+    # libraries they import) are only loaded the first time the page is shown.
+    PAGE_FACTORIES = {
+        "landing": ("landing", "LandingPage", lambda services: ()),
+        "login": ("login_page", "LoginPage", lambda services: (services.user_manager,)),
+        "register": ("register_page", "RegistrationPage", lambda services: (services.user_manager,)),
+        "appointment_booking": ("appointment_booking", "AppointmentBookingPage", lambda services: (services.db_manager,)),
+        "appointment_summary": ("appointment_summary", "AppointmentSummaryPage", lambda services: (services.db_manager,)),
+        "patient_health_data": ("patient_health_data", "PatientHealthDataPage", lambda services: (services.db_manager,)),
+        "medical_services": ("medical_services", "MedicalServicesPage", lambda services: (services.db_manager,)),
+        "analytics_dashboard": ("analytics_dashboard", "AnalyticsDashboardPage", lambda services: (services.db_manager,)),
+        "admin_panel": ("admin_panel", "AdminPanelPage", lambda services: (services.db_manager,)),
+    }
+
+    def __init__(self, db_manager=None):
+        self.db_manager = db_manager or DBManager()
+        self.user_manager = UserManager(self.db_manager)
+        self.queue_registry = get_queue_registry(self.db_manager)
+        self._pages = {}
+        self._lock = threading.Lock()
+
+    def page(self, name):
+        """Return the page object for `name`, constructing it on first use."""
+        page = self._pages.get(name)
+        if page is None:
+            with self._lock:
+                page = self._pages.get(name)
+                if page is None:
+                    module_name, class_name, args = self.PAGE_FACTORIES[name]
+                    page_class = getattr(importlib.import_module(module_name), class_name)
+                    page = self._pages[name] = page_class(*args(self))
+        return page
+
+
+@st.cache_resource
+def get_services():
+    """The process-wide ServiceContainer (created on the first rerun of the first session)."""
+    return ServiceContainer()
@@ -0,0 +1,94 @@
+# startup_benchmark.py
+"""
+Cold-start import benchmark for the Streamlit entry point.
+
+Runs a fresh interpreter with `python -X importtime`, importing the app and
+building the landing and login pages the way the first render does, then
+reports per-module import times and checks them against a budget.
+
+Usage:
+    python startup_benchmark.py [--budget-ms 1500] [--top 25]
+
+Exits non-zero if total import time exceeds the budget or if any module in
+FORBIDDEN_ON_LANDING (e.g. pandas) was imported on the landing/login path.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+# Heavy libraries that the landing and login pages must not pull in
+FORBIDDEN_ON_LANDING = ("pandas", "numpy", "plotly", "matplotlib", "requests")
+
+# What the first render of a fresh worker does before anyone logs in
+STARTUP_SCRIPT = """
+import sys
+import app
+from services import get_services
+services = get_services()
+services.page("landing")
+services.page("login")
+print("LOADED:" + ",".join(sorted(sys.modules)), file=sys.stderr)
+"""
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def run_startup():
+    """Return (entries, loaded_modules); entries are (module, self_us, cumulative_us, depth)."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", STARTUP_SCRIPT],
+        cwd=here, capture_output=True, text=True,
+    )
+    entries, loaded = [], set()
+    for line in result.stderr.splitlines():
+        if line.startswith("LOADED:"):
+            loaded = set(line[len("LOADED:"):].split(","))
+            continue
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            entries.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    if result.returncode != 0:
+        raise RuntimeError(f"Startup script failed:\n{result.stderr[-2000:]}")
+    return entries, loaded
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=1500.0, help="Maximum total import time")
+    parser.add_argument("--top", type=int, default=25, help="How many modules to list")
+    args = parser.parse_args(argv)
+
+    entries, loaded = run_startup()
+    total_ms = sum(entry[2] for entry in entries if entry[3] == 0) / 1000.0
+
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for module, self_us, cumulative_us, _ in sorted(entries, key=lambda e: e[2], reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:14.1f} {self_us / 1000:9.1f}  {module}")
+
+    # Per-module times for this project's own modules (top-level ones under this directory)
+    here = os.path.dirname(os.path.abspath(__file__))
+    local = {name[:-3] for name in os.listdir(here) if name.endswith(".py")}
+    print("\nProject modules:")
+    for module, self_us, cumulative_us, _ in entries:
+        if module in local:
+            print(f"{cumulative_us / 1000:14.1f} {self_us / 1000:9.1f}  {module}")
+
+    failures = []
+    if total_ms > args.budget_ms:
+        failures.append(f"total import time {total_ms:.0f} ms exceeds budget {args.budget_ms:.0f} ms")
+    heavy = sorted(name for name in FORBIDDEN_ON_LANDING if name in loaded)
+    if heavy:
+        failures.append(f"landing/login path imported: {', '.join(heavy)}")
+
+    print(f"\nTotal import time: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,18 @@
+# conftest.py
+import os
+import sys
+import pytest
+
+# Modules live at the repository root, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    return f"sqlite:///{tmp_path / 'qms.db'}"
+
+
+@pytest.fixture
+def db(db_url):
+    from db_manager import DBManager
+    return DBManager(db_url)
@@ -0,0 +1,52 @@
+# test_export_data.py
+import gzip
+import pytest
+import export_data
+
+
+class FakeDB:
+    EXPORT_TABLES = {"items": ("id", None, ["id", "value"])}
+
+    def iter_export_rows(self, table, date_from, date_to, after_key, chunk_size):
+        for key in range((after_key or 0) + 1, 2501):
+            yield {"id": key, "value": f"v{key}"}
+
+
+def _read(path):
+    opener = gzip.open if str(path).endswith(".gz") else open
+    with opener(path, "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("name, fmt", [("out.csv", "csv"), ("out.jsonl", "jsonl"), ("out.csv.gz", "csv"), ("out.jsonl.gz", "jsonl")])
+def test_resume_after_crash_matches_uninterrupted_export(tmp_path, monkeypatch, name, fmt):
+    reference, path = str(tmp_path / ("ref-" + name)), str(tmp_path / name)
+    export_data.export_table(FakeDB(), "items", reference, fmt=fmt, chunk_size=300)
+
+    # Crash after the third chunk reaches the file but before its checkpoint is saved
+    write_checkpoint, calls = export_data._write_checkpoint, []
+
+    def crash_on_third(*args):
+        calls.append(args)
+        if len(calls) == 3:
+            raise RuntimeError("crash")
+        write_checkpoint(*args)
+
+    monkeypatch.setattr(export_data, "_write_checkpoint", crash_on_third)
+    with pytest.raises(RuntimeError):
+        export_data.export_table(FakeDB(), "items", path, fmt=fmt, chunk_size=300)
+    monkeypatch.setattr(export_data, "_write_checkpoint", write_checkpoint)
+    assert export_data.read_checkpoint(path).last_key == 600
+
+    result = export_data.export_table(FakeDB(), "items", path, fmt=fmt, chunk_size=300, resume=True)
+
+    assert result == export_data.ExportResult(1900, 2500)
+    assert _read(path) == _read(reference)
+    assert export_data.read_checkpoint(path) is None
+
+
+def test_resume_without_checkpoint_starts_fresh(tmp_path):
+    path = str(tmp_path / "out.csv")
+    result = export_data.export_table(FakeDB(), "items", path, resume=True, chunk_size=1000)
+    assert result.rows == 2500
+    assert _read(path).startswith(b"id,value\r\n1,v1\r\n")
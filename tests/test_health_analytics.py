@@ -0,0 +1,37 @@
+# test_health_analytics.py
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+from health_analytics import downsample, lttb, split_bp
+
+
+def test_lttb_keeps_endpoints_and_peaks():
+    x = np.arange(1000, dtype=float)
+    y = np.sin(x / 50.0)
+    y[500] = 10.0 # A spike must survive downsampling
+    keep = lttb(x, y, 50)
+    assert len(keep) == 50
+    assert keep[0] == 0 and keep[-1] == 999
+    assert np.all(np.diff(keep) > 0)
+    assert 500 in keep
+
+
+def test_lttb_returns_everything_below_threshold():
+    assert list(lttb([0, 1, 2], [5, 6, 7], 10)) == [0, 1, 2]
+
+
+def test_split_bp_parses_readings():
+    systolic, diastolic = split_bp(["120/80", " 135 / 90 ", "bad", None])
+    assert list(systolic[:2]) == [120.0, 135.0]
+    assert list(diastolic[:2]) == [80.0, 90.0]
+    assert np.isnan(systolic[2]) and np.isnan(diastolic[3])
+
+
+def test_downsample_caps_points_per_measure():
+    frame = pd.DataFrame({
+        "record_date": pd.date_range("2020-01-01", periods=1000),
+        "weight": np.linspace(60, 70, 1000),
+    })
+    long = downsample(frame, ["weight"], max_points=100)
+    assert len(long) == 100
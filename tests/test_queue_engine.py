@@ -0,0 +1,63 @@
+# test_queue_engine.py
+import random
+from datetime import date, datetime, time, timedelta
+from queue_engine import FenwickTree, QueueRegistry, TokenQueue, TokenStatus
+
+
+def test_fenwick_matches_prefix_sums():
+    rng = random.Random(7)
+    tree, values = FenwickTree(capacity=4), [0] * 301
+    for _ in range(2000):
+        index, delta = rng.randrange(1, 301), rng.choice((1, -1, 2))
+        tree.add(index, delta) # Grows past the initial capacity
+        values[index] += delta
+        probe = rng.randrange(0, 301)
+        assert tree.prefix_sum(probe) == sum(values[:probe + 1])
+
+
+def test_fenwick_find_kth():
+    tree = FenwickTree()
+    for index in (3, 5, 9):
+        tree.add(index, 1)
+    assert [tree.find_kth(k) for k in (1, 2, 3)] == [3, 5, 9]
+    assert tree.find_kth(4) is None
+    assert tree.find_kth(0) is None
+
+
+def test_token_queue_positions_skip_and_no_show():
+    queue = TokenQueue(("H", "D", "Dr", date.today()))
+    tokens = [queue.issue(f"user{i}", appointment_id=i) for i in range(1, 6)]
+    assert tokens == [1, 2, 3, 4, 5]
+    assert queue.issue("user1", appointment_id=1) == 1 # Idempotent per appointment
+    assert queue.position(4) == 4
+
+    assert queue.call_next() == 1
+    assert queue.status(1) == TokenStatus.SERVING
+    assert queue.position(4) == 3
+
+    assert queue.skip() == 2 # Head goes to the back and keeps its number
+    assert queue.position(2) == 4
+    assert queue.no_show(3)
+    assert queue.position(4) == 1
+    assert queue.waiting_count() == 3 # 4, 5, then 2
+    assert queue.call_next() == 4
+    assert queue.status(1) == TokenStatus.DONE
+
+
+def test_tokens_match_after_restart(db):
+    day = date.today() + timedelta(days=1)
+    base = {"Hospital": "H", "Department": "D", "Doctor": "Dr", "Date": day, "booking_time": datetime.now()}
+    live = QueueRegistry(db)
+    # Later appointment times booked first: tokens follow booking order, not appointment time
+    for username, slot in (("a", time(11, 0)), ("b", time(9, 0)), ("c", time(10, 0))):
+        result = db.reserve_appointment(username, dict(base, Time=slot), capacity=5)
+        live.issue("H", "D", "Dr", day, username, appointment_id=result.appointment_id)
+    # Booked without going through this registry, e.g. by another process
+    db.reserve_appointment("z", dict(base, Time=time(12, 0)), capacity=5)
+    result = db.reserve_appointment("y", dict(base, Time=time(12, 30)), capacity=5)
+    assert live.issue("H", "D", "Dr", day, "y", appointment_id=result.appointment_id) == 5
+
+    restarted = QueueRegistry(db)
+    for username in "abczy":
+        assert live.get_queue("H", "D", "Dr", day).tokens_for(username) == \
+            restarted.get_queue("H", "D", "Dr", day).tokens_for(username)
@@ -0,0 +1,67 @@
+# test_reservations.py
+import sqlite3
+import threading
+from datetime import date, datetime, time
+from db_manager import ReservationStatus
+
+SLOT = {"Hospital": "City Hospital", "Department": "Cardiology", "Doctor": "Dr. A", "Date": date(2030, 1, 7), "Time": time(10, 0)}
+
+
+def _appt(**overrides):
+    return dict(SLOT, booking_time=datetime(2030, 1, 1, 9, 0), **overrides)
+
+
+def _insert_legacy_bookings(db_url, usernames, slot_time="10:00:00"):
+    conn = sqlite3.connect(db_url[len("sqlite:///"):])
+    conn.executemany(
+        "INSERT INTO booked_appointments (username, hospital, department, doctor, appointment_date, appointment_time)"
+        " VALUES (?, 'City Hospital', 'Cardiology', 'Dr. A', '2030-01-07', ?)",
+        [(username, slot_time) for username in usernames],
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_concurrent_reservations_never_overbook(db):
+    capacity, users = 3, [f"user{i}" for i in range(12)]
+    results = {}
+
+    def book(username):
+        results[username] = db.reserve_appointment(username, _appt(), capacity=capacity)
+
+    threads = [threading.Thread(target=book, args=(username,)) for username in users]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    statuses = [result.status for result in results.values()]
+    assert statuses.count(ReservationStatus.RESERVED) == capacity
+    assert statuses.count(ReservationStatus.SLOT_FULL) == len(users) - capacity
+    assert len(db.get_full_slots(SLOT["Date"], SLOT["Date"])) == 1
+
+
+def test_repeat_booking_is_rejected(db):
+    assert db.reserve_appointment("alice", _appt(), capacity=5).status == ReservationStatus.RESERVED
+    assert db.reserve_appointment("alice", _appt(), capacity=5).status == ReservationStatus.ALREADY_BOOKED
+    assert db.count_booked_appointments("alice") == 1
+
+
+def test_existing_bookings_count_towards_a_new_slot(db, db_url):
+    _insert_legacy_bookings(db_url, ["a", "b"])
+    assert db.reserve_appointment("c", _appt(), capacity=2).status == ReservationStatus.SLOT_FULL
+    # The seeded counter survives the SLOT_FULL rollback
+    assert db.get_full_slots(SLOT["Date"], SLOT["Date"])
+
+
+def test_set_slot_capacity_seeds_existing_bookings(db, db_url):
+    _insert_legacy_bookings(db_url, ["a", "b"])
+    db.set_slot_capacity("City Hospital", "Cardiology", "Dr. A", "2030-01-07", "10:00:00", 3)
+    assert db.reserve_appointment("c", _appt(), capacity=3).status == ReservationStatus.RESERVED
+    assert db.reserve_appointment("d", _appt(), capacity=3).status == ReservationStatus.SLOT_FULL
+
+
+def test_no_retries_reports_error(db, monkeypatch):
+    import db_manager
+    monkeypatch.setattr(db_manager.config, "SLOT_RESERVE_RETRIES", 0)
+    assert db.reserve_appointment("alice", _appt()).status == ReservationStatus.ERROR
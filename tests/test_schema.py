@@ -0,0 +1,78 @@
+# test_schema.py
+import sqlite3
+import schema
+from db_backends import backend_from_url
+
+LEGACY_TABLES = """
+CREATE TABLE users (username TEXT PRIMARY KEY, password TEXT NOT NULL, full_name TEXT, father_name TEXT,
+                    dob DATE, email TEXT, city TEXT, state TEXT, country TEXT);
+CREATE TABLE health_data (health_id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT NOT NULL, weight REAL,
+                          height REAL, symptoms TEXT, pre_meds TEXT, bp TEXT, record_date DATE NOT NULL);
+CREATE TABLE booked_appointments (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT NOT NULL, hospital TEXT NOT NULL,
+                                  department TEXT NOT NULL, doctor TEXT NOT NULL, appointment_date DATE NOT NULL,
+                                  appointment_time TIME NOT NULL, booking_time DATETIME);
+CREATE TABLE user_health_history (history_id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT NOT NULL,
+                                  record_date DATE NOT NULL, weight REAL, height REAL, bp TEXT, sugar REAL);
+INSERT INTO health_data (username, weight, record_date) VALUES ('a', 1, '2024-01-01'), ('a', 2, '2024-01-01');
+INSERT INTO booked_appointments (username, hospital, department, doctor, appointment_date, appointment_time)
+VALUES ('a', 'H', 'D', 'X', '2030-01-07', '09:00:00'), ('a', 'H', 'D', 'X', '2030-01-07', '09:00:00'),
+       ('b', 'H', 'D', 'X', '2030-01-07', '09:00:00');
+"""
+
+
+def _schema_of(path):
+    conn = sqlite3.connect(path)
+    columns = {
+        table: [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+        for (table,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")
+    }
+    conn.close()
+    return columns
+
+
+def _migrate(path, target=None):
+    backend = backend_from_url(f"sqlite:///{path}")
+    conn = backend.connect()
+    try:
+        return schema.migrate(backend, conn, target=target)
+    finally:
+        conn.close()
+
+
+def test_migrations_are_recorded_once(tmp_path):
+    path = tmp_path / "fresh.db"
+    assert _migrate(path) == [migration.version for migration in schema.MIGRATIONS]
+    assert _migrate(path) == []
+
+
+def test_legacy_and_partial_databases_converge(tmp_path):
+    fresh, legacy, partial = tmp_path / "fresh.db", tmp_path / "legacy.db", tmp_path / "partial.db"
+    _migrate(fresh)
+    conn = sqlite3.connect(legacy)
+    conn.executescript(LEGACY_TABLES)
+    conn.close()
+    _migrate(legacy)
+    _migrate(partial, target=3)
+    _migrate(partial)
+    assert _schema_of(legacy) == _schema_of(fresh) == _schema_of(partial)
+
+
+def test_legacy_tables_gain_unique_keys_and_slot_counters(tmp_path):
+    path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(path)
+    conn.executescript(LEGACY_TABLES)
+    conn.close()
+    _migrate(path)
+
+    conn = sqlite3.connect(path)
+    # Duplicates removed: the newest health row and the first booking survive
+    assert conn.execute("SELECT weight FROM health_data").fetchall() == [(2.0,)]
+    assert conn.execute("SELECT id, username FROM booked_appointments ORDER BY id").fetchall() == [(1, "a"), (3, "b")]
+    assert conn.execute("SELECT booked FROM doctor_slots").fetchall() == [(2,)]
+    conn.close()
+
+    from db_manager import DBManager
+    db = DBManager(f"sqlite:///{path}")
+    health = {"weight": 70, "height": 170, "symptoms": "", "pre_meds": "", "bp": "120/80", "record_date": "2024-01-01"}
+    assert db.save_health_data("a", health) is not None # The upsert needs the unique key
+    assert db.get_last_health_data("a")["weight"] == 70
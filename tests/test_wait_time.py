@@ -0,0 +1,51 @@
+# test_wait_time.py
+import random
+from datetime import date, datetime, time, timedelta
+import pytest
+from wait_time import StreamingStats, WaitTimeEstimator
+
+np = pytest.importorskip("numpy")
+
+
+def test_grouped_ewma_matches_streaming_loop():
+    rng = random.Random(3)
+    estimator = WaitTimeEstimator(db_manager=None, alpha=0.3)
+    group_ids = np.array([rng.randrange(4) for _ in range(200)])
+    values = np.array([rng.uniform(1, 60) for _ in range(200)])
+
+    final, counts = estimator._grouped_ewma(np, group_ids, values, 5)
+
+    for group in range(5):
+        reference = StreamingStats(0.3)
+        for value in values[group_ids == group]:
+            reference.record_service(float(value))
+        assert counts[group] == reference.service_samples
+        if reference.service_samples:
+            assert final[group] == pytest.approx(reference.service_minutes)
+        else:
+            assert final[group] == 0
+
+
+def test_warm_start_matches_hooks():
+    day = date.today() - timedelta(days=1)
+    rows = [
+        {"hospital": "H", "department": "D", "doctor": "Dr", "appointment_date": day,
+         "appointment_time": time(9, minute), "booking_time": datetime(2030, 1, 1, 8, 0) + timedelta(minutes=7 * i)}
+        for i, minute in enumerate((0, 10, 25, 45))
+    ]
+
+    class FakeDB:
+        def iter_appointment_timeline(self, since):
+            return iter(rows)
+
+    estimator = WaitTimeEstimator(FakeDB(), alpha=0.5, min_samples=1)
+    estimator.on_issue(("H", "D", "Dr", date.today()), waiting=3) # Recorded before the warm start
+    reference = StreamingStats(0.5)
+    for gap in (10, 15, 20):
+        reference.record_service(gap)
+
+    assert estimator.consultation_minutes("H", "D", "Dr") == pytest.approx(reference.service_minutes)
+    snapshot = estimator.snapshot("H", "D", "Dr")
+    assert snapshot["consultation_samples"] == 3
+    assert snapshot["arrival_rate_per_hour"] == pytest.approx(60 / 7)
+    assert snapshot["queue_length"] == 3 # Kept from the hook across the swap
@@ -3,13 +3,23 @@ import os
 import re
 import random
 import string
-import base64
+from concurrent.futures import TimeoutError as FutureTimeoutError
 import streamlit as st
-import pandas as pd
+import assets
 from db_manager import DBManager # Import the new DBManager
+from password_hashing import HasherBusy, get_password_hasher, needs_rehash
 
 USER_DATA_FILE = "user_data.json" # Kept for consistency but not used for data storage anymore
 
+class AuthStatus:
+    """Outcome codes returned by UserManager.authenticate."""
+    OK = "ok"
+    UNKNOWN_USER = "unknown_user"
+    BAD_PASSWORD = "bad_password"
+    BUSY = "busy"
+    ERROR = "error"
+
+
 class UserManager:
     """Manages user authentication, registration, and related utilities."""
 
@@ -47,20 +57,62 @@ class UserManager:
         "Ladakh": ["Leh", "Kargil"]
     }
 
-    def __init__(self):
-        self.db_manager = DBManager()
+    def __init__(self, db_manager=None):
+        self.db_manager = db_manager or DBManager()
+        self.password_hasher = get_password_hasher()
 
     def load_users(self):
         return self.db_manager.get_users()
 
+    def iter_users(self, columns=None, state=None, city=None, name_prefix=None):
+        """Stream users for large listings and exports without loading the table."""
+        return self.db_manager.iter_users(columns=columns, state=state, city=city, name_prefix=name_prefix)
+
+    def find_users(self, state=None, city=None, name_prefix=None, columns=None, page_size=50, after=None):
+        return self.db_manager.find_users(
+            state=state, city=city, name_prefix=name_prefix, columns=columns, page_size=page_size, after=after
+        )
+
     def save_user(self, user_data):
+        # Never store the plaintext password
+        user_data = dict(user_data, password=self.password_hasher.hash(user_data['password']))
         return self.db_manager.add_user(user_data)
 
     def user_exists(self, username):
         return self.db_manager.user_exists(username)
 
+    def authenticate(self, username, password):
+        """
+        Check a login with one user lookup and one hash verification (run on the
+        hasher's worker pool). Legacy plaintext or under-strength hashes are
+        re-hashed on a successful login. Returns an AuthStatus code.
+        """
+        row = self.db_manager.get_user_credentials(username)
+        if row is None:
+            return AuthStatus.ERROR
+        if not row:
+            return AuthStatus.UNKNOWN_USER
+        stored = row['password']
+        try:
+            if not self.password_hasher.verify(password, stored):
+                return AuthStatus.BAD_PASSWORD
+        except (HasherBusy, FutureTimeoutError):
+            return AuthStatus.BUSY
+        if needs_rehash(stored):
+            self._upgrade_hash(username, password, stored)
+        return AuthStatus.OK
+
+    def _upgrade_hash(self, username, password, stored):
+        # Best effort: the login already succeeded, so a busy pool just retries next login
+        try:
+            new_hash = self.password_hasher.hash(password)
+        except (HasherBusy, FutureTimeoutError):
+            return
+        if self.db_manager.update_password_hash(username, stored, new_hash):
+            self.password_hasher.record_rehash()
+
     def check_credentials(self, username, password):
-        return self.db_manager.check_credentials(username, password)
+        return self.authenticate(username, password) == AuthStatus.OK
 
     @staticmethod
     def is_valid_username(username):
@@ -85,23 +137,8 @@ class UserManager:
 
     @staticmethod
     def set_background(image_file):
-        if not os.path.isfile(image_file):
+        css = assets.background_css(image_file)
+        if css is None:
             st.error(f"Background image '{image_file}' not found in {os.getcwd()}.")
             return
-        ext = image_file.split('.')[-1]
-        with open(image_file, "rb") as image:
-            encoded = base64.b64encode(image.read()).decode()
-        st.markdown(
-            f"""
-            <style>
-            .stApp {{
-                background-image: url("data:image/{ext};base64,{encoded}");
-                background-size: cover;
-                background-position: center;
-                background-repeat: no-repeat;
-                background-attachment: fixed;
-            }}
-            </style>
-            """,
-            unsafe_allow_html=True
-        )
\ No newline at end of file
+        st.markdown(css, unsafe_allow_html=True)
\ No newline at end of file
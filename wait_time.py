@@ -0,0 +1,274 @@
+# wait_time.py
+"""
+Online wait-time estimation per hospital, department and doctor.
+
+For every level the estimator keeps O(1)-update streaming statistics: an EWMA
+of consultation duration, an EWMA of the gap between patient arrivals (whose
+inverse is the arrival rate) and the latest queue length. The estimated wait
+for a token is people-ahead x expected consultation time, taken from the most
+specific level with enough samples. Statistics are warm-started from
+historical booked_appointments: the streamed rows are collected into columns,
+then every EWMA is computed with vectorized numpy.
+"""
+import sys
+import threading
+from datetime import date, datetime, timedelta
+import config
+
+
+class StreamingStats:
+    """EWMA consultation time, EWMA inter-arrival gap and queue length for one key."""
+
+    __slots__ = ("alpha", "service_minutes", "service_samples", "interarrival_minutes",
+                 "arrival_samples", "last_arrival", "last_call", "queue_length")
+
+    def __init__(self, alpha):
+        self.alpha = alpha
+        self.service_minutes = None
+        self.service_samples = 0
+        self.interarrival_minutes = None
+        self.arrival_samples = 0
+        self.last_arrival = None
+        self.last_call = None
+        self.queue_length = 0
+
+    def _ewma(self, current, sample):
+        return sample if current is None else current + self.alpha * (sample - current)
+
+    def record_service(self, minutes):
+        self.service_minutes = self._ewma(self.service_minutes, minutes)
+        self.service_samples += 1
+
+    def record_arrival(self, at):
+        if self.last_arrival is not None and at > self.last_arrival:
+            gap = (at - self.last_arrival).total_seconds() / 60.0
+            self.interarrival_minutes = self._ewma(self.interarrival_minutes, gap)
+            self.arrival_samples += 1
+        self.last_arrival = at
+
+    @property
+    def arrival_rate_per_hour(self):
+        return 60.0 / self.interarrival_minutes if self.interarrival_minutes else None
+
+
+class WaitTimeEstimator:
+    """Streaming wait-time statistics, updated by the queue engine and warm-started from history."""
+
+    def __init__(self, db_manager, alpha=0.2, min_samples=5, default_service_minutes=15.0,
+                 max_service_minutes=120.0, warm_start_days=90):
+        self.db_manager = db_manager
+        self.alpha = alpha
+        self.min_samples = min_samples
+        self.default_service_minutes = default_service_minutes
+        self.max_service_minutes = max_service_minutes
+        self.warm_start_days = warm_start_days
+        self._stats = {} # (hospital,), (hospital, department) or (hospital, department, doctor) -> StreamingStats
+        self._lock = threading.Lock()
+        self._warm_lock = threading.Lock() # Serializes the warm start without blocking the hooks
+        self._warmed = False
+
+    @staticmethod
+    def _levels(hospital, department, doctor):
+        return ((hospital, department, doctor), (hospital, department), (hospital,))
+
+    def _get(self, key):
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = StreamingStats(self.alpha)
+        return stats
+
+    # --- Queue engine observer hooks (all O(1)) ---
+    def on_issue(self, key, waiting, at=None):
+        """A token was issued in the queue for `key` = (hospital, department, doctor, day)."""
+        at = at or datetime.now()
+        with self._lock:
+            for level in self._levels(*key[:3]):
+                self._get(level).record_arrival(at)
+            self._get(key[:3]).queue_length = waiting
+
+    def on_call(self, key, waiting, at=None):
+        """The doctor called the next patient; the gap since the previous call is a consultation time."""
+        at = at or datetime.now()
+        with self._lock:
+            doctor_stats = self._get(key[:3])
+            if doctor_stats.last_call is not None and doctor_stats.last_call.date() == at.date():
+                minutes = (at - doctor_stats.last_call).total_seconds() / 60.0
+                if 0 < minutes <= self.max_service_minutes:
+                    for level in self._levels(*key[:3]):
+                        self._get(level).record_service(minutes)
+            doctor_stats.last_call = at
+            doctor_stats.queue_length = waiting
+
+    def on_dequeue(self, key, waiting):
+        with self._lock:
+            self._get(key[:3]).queue_length = waiting
+
+    # --- Queries ---
+    def consultation_minutes(self, hospital, department, doctor):
+        """Expected consultation time from the most specific level with enough samples."""
+        self._ensure_warm()
+        with self._lock:
+            for level in self._levels(hospital, department, doctor):
+                stats = self._stats.get(level)
+                if stats and stats.service_samples >= self.min_samples:
+                    return stats.service_minutes
+        return self.default_service_minutes
+
+    def estimate_wait(self, hospital, department, doctor, people_ahead):
+        """Estimated minutes until a token with `people_ahead` patients in front of it is called."""
+        return max(0, people_ahead) * self.consultation_minutes(hospital, department, doctor)
+
+    def snapshot(self, hospital, department=None, doctor=None):
+        key = tuple(part for part in (hospital, department, doctor) if part is not None)
+        self._ensure_warm()
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                return None
+            return {
+                "consultation_minutes": stats.service_minutes,
+                "consultation_samples": stats.service_samples,
+                "arrival_rate_per_hour": stats.arrival_rate_per_hour,
+                "queue_length": stats.queue_length,
+            }
+
+    # --- Warm start ---
+    def _ensure_warm(self):
+        if self._warmed:
+            return
+        with self._warm_lock:
+            if self._warmed:
+                return
+            since = date.today() - timedelta(days=self.warm_start_days)
+            try:
+                # The history read is the slow part, so self._lock isn't held for it
+                warm = self._warm_start(self.db_manager.iter_appointment_timeline(since))
+            except Exception as e:
+                print(f"Wait-time warm start skipped: {e}", file=sys.stderr)
+                warm = {}
+            with self._lock:
+                for key, stats in warm.items():
+                    live = self._stats.get(key)
+                    if live is not None:
+                        # Keep what the hooks saw while history was loading
+                        stats.last_arrival, stats.last_call, stats.queue_length = live.last_arrival, live.last_call, live.queue_length
+                        if not stats.arrival_samples:
+                            stats.interarrival_minutes, stats.arrival_samples = live.interarrival_minutes, live.arrival_samples
+                    self._stats[key] = stats
+                self._warmed = True
+
+    def _warm_start(self, rows):
+        """
+        EWMA statistics per level from historical rows, as a new {key: StreamingStats}.
+
+        One Python pass turns the streamed rows into columns; everything after that
+        is vectorized: group ids come from np.unique, gaps from np.diff on lexsorted
+        arrays, and each group's final EWMA is a weighted np.bincount with weights
+        alpha * (1 - alpha) ** (samples after it).
+        """
+        doctors, days, minutes, booked = [], [], [], []
+        for r in rows:
+            doctors.append(f"{r['hospital']}\x1f{r['department']}\x1f{r['doctor']}")
+            days.append(r['appointment_date'].toordinal())
+            minutes.append(_minutes_of(r['appointment_time']))
+            booked.append(_epoch_minutes(r['booking_time']))
+        if not doctors:
+            return {}
+        import numpy as np # Only needed once per process, so kept off the startup path
+
+        doctors = np.array(doctors)
+        days = np.array(days, dtype=np.int64)
+        minutes = np.array(minutes, dtype=np.float64)
+        booked = np.array(booked, dtype=np.float64)
+        doctor_keys, doctor_ids = np.unique(doctors, return_inverse=True)
+        doctor_keys = [tuple(key.split("\x1f")) for key in doctor_keys]
+
+        # Consultation time ~ gap between consecutive appointments of one doctor on one day
+        order = np.lexsort((minutes, days, doctor_ids))
+        ids, gaps = doctor_ids[order], np.diff(minutes[order])
+        same_day = (np.diff(ids) == 0) & (np.diff(days[order]) == 0)
+        valid = same_day & (gaps > 0) & (gaps <= self.max_service_minutes)
+        service = self._grouped_ewma(np, ids[1:][valid], gaps[valid], len(doctor_keys))
+
+        # Inter-arrival ~ gap between consecutive bookings for one doctor
+        valid_booked = ~np.isnan(booked)
+        order = np.lexsort((booked, doctor_ids))
+        order = order[valid_booked[order]]
+        ids, gaps = doctor_ids[order], np.diff(booked[order])
+        valid = (np.diff(ids) == 0) & (gaps > 0)
+        arrivals = self._grouped_ewma(np, ids[1:][valid], gaps[valid], len(doctor_keys))
+
+        warm = {}
+        for index, doctor_key in enumerate(doctor_keys):
+            stats = warm[doctor_key] = StreamingStats(self.alpha)
+            stats.service_minutes, stats.service_samples = float(service[0][index]), int(service[1][index])
+            stats.interarrival_minutes, stats.arrival_samples = float(arrivals[0][index]), int(arrivals[1][index])
+            if not stats.service_samples:
+                stats.service_minutes = None
+            if not stats.arrival_samples:
+                stats.interarrival_minutes = None
+
+        # Department and hospital levels: sample-weighted means of their doctors
+        for level_len in (2, 1):
+            totals = {}
+            for doctor_key in doctor_keys:
+                stats = warm[doctor_key]
+                if stats.service_samples:
+                    total = totals.setdefault(doctor_key[:level_len], [0.0, 0])
+                    total[0] += stats.service_minutes * stats.service_samples
+                    total[1] += stats.service_samples
+            for key, (weighted, samples) in totals.items():
+                stats = warm[key] = StreamingStats(self.alpha)
+                stats.service_minutes, stats.service_samples = weighted / samples, samples
+        return warm
+
+    def _grouped_ewma(self, np, group_ids, values, group_count):
+        """Final EWMA and sample count per group for values already in time order within each group."""
+        counts = np.bincount(group_ids, minlength=group_count)
+        if not len(values):
+            return np.zeros(group_count), counts
+        # Position of each value counted from the end of its group (0 = most recent)
+        ends = np.cumsum(counts)
+        starts = ends - counts
+        order = np.argsort(group_ids, kind="stable")
+        position = np.empty(len(values), dtype=np.int64)
+        position[order] = np.arange(len(values)) - np.repeat(starts, counts)
+        from_end = counts[group_ids] - 1 - position
+        weights = self.alpha * (1 - self.alpha) ** from_end
+        # The oldest value seeds the EWMA, so it carries the remaining weight
+        first = position == 0
+        weights[first] = (1 - self.alpha) ** from_end[first]
+        return np.bincount(group_ids, weights=weights * values, minlength=group_count), counts
+
+
+def _minutes_of(value):
+    if isinstance(value, timedelta): # pymysql returns TIME columns as timedelta
+        return value.total_seconds() / 60.0
+    return value.hour * 60 + value.minute + value.second / 60.0
+
+
+def _epoch_minutes(value):
+    if value is None:
+        return float("nan")
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.timestamp() / 60.0
+
+
+_ESTIMATOR = None
+_ESTIMATOR_LOCK = threading.Lock()
+
+
+def get_wait_time_estimator(db_manager):
+    """Return the process-wide WaitTimeEstimator, creating it with `db_manager` on first call."""
+    global _ESTIMATOR
+    with _ESTIMATOR_LOCK:
+        if _ESTIMATOR is None:
+            _ESTIMATOR = WaitTimeEstimator(
+                db_manager,
+                alpha=config.WAIT_TIME_EWMA_ALPHA,
+                min_samples=config.WAIT_TIME_MIN_SAMPLES,
+                default_service_minutes=config.WAIT_TIME_DEFAULT_MINUTES,
+                warm_start_days=config.WAIT_TIME_WARM_START_DAYS,
+            )
+        return _ESTIMATOR